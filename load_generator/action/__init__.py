@@ -1,12 +1,14 @@
 """
 Action模块 - 按功能分类的API操作类
 """
+from .transport import Transport
 from .base_action import BaseAction
 from .auth_action import AuthAction
 from .travel_action import TravelAction
 from .contact_action import ContactAction
 
 __all__ = [
+    "Transport",
     "BaseAction",
     "AuthAction",
     "TravelAction",
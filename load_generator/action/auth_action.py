@@ -3,6 +3,9 @@
 """
 from .base_action import BaseAction
 
+# 用户列表中需要保留的字段（完整用户信息包含密码、权限列表等，用户数多时响应很大）
+USER_LIST_FIELDS = ("userId", "username", "roles")
+
 
 class AuthAction(BaseAction):
     """认证相关的API操作"""
@@ -21,6 +24,26 @@ class AuthAction(BaseAction):
             格式: "token"
             失败时: 空字符串
         """
+        user_info = self.login_detail(username, password, verification_code)
+        token = user_info.get("token")
+        if token:
+            return str(token)
+        return ""
+    
+    def login_detail(self, username: str, password: str, verification_code: str | None = None) -> dict[str, object]:
+        """
+        用户登录，返回完整的用户信息（token、userId等）
+        
+        Args:
+            username: 用户名
+            password: 密码
+            verification_code: 验证码（可选）
+            
+        Returns:
+            登录响应中的data对象，如果登录失败则返回空字典
+            格式: {"userId": "...", "username": "...", "token": "..."}
+            失败时: {}
+        """
         data = {
             "username": username,
             "password": password
@@ -34,11 +57,9 @@ class AuthAction(BaseAction):
             # 检查status是否为1（成功）
             if result.get("status") == 1:
                 data_obj = result.get("data")
-                if isinstance(data_obj, dict):
-                    token = data_obj.get("token")
-                    if token:
-                        return str(token)
-        return ""
+                if isinstance(data_obj, dict) and data_obj.get("token"):
+                    return data_obj
+        return {}
     
     def register(self, user_name: str, password: str, gender: int, document_type: int, document_num: str, email: str, token: str) -> dict[str, object]:
         """
@@ -81,10 +102,10 @@ class AuthAction(BaseAction):
         获取所有用户
         
         Returns:
-            用户列表，如果失败则返回空列表
-            格式: [{"userId": "...", "username": "...", ...}, ...]
+            用户列表（只包含USER_LIST_FIELDS中的字段），如果失败则返回空列表
+            格式: [{"userId": "...", "username": "...", "roles": [...]}, ...]
         """
-        response_json = self._get("/api/v1/users")
+        response_json = self._get("/api/v1/users", fields=USER_LIST_FIELDS)
         
         # 获取用户列表接口返回格式: 直接返回列表 [{"id": "...", "username": "..."}, ...]
         # 或者错误时返回: {"status_code": 403, "message": "..."}
@@ -101,13 +122,13 @@ class AuthAction(BaseAction):
             token: 认证token（需要先登录获取）
             
         Returns:
-            删除响应数据，如果失败则返回空字典或错误信息
-            格式: {"status": 1, "msg": "DELETE SUCCESS", "data": null}
-            失败时: {"status": 0, "msg": "Error message", "data": null} 或 {}
+            删除响应的status和msg，如果失败则返回空字典或错误信息
+            格式: {"status": 1, "msg": "DELETE SUCCESS"}
+            失败时: {"status": 0, "msg": "Error message"} 或 {}
         """
         headers = {"Authorization": f"Bearer {token}"}
         
-        result = self._delete(f"/api/v1/adminuserservice/users/{user_id}", headers=headers)
+        result = self._delete(f"/api/v1/adminuserservice/users/{user_id}", headers=headers, status_only=True)
         # 删除接口返回格式: {"status": 1, "msg": "DELETE SUCCESS", "data": null}
         if isinstance(result, dict):
             return result
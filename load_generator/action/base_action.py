@@ -2,7 +2,14 @@
 基础Action类 - 所有Action的基类
 """
 import logging
+import time
 from typing import Any
+from .transport import Transport, TransportResponse
+from .outcome import SUCCESS, ResponseFailure, classify
+from .endpoints import stats_name
+from . import decoding
+import config
+import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -15,129 +22,200 @@ class BaseAction:
         初始化Action
         
         Args:
-            client: Locust的HttpUser.client对象，用于发送HTTP请求
+            client: Locust的HttpUser.client或FastHttpUser.client对象，用于发送HTTP请求
         """
         self.client = client
+        self.transport = Transport(client)
     
-    def _post(self, endpoint: str, json_data: dict[str, Any], name: str | None = None, headers: dict[str, str] | None = None) -> dict[str, object] | list[dict[str, object]]:
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: dict[str, Any] | None = None,
+        params: dict[str, object] | None = None,
+        name: str | None = None,
+        headers: dict[str, str] | None = None,
+        fields: tuple[str, ...] | None = None,
+        status_only: bool = False
+    ) -> dict[str, object] | list[dict[str, object]]:
         """
-        发送POST请求的通用方法
+        发送HTTP请求并将响应统一转换为字典或列表
+        
+        请求是否成功按业务结果判断（见action.outcome）：Response包装中status不为1的HTTP 200响应
+        在Locust中记为失败；config.GOODPUT_ENDPOINTS中的接口业务成功时另外以"GOODPUT"请求类型上报
         
         Args:
+            method: HTTP方法（GET/POST/PUT/DELETE）
             endpoint: API端点路径
-            json_data: 请求体JSON数据
-            name: Locust统计中的名称（如果为None，使用endpoint）
+            json_data: 请求体JSON数据（可选）
+            params: URL参数（可选）
+            name: Locust统计中的名称（如果为None，使用endpoint匹配的config.API_ENDPOINTS模板，见action.endpoints）
             headers: 请求头（可选，用于认证等）
-            
+            fields: 列表响应中每个元素需要的字段（可选，见action.decoding）
+            status_only: 调用方只需要Response包装的status和msg时为True，不解析data
+        
         Returns:
-            响应JSON数据
+            响应JSON数据（可能是字典或列表）
         """
-        response = self.client.post(
+        name = name or stats_name(endpoint)
+        return self.transport.checked_request(
+            method,
             endpoint,
-            json=json_data,
-            name=name or endpoint,
+            lambda response: self._check_response(response, endpoint, name, fields, status_only),
+            json_data=json_data,
+            params=params,
+            name=name,
             headers=headers
         )
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 403:
-            return {"status_code": 403, "message": "权限不足"}
-        else:
-            return {"status_code": response.status_code, "message": response.text}
     
-    def _get(self, endpoint: str, params: dict[str, object] | None = None, name: str | None = None, headers: dict[str, str] | None = None) -> list[dict[str, object]] | dict[str, object]:
+    def _check_response(
+        self,
+        response: TransportResponse,
+        endpoint: str,
+        name: str,
+        fields: tuple[str, ...] | None = None,
+        status_only: bool = False
+    ) -> tuple[dict[str, object] | list[dict[str, object]], Exception | None]:
         """
-        发送GET请求的通用方法
+        解析响应并按业务结果判断是否成功（Transport.checked_request的check）
         
         Args:
+            response: 统一的响应对象
             endpoint: API端点路径
-            params: URL参数
-            name: Locust统计中的名称（如果为None，使用endpoint）
-            headers: 请求头（可选，用于认证等）
-            
+            name: 请求的统计名称
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
         Returns:
-            响应JSON数据（可能是字典或列表）
+            (响应JSON数据, 失败原因)，业务成功时失败原因为None
         """
-        response = self.client.get(
-            endpoint,
-            params=params,
-            name=name or endpoint,
-            headers=headers
-        )
+        result = self._parse_response(response, name, fields, status_only)
+        category, detail = classify(endpoint, response.status_code, result, response.error)
+        metrics.counters.incr(f"outcome.{category}")
+        if category != SUCCESS:
+            return result, ResponseFailure(category, detail)
+        group = config.GOODPUT_ENDPOINTS.get(endpoint)
+        if group is not None and config.GOODPUT_STATS_ENABLED:
+            self.transport.fire_request_event("GOODPUT", group, response.elapsed, len(response.content))
+        return result, None
+    
+    def _parse_response(
+        self,
+        response: TransportResponse,
+        name: str = "",
+        fields: tuple[str, ...] | None = None,
+        status_only: bool = False
+    ) -> dict[str, object] | list[dict[str, object]]:
+        """
+        将响应统一转换为字典或列表，两种客户端返回的结果格式完全一致
+        
+        成功响应的解码耗时单独累计在自定义指标decode.*中（不计入请求的响应时间），
+        开启config.DECODE_STATS_ENABLED时同时以"DECODE"请求类型上报
         
+        Args:
+            response: 统一的响应对象
+            name: 请求的统计名称
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
+        Returns:
+            成功时返回响应JSON数据；非JSON或失败时返回包含status_code和message的字典
+        """
         if response.status_code == 200:
+            content = response.content
+            start_time = time.time()
+            start = time.perf_counter()
             try:
-                return response.json()
-            except:
+                result, mode = decoding.decode(content, fields, status_only)
+            except ValueError:
                 # 如果不是JSON，返回文本
                 return {"status_code": 200, "message": response.text}
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.counters.incr("decode.ms", elapsed)
+            metrics.counters.incr(f"decode.{mode}")
+            metrics.counters.incr("decode.bytes", len(content))
+            if config.DECODE_STATS_ENABLED:
+                self.transport.fire_request_event("DECODE", name, elapsed, len(content), start_time=start_time)
+            return result
         elif response.status_code == 403:
             return {"status_code": 403, "message": "权限不足", "status": 0}
         else:
             try:
                 # 尝试解析错误响应中的JSON
                 error_data = response.json()
+                if isinstance(error_data, dict):
+                    error_data.setdefault("status_code", response.status_code)
                 return error_data
-            except:
+            except ValueError:
                 return {"status_code": response.status_code, "message": response.text, "status": 0}
     
-    def _put(self, endpoint: str, json_data: dict[str, object], name: str | None = None) -> dict[str, object]:
+    def _post(self, endpoint: str, json_data: dict[str, Any], name: str | None = None, headers: dict[str, str] | None = None,
+              fields: tuple[str, ...] | None = None, status_only: bool = False) -> dict[str, object] | list[dict[str, object]]:
         """
-        发送PUT请求的通用方法
+        发送POST请求的通用方法
         
         Args:
             endpoint: API端点路径
             json_data: 请求体JSON数据
-            name: Locust统计中的名称（如果为None，使用endpoint）
-            
+            name: Locust统计中的名称（如果为None，使用endpoint匹配的模板）
+            headers: 请求头（可选，用于认证等）
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
         Returns:
             响应JSON数据
         """
-        response = self.client.put(
-            endpoint,
-            json=json_data,
-            name=name or endpoint
-        )
+        return self._request("POST", endpoint, json_data=json_data, name=name, headers=headers, fields=fields, status_only=status_only)
+    
+    def _get(self, endpoint: str, params: dict[str, object] | None = None, name: str | None = None, headers: dict[str, str] | None = None,
+             fields: tuple[str, ...] | None = None, status_only: bool = False) -> list[dict[str, object]] | dict[str, object]:
+        """
+        发送GET请求的通用方法
         
-        if response.status_code == 200:
-            try:
-                return response.json()
-            except:
-                return {"status_code": 200, "message": response.text}
-        else:
-            try:
-                error_data = response.json()
-                return error_data
-            except:
-                return {"status_code": response.status_code, "message": response.text, "status": 0}
+        Args:
+            endpoint: API端点路径
+            params: URL参数
+            name: Locust统计中的名称（如果为None，使用endpoint匹配的模板）
+            headers: 请求头（可选，用于认证等）
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
+        Returns:
+            响应JSON数据（可能是字典或列表）
+        """
+        return self._request("GET", endpoint, params=params, name=name, headers=headers, fields=fields, status_only=status_only)
     
-    def _delete(self, endpoint: str, name: str | None = None, headers: dict[str, str] | None = None) -> dict[str, object]:
+    def _put(self, endpoint: str, json_data: dict[str, object], name: str | None = None, headers: dict[str, str] | None = None,
+             fields: tuple[str, ...] | None = None, status_only: bool = False) -> dict[str, object] | list[dict[str, object]]:
         """
-        发送DELETE请求的通用方法
+        发送PUT请求的通用方法
         
         Args:
             endpoint: API端点路径
-            name: Locust统计中的名称（如果为None，使用endpoint）
+            json_data: 请求体JSON数据
+            name: Locust统计中的名称（如果为None，使用endpoint匹配的模板）
             headers: 请求头（可选，用于认证等）
-            
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
         Returns:
             响应JSON数据
         """
-        response = self.client.delete(
-            endpoint,
-            name=name or endpoint,
-            headers=headers
-        )
+        return self._request("PUT", endpoint, json_data=json_data, name=name, headers=headers, fields=fields, status_only=status_only)
+    
+    def _delete(self, endpoint: str, name: str | None = None, headers: dict[str, str] | None = None,
+                fields: tuple[str, ...] | None = None, status_only: bool = False) -> dict[str, object] | list[dict[str, object]]:
+        """
+        发送DELETE请求的通用方法
         
-        if response.status_code == 200:
-            try:
-                return response.json()
-            except:
-                return {"status_code": 200, "message": response.text}
-        else:
-            try:
-                error_data = response.json()
-                return error_data
-            except:
-                return {"status_code": response.status_code, "message": response.text, "status": 0}
-
+        Args:
+            endpoint: API端点路径
+            name: Locust统计中的名称（如果为None，使用endpoint匹配的模板）
+            headers: 请求头（可选，用于认证等）
+            fields: 列表响应中每个元素需要的字段（可选）
+            status_only: 是否只解析Response包装的status和msg
+        
+        Returns:
+            响应JSON数据
+        """
+        return self._request("DELETE", endpoint, name=name, headers=headers, fields=fields, status_only=status_only)
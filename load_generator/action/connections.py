@@ -0,0 +1,243 @@
+"""
+连接管理 - 按接口分组设置超时、连接池大小、keep-alive和连接复用上限
+
+接口按服务路径前缀分组（config.CONNECTION_GROUPS），每个分组的设置见config.CONNECTION_SETTINGS：
+- "default"分组使用虚拟用户自己的Locust客户端（HttpUser/FastHttpUser.client）
+- 在CONNECTION_SETTINGS中单独配置了的分组，每个虚拟用户另外创建一个同类型的客户端，使用独立的连接池，
+  例如订票请求的长读超时和短连接不影响查票请求
+- 只关闭刚刚使用过的那个连接：需要关闭连接的请求带 Connection: close 请求头，服务端响应后由客户端
+  （requests的连接池/geventhttpclient）丢弃该连接，同一客户端上其他协程正在使用的连接不受影响。
+  keep_alive关闭时每个请求都带该请求头；max_reuse大于0时该分组每发送max_reuse个请求，第max_reuse个请求带该请求头。
+  max_reuse按分组计数：分组的请求依次发送（连接池中只有一个连接）时等于每个连接的请求数，
+  并发请求时达到计数的请求关闭它所使用的那个连接
+- 连接抖动模式（config.CONNECTION_CHURN）下每个流程使用自己的客户端（见flow_scope），
+  流程内的请求（包括并发步骤）使用新连接，流程结束后只关闭这些客户端，
+  同一虚拟用户并发执行的其他流程（开环模式）不受影响，模拟大量不同的客户端经过Ingress/NodePort
+
+只导入客户端自身的类型（不直接导入locust），asyncio引擎导入action时不会加载gevent
+"""
+import logging
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP = "default"
+
+# 分组的服务路径前缀段数：/api/v1/{服务}
+PREFIX_SEGMENTS = 3
+
+
+def group_of(endpoint: str) -> str:
+    """
+    请求路径所属的接口分组
+
+    Args:
+        endpoint: 请求路径
+
+    Returns:
+        分组名称，未配置的服务为"default"
+    """
+    prefix = "/".join(endpoint.partition("?")[0].split("/", PREFIX_SEGMENTS + 1)[:PREFIX_SEGMENTS + 1])
+    return config.CONNECTION_GROUPS.get(prefix, DEFAULT_GROUP)
+
+
+def settings_of(group: str) -> dict[str, object]:
+    """
+    分组的连接设置（未配置的项使用"default"中的值）
+
+    Args:
+        group: 分组名称
+
+    Returns:
+        连接设置
+    """
+    return {**config.CONNECTION_SETTINGS[DEFAULT_GROUP], **config.CONNECTION_SETTINGS.get(group, {})}
+
+
+def _is_fast(client) -> bool:
+    return type(client).__name__ == "FastHttpSession"
+
+
+def _mount_pool(client, pool_size: int):
+    """为requests客户端挂载指定连接池大小的适配器（连接池满时不阻塞，多出的连接用完即关闭）"""
+    from locust.clients import LocustHttpAdapter
+
+    for prefix in ("http://", "https://"):
+        client.mount(prefix, LocustHttpAdapter(pool_manager=None, pool_connections=1, pool_maxsize=pool_size))
+
+
+def _create_client(client, settings: dict[str, object]):
+    """创建与虚拟用户客户端同类型、使用独立连接池的客户端"""
+    user = client.user
+    if _is_fast(client):
+        return type(client)(
+            base_url=client.base_url,
+            request_event=client.request_event,
+            user=user,
+            connection_timeout=settings["connect_timeout"],
+            network_timeout=settings["read_timeout"],
+            concurrency=settings["pool_size"],
+            max_retries=getattr(user, "max_retries", 0),
+            headers=getattr(user, "default_headers", None),
+        )
+    session = type(client)(base_url=client.base_url, request_event=client.request_event, user=user)
+    session.trust_env = client.trust_env
+    session.headers.update(client.headers)
+    _mount_pool(session, settings["pool_size"])
+    return session
+
+
+def _close_client(client):
+    """关闭客户端连接池中的所有连接（客户端之后仍然可用，下一个请求重新建立连接）"""
+    if _is_fast(client):
+        client.client.clientpool.close()
+    else:
+        client.close()
+
+
+class ConnectionGroup:
+    """一个虚拟用户在一个接口分组上的连接"""
+
+    def __init__(self, name: str, client, settings: dict[str, object]):
+        """
+        Args:
+            name: 分组名称
+            client: 发送该分组请求的Locust客户端
+            settings: 分组的连接设置
+        """
+        self.name = name
+        self.client = client
+        self.timeout = (settings["connect_timeout"], settings["read_timeout"])
+        self.keep_alive = bool(settings["keep_alive"])
+        self.max_reuse = int(settings["max_reuse"])
+        # 上次关闭连接后该分组已发送的请求数（连接池只有一个连接时即每个连接的请求数）
+        self.reused = 0
+        self.is_fast = _is_fast(client)
+
+    def prepare(self, kwargs: dict[str, object]):
+        """
+        把分组的超时和keep-alive设置加入请求参数，需要关闭连接时加入 Connection: close 请求头
+
+        Args:
+            kwargs: 客户端请求的关键字参数（会被修改）
+        """
+        # FastHttpSession的超时在创建客户端时设置，不支持按请求设置
+        if not self.is_fast:
+            kwargs["timeout"] = self.timeout
+        self.reused += 1
+        if not self.keep_alive or (self.max_reuse and self.reused >= self.max_reuse):
+            # 客户端在响应后丢弃本次请求使用的连接，下一个请求重新建立连接
+            kwargs["headers"] = {**kwargs.get("headers", {}), "Connection": "close"}
+            self.reused = 0
+            metrics.counters.incr(f"connections.closed.{self.name}")
+
+
+class ClientConnections:
+    """一个虚拟用户（Locust客户端）的所有分组连接"""
+
+    def __init__(self, client, own_default: bool = False):
+        """
+        Args:
+            client: 虚拟用户的Locust客户端
+            own_default: 为True时"default"分组也创建独立的客户端（连接抖动模式下流程使用的连接）
+        """
+        self.client = client
+        self.groups: dict[str, ConnectionGroup] = {}
+        default = settings_of(DEFAULT_GROUP)
+        if own_default:
+            self.groups[DEFAULT_GROUP] = ConnectionGroup(DEFAULT_GROUP, _create_client(client, default), default)
+            return
+        # FastHttpSession的连接池在创建时确定，"default"分组的连接池大小和超时由用户类的属性设置（见locustfile.py）
+        if not _is_fast(client):
+            _mount_pool(client, default["pool_size"])
+        self.groups[DEFAULT_GROUP] = ConnectionGroup(DEFAULT_GROUP, client, default)
+
+    def for_endpoint(self, endpoint: str) -> ConnectionGroup:
+        """
+        获取请求路径所属分组的连接（单独配置了的分组在第一次使用时创建客户端）
+
+        Args:
+            endpoint: 请求路径
+
+        Returns:
+            分组的连接
+        """
+        name = group_of(endpoint)
+        group = self.groups.get(name)
+        if group is None:
+            if name not in config.CONNECTION_SETTINGS:
+                group = self.groups[DEFAULT_GROUP]
+            else:
+                settings = settings_of(name)
+                group = ConnectionGroup(name, _create_client(self.client, settings), settings)
+            self.groups[name] = group
+        return group
+
+    def close(self):
+        """关闭所有分组自己创建的客户端的连接（不关闭虚拟用户的Locust客户端）"""
+        for group in set(self.groups.values()):
+            if group.client is not self.client:
+                _close_client(group.client)
+
+
+# Locust客户端 -> 连接管理，虚拟用户结束后随客户端一起释放
+_connections: "weakref.WeakKeyDictionary[object, ClientConnections]" = weakref.WeakKeyDictionary()
+
+# 连接抖动模式下当前流程使用的连接，不在流程中时为None
+# 与flow.context相同使用contextvars，并发步骤复制流程上下文后使用同一组连接
+_flow_connections: ContextVar[ClientConnections | None] = ContextVar("flow_connections", default=None)
+
+
+def get_connections(client) -> ClientConnections:
+    """
+    获取Locust客户端的连接管理，首次调用时创建
+
+    Args:
+        client: 虚拟用户的Locust客户端（HttpSession或FastHttpSession）
+
+    Returns:
+        连接管理
+    """
+    connections = _connections.get(client)
+    if connections is None:
+        connections = _connections[client] = ClientConnections(client)
+    return connections
+
+
+def active(connections: ClientConnections) -> ClientConnections:
+    """
+    请求应使用的连接：当前流程有自己的连接（连接抖动模式）时使用流程的连接，否则使用虚拟用户的连接
+
+    Args:
+        connections: 虚拟用户的连接管理（get_connections的返回值）
+
+    Returns:
+        连接管理
+    """
+    scope = _flow_connections.get()
+    if scope is not None and scope.client is connections.client:
+        return scope
+    return connections
+
+
+@contextmanager
+def flow_scope(client) -> Iterator[None]:
+    """
+    在一个流程内使用新的客户端和连接，结束后关闭这些连接（连接抖动模式下每个流程调用）
+
+    Args:
+        client: 虚拟用户的Locust客户端
+    """
+    scope = ClientConnections(client, own_default=True)
+    token = _flow_connections.set(scope)
+    metrics.counters.incr("connections.churn")
+    try:
+        yield
+    finally:
+        _flow_connections.reset(token)
+        scope.close()
@@ -2,11 +2,13 @@
 联系人相关Action - 处理联系人信息管理操作
 """
 from .base_action import BaseAction
+from cache import cached
 
 
 class ContactAction(BaseAction):
     """联系人相关的API操作"""
     
+    @cached("contacts", key=lambda account_id, token: (account_id,))
     def get_contacts_by_account(self, account_id: str, token: str) -> list[dict[str, object]]:
         """
         根据账户ID获取所有联系人
@@ -34,3 +36,37 @@ class ContactAction(BaseAction):
             return result
         return []
 
+    
+    def create_contact(self, account_id: str, name: str, document_type: int, document_number: str, phone_number: str, token: str) -> dict[str, object]:
+        """
+        为账户添加联系人
+        
+        Args:
+            account_id: 账户ID（UUID格式）
+            name: 联系人姓名
+            document_type: 证件类型，1表示身份证
+            document_number: 证件号码
+            phone_number: 电话号码
+            token: 认证token（需要先通过login方法获取，使用该账户自己的token）
+            
+        Returns:
+            创建的联系人，如果失败则返回空字典
+            格式: {"id": "...", "accountId": "...", "name": "...", "documentType": 1, "documentNumber": "...", "phoneNumber": "..."}
+        """
+        data = {
+            "accountId": account_id,
+            "name": name,
+            "documentType": document_type,
+            "documentNumber": document_number,
+            "phoneNumber": phone_number
+        }
+        
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        result = self._post("/api/v1/contactservice/contacts", data, headers=headers)
+        # 接口返回格式: {"status": 1, "msg": "Create contacts success", "data": {"id": "...", ...}}
+        if isinstance(result, dict) and result.get("status") == 1:
+            data_obj = result.get("data")
+            if isinstance(data_obj, dict):
+                return data_obj
+        return {}
@@ -0,0 +1,102 @@
+"""
+响应解码层 - 把响应体解码为字典或列表，供BaseAction使用
+
+- 安装了orjson时直接解析响应的bytes，否则使用标准库json
+- status_only：只从响应体开头提取TrainTicket Response包装的status和msg（{"status": 1, "msg": "...", ...}），
+  不解析data；响应体不是这种格式时退回完整解析
+- fields：调用方声明需要的字段，列表响应（或Response包装中的data列表）解析后每个元素只保留这些字段，
+  只减少之后持有的数据；Locust客户端在解码前已经读入完整的响应体，解析时仍会构建完整的列表
+- 不做流式解析：HttpSession的stream=True会让响应时间不包括读取响应体，与其他后端的统计口径不一致，
+  增量解析器也需要额外的依赖（见README“响应解码”）
+"""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Response包装的开头：{"status": 1, "msg": "..."
+_STATUS_PREFIX = re.compile(rb'\A\s*\{\s*"status"\s*:\s*(-?\d+)\s*(?:,\s*"msg"\s*:\s*"((?:[^"\\]|\\.)*)")?')
+
+
+def loads(content: bytes | str) -> object:
+    """
+    解析JSON
+
+    Args:
+        content: 响应体
+
+    Returns:
+        解析后的JSON数据
+
+    Raises:
+        ValueError: 不是合法JSON
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_status(content: bytes) -> dict[str, object] | None:
+    """
+    只提取Response包装开头的status和msg字段
+
+    Args:
+        content: 响应体
+
+    Returns:
+        {"status": ..., "msg": ...}，响应体开头不是Response包装时返回None
+    """
+    match = _STATUS_PREFIX.match(content)
+    if match is None:
+        return None
+    result: dict[str, object] = {"status": int(match.group(1))}
+    if match.group(2) is not None:
+        result["msg"] = json.loads(b'"' + match.group(2) + b'"')
+    return result
+
+
+def project(item: object, fields: tuple[str, ...]) -> object:
+    """
+    只保留声明的字段
+
+    Args:
+        item: 列表中的一个元素
+        fields: 需要的字段
+
+    Returns:
+        元素是字典时返回只包含这些字段的新字典，否则原样返回
+    """
+    if isinstance(item, dict):
+        return {field: item[field] for field in fields if field in item}
+    return item
+
+
+def decode(content: bytes, fields: tuple[str, ...] | None = None, status_only: bool = False) -> tuple[object, str]:
+    """
+    解码响应体
+
+    Args:
+        content: 响应体
+        fields: 列表元素需要的字段（可选，为None时保留全部字段）
+        status_only: 是否只提取Response包装的status和msg
+
+    Returns:
+        (解码结果, 解码方式)，解码方式为"status"或"full"
+
+    Raises:
+        ValueError: 不是合法JSON
+    """
+    if status_only:
+        result = decode_status(content)
+        if result is not None:
+            return result, "status"
+    data = loads(content)
+    if fields:
+        if isinstance(data, list):
+            data = [project(item, fields) for item in data]
+        elif isinstance(data, dict) and isinstance(data.get("data"), list):
+            data["data"] = [project(item, fields) for item in data["data"]]
+    return data, "full"
@@ -0,0 +1,114 @@
+"""
+接口模板注册表 - 把带路径参数的请求路径映射为config.API_ENDPOINTS中的模板，作为Locust统计名称
+
+例如 /api/v1/foodservice/foods/2026-01-01/shanghai/suzhou/D1345 统计为
+/api/v1/foodservice/foods/{date}/{startStation}/{endStation}/{tripId}，
+避免每个不同的URL在Locust中各占一个统计条目（master内存、统计汇总和Web UI的开销随条目数增长）
+
+不匹配任何模板的路径按服务折叠为 /api/v1/{服务}/*，每个折叠后的名称只警告一次，
+出现时应在config.API_ENDPOINTS中补充对应的模板
+"""
+import logging
+import re
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\{[^/{}]+\}")
+# 折叠未知路径时保留的前缀段数：/api/v1/{服务}
+UNKNOWN_PREFIX_SEGMENTS = 3
+
+
+class EndpointRegistry:
+    """接口模板注册表，按服务分组匹配"""
+
+    def __init__(self, endpoints: dict[str, dict[str, str]]):
+        """
+        Args:
+            endpoints: 与config.API_ENDPOINTS格式相同的 {服务: {接口: 路径模板}}
+        """
+        # 没有路径参数的模板直接按路径查找
+        self._exact: dict[str, str] = {}
+        # 服务前缀 -> [(正则, 模板)]，路径参数少的模板优先
+        self._patterns: dict[str, list[tuple[re.Pattern[str], str]]] = {}
+        self._warned: set[str] = set()
+        for group in endpoints.values():
+            for template in group.values():
+                self.add(template)
+
+    def add(self, template: str):
+        """
+        注册一个路径模板
+
+        Args:
+            template: 路径模板，路径参数写作 {名称}，每个参数匹配一个路径段
+        """
+        if not _PLACEHOLDER.search(template):
+            self._exact[template] = template
+            return
+        parts = _PLACEHOLDER.split(template)
+        regex = "[^/]+".join(re.escape(part) for part in parts)
+        patterns = self._patterns.setdefault(_prefix(template), [])
+        patterns.append((re.compile(regex + r"\Z"), template))
+        patterns.sort(key=lambda item: len(_PLACEHOLDER.findall(item[1])))
+
+    def stats_name(self, path: str) -> str:
+        """
+        获取请求路径的统计名称
+
+        Args:
+            path: 请求路径（可以带查询字符串）
+
+        Returns:
+            匹配的模板；不匹配任何模板时返回按服务折叠后的名称
+        """
+        path = path.partition("?")[0]
+        template = self._exact.get(path)
+        if template is not None:
+            return template
+        prefix = _prefix(path)
+        for pattern, template in self._patterns.get(prefix, ()):
+            if pattern.match(path):
+                return template
+
+        name = f"{prefix}/*"
+        metrics.counters.incr("endpoints.unknown")
+        if name not in self._warned:
+            self._warned.add(name)
+            logger.warning("请求路径 %s 不匹配config.API_ENDPOINTS中的任何模板，统计名称折叠为 %s", path, name)
+        return name
+
+
+def _prefix(path: str) -> str:
+    """路径的服务前缀（前UNKNOWN_PREFIX_SEGMENTS段）"""
+    return "/".join(path.split("/", UNKNOWN_PREFIX_SEGMENTS + 1)[:UNKNOWN_PREFIX_SEGMENTS + 1])
+
+
+_registry: EndpointRegistry | None = None
+
+
+def get_registry() -> EndpointRegistry:
+    """
+    获取由config.API_ENDPOINTS构建的注册表，首次调用时创建
+
+    Returns:
+        接口模板注册表
+    """
+    global _registry
+    if _registry is None:
+        _registry = EndpointRegistry(config.API_ENDPOINTS)
+    return _registry
+
+
+def stats_name(path: str) -> str:
+    """
+    获取请求路径的统计名称（见EndpointRegistry.stats_name）
+
+    Args:
+        path: 请求路径
+
+    Returns:
+        统计名称
+    """
+    return get_registry().stats_name(path)
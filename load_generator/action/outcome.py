@@ -0,0 +1,107 @@
+"""
+响应结果分类 - 按业务结果而不是HTTP状态码判断请求是否成功
+
+TrainTicket的业务失败（余票不足、token无效、联系人不存在等）也返回HTTP 200，
+只在Response包装中给出 {"status": 0, "msg": "..."}。BaseAction通过Locust的catch_response
+按这里的规则把每个请求标记为成功或失败，失败原因的格式为"类别: 说明"：
+
+- success：业务成功（status为1，或接口直接返回列表、没有Response包装的对象）
+- transport：连接失败、超时等没有HTTP响应的错误
+- auth：HTTP 401/403，或msg表明token、账号密码、验证码错误
+- http：其他非200的HTTP状态码
+- invalid_response：HTTP 200但响应体不是JSON
+- 其他业务失败按msg归类（ENDPOINT_RULES中的接口规则优先，然后是MSG_RULES中的通用规则），
+  都不匹配时为other
+"""
+import re
+
+SUCCESS = "success"
+
+# 通用的msg分类规则：(正则, 类别)，按顺序匹配，忽略大小写
+MSG_RULES: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"token|unauthori|forbidden|permission|verification|incorrect username or password", re.I), "auth"),
+    (re.compile(r"already exist", re.I), "duplicate"),
+    (re.compile(r"not exist|not found|no content|can ?not find", re.I), "not_found"),
+    (re.compile(r"not enough|sold out|no (left )?(seat|ticket)|seat.*fail", re.I), "sold_out"),
+    (re.compile(r"security", re.I), "security_check"),
+]
+
+# 接口专用的msg分类规则，优先于MSG_RULES：{接口路径: [(正则, 类别), ...]}
+ENDPOINT_RULES: dict[str, list[tuple[re.Pattern[str], str]]] = {
+    "/api/v1/preserveservice/preserve": [
+        (re.compile(r"contacts", re.I), "contacts"),
+        (re.compile(r"trip|seat|ticket", re.I), "sold_out"),
+    ],
+    "/api/v1/preserveotherservice/preserveOther": [
+        (re.compile(r"contacts", re.I), "contacts"),
+        (re.compile(r"trip|seat|ticket", re.I), "sold_out"),
+    ],
+    "/api/v1/adminuserservice/users": [
+        (re.compile(r"exist", re.I), "duplicate"),
+    ],
+}
+
+
+class ResponseFailure(Exception):
+    """请求的业务结果为失败，作为Locust请求的失败原因上报"""
+
+    def __init__(self, category: str, detail: str):
+        """
+        Args:
+            category: 失败类别（transport、auth、http、invalid_response或业务失败类别）
+            detail: 失败说明（业务失败时为msg）
+        """
+        super().__init__(f"{category}: {detail}")
+        self.category = category
+        self.detail = detail
+
+
+def classify_msg(endpoint: str, msg: str) -> str:
+    """
+    按msg对业务失败归类
+
+    Args:
+        endpoint: 接口路径
+        msg: Response包装中的msg
+
+    Returns:
+        失败类别，都不匹配时为"other"
+    """
+    for pattern, category in ENDPOINT_RULES.get(endpoint, ()):
+        if pattern.search(msg):
+            return category
+    for pattern, category in MSG_RULES:
+        if pattern.search(msg):
+            return category
+    return "other"
+
+
+def classify(endpoint: str, status_code: int, result: object, error: object = None) -> tuple[str, str]:
+    """
+    判断一个请求的业务结果
+
+    Args:
+        endpoint: 接口路径
+        status_code: HTTP状态码（没有响应时为0）
+        result: BaseAction解析后的响应（字典或列表）
+        error: 客户端记录的异常（可选，没有响应时的失败原因）
+
+    Returns:
+        (类别, 说明)，成功时类别为SUCCESS
+    """
+    if not status_code:
+        return "transport", str(error or "没有响应")
+    if status_code in (401, 403):
+        return "auth", f"HTTP {status_code}"
+    if status_code != 200:
+        return "http", f"HTTP {status_code}"
+    if not isinstance(result, dict):
+        return SUCCESS, ""
+    if "status_code" in result:
+        # BaseAction把非JSON的200响应转换为 {"status_code": 200, "message": ...}
+        return "invalid_response", "响应体不是JSON"
+    status = result.get("status")
+    if status is None or status == 1:
+        return SUCCESS, ""
+    msg = str(result.get("msg") or "")
+    return classify_msg(endpoint, msg), msg or f"status={status}"
@@ -0,0 +1,245 @@
+"""
+传输层适配器 - 屏蔽不同HTTP客户端之间的差异
+
+支持的客户端：
+- Locust HttpUser.client（基于requests的HttpSession）
+- Locust FastHttpUser.client（基于geventhttpclient的FastHttpSession）
+- 任何提供 post/get/put/delete 方法、返回带 status_code/text/json() 响应对象的客户端
+  （例如 test/test_flow.py 中的 SimpleClient）
+
+Locust客户端的请求按接口分组使用各自的超时、连接池和keep-alive设置（见action/connections.py）
+"""
+import time
+from typing import Callable, TypeVar
+from urllib.parse import urlencode
+from . import connections, decoding
+
+T = TypeVar("T")
+
+
+class TransportResponse:
+    """
+    统一的响应对象，content 永远是bytes、text 永远是字符串，json() 解析失败时抛出 ValueError
+
+    text 在第一次访问时才解码（requests在没有声明编码时会检测字符集，开销较大），
+    BaseAction解码成功响应时只使用 content
+    """
+
+    __slots__ = ("status_code", "elapsed", "_response", "_content", "_text")
+
+    def __init__(self, response, elapsed: float = 0.0):
+        self._response = response
+        self.status_code = response.status_code or 0
+        # 发送请求到收到响应的耗时（毫秒）
+        self.elapsed = elapsed
+        self._content: bytes | None = None
+        self._text: str | None = None
+
+    @property
+    def content(self) -> bytes:
+        """响应体（bytes）"""
+        if self._content is None:
+            content = getattr(self._response, "content", None)
+            if not isinstance(content, bytes):
+                content = self.text.encode("utf-8")
+            self._content = content
+        return self._content
+
+    @property
+    def text(self) -> str:
+        """响应体（字符串）"""
+        if self._text is None:
+            self._text = self._response.text or ""
+        return self._text
+
+    @property
+    def error(self) -> object:
+        """客户端记录的异常（连接失败、超时等），没有时为None"""
+        return getattr(self._response, "error", None)
+
+    def json(self):
+        """
+        解析响应体JSON
+
+        Returns:
+            解析后的JSON数据
+
+        Raises:
+            ValueError: 响应体不是合法JSON
+        """
+        content = self.content
+        if not content:
+            raise ValueError("响应体为空")
+        return decoding.loads(content)
+
+
+class Transport:
+    """HTTP传输适配器，所有Action通过它发送请求"""
+
+    def __init__(self, client):
+        """
+        初始化传输适配器
+
+        Args:
+            client: Locust的HttpUser.client或FastHttpUser.client对象
+        """
+        self.client = client
+        # FastHttpSession不支持params参数，需要自行拼接查询字符串
+        self.is_fast = type(client).__name__ == "FastHttpSession"
+        # 只有Locust客户端支持catch_response
+        self.is_locust = self.is_fast or type(client).__name__ == "HttpSession"
+        # 按接口分组的连接（只管理Locust客户端）
+        self.connections = connections.get_connections(client) if self.is_locust else None
+
+    def _prepare(
+        self,
+        endpoint: str,
+        json_data: dict[str, object] | None,
+        params: dict[str, object] | None,
+        name: str | None,
+        headers: dict[str, str] | None
+    ) -> tuple[str, dict[str, object]]:
+        """把统一的请求参数转换为客户端的请求路径和关键字参数"""
+        kwargs: dict[str, object] = {"name": name or endpoint}
+        if headers:
+            kwargs["headers"] = headers
+        if json_data is not None:
+            kwargs["json"] = json_data
+        if params:
+            if self.is_fast:
+                separator = "&" if "?" in endpoint else "?"
+                endpoint = f"{endpoint}{separator}{urlencode(params)}"
+            else:
+                kwargs["params"] = params
+        return endpoint, kwargs
+
+    def _group(self, endpoint: str, kwargs: dict[str, object]) -> "connections.ConnectionGroup | None":
+        """选择请求路径所属分组的连接，并把分组的超时和keep-alive设置加入请求参数"""
+        if self.connections is None:
+            return None
+        group = connections.active(self.connections).for_endpoint(endpoint)
+        group.prepare(kwargs)
+        return group
+
+    def request(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: dict[str, object] | None = None,
+        params: dict[str, object] | None = None,
+        name: str | None = None,
+        headers: dict[str, str] | None = None
+    ) -> TransportResponse:
+        """
+        发送HTTP请求，Locust按HTTP状态码判断是否成功
+
+        Args:
+            method: HTTP方法（GET/POST/PUT/DELETE）
+            endpoint: API端点路径
+            json_data: 请求体JSON数据（可选）
+            params: URL参数（可选）
+            name: Locust统计中的名称（如果为None，使用endpoint）
+            headers: 请求头（可选）
+
+        Returns:
+            统一的响应对象
+        """
+        endpoint, kwargs = self._prepare(endpoint, json_data, params, name, headers)
+        group = self._group(endpoint, kwargs)
+        send = getattr(self.client if group is None else group.client, method.lower())
+        start = time.perf_counter()
+        response = send(endpoint, **kwargs)
+        return TransportResponse(response, (time.perf_counter() - start) * 1000)
+
+    def checked_request(
+        self,
+        method: str,
+        endpoint: str,
+        check: Callable[[TransportResponse], tuple[T, Exception | None]],
+        json_data: dict[str, object] | None = None,
+        params: dict[str, object] | None = None,
+        name: str | None = None,
+        headers: dict[str, str] | None = None
+    ) -> T:
+        """
+        发送HTTP请求，由调用方根据响应内容判断是否成功（Locust的catch_response）
+
+        check在Locust上报该请求之前调用，其耗时不计入请求的响应时间；
+        客户端不是Locust客户端时直接调用check，忽略判断结果
+
+        Args:
+            method: HTTP方法（GET/POST/PUT/DELETE）
+            endpoint: API端点路径
+            check: 接收响应，返回 (结果, 失败原因)，失败原因为None表示成功
+            json_data: 请求体JSON数据（可选）
+            params: URL参数（可选）
+            name: Locust统计中的名称（如果为None，使用endpoint）
+            headers: 请求头（可选）
+
+        Returns:
+            check返回的结果
+        """
+        endpoint, kwargs = self._prepare(endpoint, json_data, params, name, headers)
+        if not self.is_locust:
+            send = getattr(self.client, method.lower())
+            start = time.perf_counter()
+            response = send(endpoint, **kwargs)
+            return check(TransportResponse(response, (time.perf_counter() - start) * 1000))[0]
+
+        group = self._group(endpoint, kwargs)
+        send = getattr(group.client, method.lower())
+        start = time.perf_counter()
+        with send(endpoint, catch_response=True, **kwargs) as response:
+            elapsed = (time.perf_counter() - start) * 1000
+            try:
+                result, failure = check(TransportResponse(response, elapsed))
+            except Exception as e:
+                # 没有标记结果时Locust不会上报抛出了未知异常的请求
+                response.failure(e)
+                raise
+            if failure is None:
+                response.success()
+            else:
+                response.failure(failure)
+        return result
+
+    def fire_request_event(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int = 0,
+        exception: Exception | None = None,
+        start_time: float | None = None
+    ):
+        """
+        发出一个合成的Locust request事件（用于流程级、步骤级等非HTTP统计）
+
+        事件会像普通请求一样出现在Web UI、CSV和分布式汇总中；
+        客户端不是Locust客户端时（例如test/test_flow.py中的SimpleClient）不做任何事
+
+        Args:
+            request_type: 统计中的请求类型，例如"FLOW"、"STEP"
+            name: 统计名称
+            response_time: 耗时（毫秒）
+            response_length: 长度（可选）
+            exception: 失败原因（可选，为None表示成功）
+            start_time: 开始时间（Unix时间戳，可选）
+        """
+        request_event = getattr(self.client, "request_event", None)
+        if request_event is None:
+            environment = getattr(self.client, "environment", None)
+            request_event = environment.events.request if environment is not None else None
+        if request_event is None:
+            return
+        request_event.fire(
+            request_type=request_type,
+            name=name,
+            response_time=response_time,
+            response_length=response_length,
+            exception=exception,
+            response=None,
+            context={},
+            start_time=start_time or time.time(),
+            url=name,
+        )
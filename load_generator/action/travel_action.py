@@ -3,6 +3,7 @@
 """
 from typing import Any
 from .base_action import BaseAction
+from cache import cached
 
 
 class TravelAction(BaseAction):
@@ -86,6 +87,7 @@ class TravelAction(BaseAction):
         
         return []
     
+    @cached("assurance_types", key=lambda token: ())
     def get_assurance_types(self, token: str) -> list[dict[str, object]]:
         """
         获取保险类型
@@ -115,6 +117,7 @@ class TravelAction(BaseAction):
         
         return []
     
+    @cached("foods", key=lambda date, start_station, end_station, trip_id: (date, start_station, end_station, trip_id))
     def get_all_foods(self, date: str, start_station: str, end_station: str, trip_id: str) -> dict[str, object]:
         """
         获取所有食物信息
@@ -181,9 +184,9 @@ class TravelAction(BaseAction):
             food_price: 食物价格
             
         Returns:
-            预订响应数据，如果失败则返回空字典或错误信息
-            格式: {"status": 1, "msg": "Success.", "data": "Success"}
-            失败时: {"status": 0, "msg": "Error message", "data": null} 或 {}
+            预订响应的status和msg（只需要判断是否成功，不解析data），如果失败则返回空字典或错误信息
+            格式: {"status": 1, "msg": "Success."}
+            失败时: {"status": 0, "msg": "Error message"} 或 {}
         """
         data: dict[str, Any] = {
             "accountId": account_id,
@@ -210,7 +213,7 @@ class TravelAction(BaseAction):
         
         headers = {"Authorization": f"Bearer {token}"}
         
-        result = self._post("/api/v1/preserveservice/preserve", data, headers=headers)
+        result = self._post("/api/v1/preserveservice/preserve", data, headers=headers, status_only=True)
         
         # 预订接口返回格式: {"status": 1, "msg": "Success.", "data": "Success"}
         if isinstance(result, dict):
@@ -254,9 +257,9 @@ class TravelAction(BaseAction):
             store_name: 商店名称（用于食物配送），可以为空字符串
             
         Returns:
-            预订响应数据，如果失败则返回空字典或错误信息
-            格式: {"status": 1, "msg": "Success.", "data": "Success"}
-            失败时: {"status": 0, "msg": "Error message", "data": null} 或 {}
+            预订响应的status和msg（只需要判断是否成功，不解析data），如果失败则返回空字典或错误信息
+            格式: {"status": 1, "msg": "Success."}
+            失败时: {"status": 0, "msg": "Error message"} 或 {}
         """
         data: dict[str, Any] = {
             "accountId": account_id,
@@ -282,7 +285,7 @@ class TravelAction(BaseAction):
         
         headers = {"Authorization": f"Bearer {token}"}
         
-        result = self._post("/api/v1/preserveotherservice/preserveOther", data, headers=headers)
+        result = self._post("/api/v1/preserveotherservice/preserveOther", data, headers=headers, status_only=True)
         
         # 预订接口返回格式: {"status": 1, "msg": "Success.", "data": "Success"}
         if isinstance(result, dict):
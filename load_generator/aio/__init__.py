@@ -0,0 +1,27 @@
+"""
+asyncio引擎模块 - 在一个asyncio事件循环中运行大量虚拟用户（不依赖Locust和gevent）
+
+运行方式: python -m aio --host http://... -u 20000 -r 500 -t 10m --csv results/aio
+"""
+from .transport import AsyncTransport, create_session
+from .actions import AsyncBaseAction, AsyncAuthAction, AsyncTravelAction, AsyncContactAction
+from .flows import AsyncFlow, AsyncSimpleQueryFlow, AsyncSimpleLoginFlow, AsyncBookingFlow
+from .stats import RequestStats, StatsCSVWriter
+from .engine import AsyncEngine, run
+
+__all__ = [
+    "AsyncTransport",
+    "create_session",
+    "AsyncBaseAction",
+    "AsyncAuthAction",
+    "AsyncTravelAction",
+    "AsyncContactAction",
+    "AsyncFlow",
+    "AsyncSimpleQueryFlow",
+    "AsyncSimpleLoginFlow",
+    "AsyncBookingFlow",
+    "RequestStats",
+    "StatsCSVWriter",
+    "AsyncEngine",
+    "run",
+]
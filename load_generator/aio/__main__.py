@@ -0,0 +1,26 @@
+"""
+asyncio引擎入口: python -m aio（在load_generator目录下运行）
+"""
+import argparse
+import config
+import logging_setup
+from .engine import parse_timespan, run
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m aio", description="使用asyncio引擎运行闭环负载（SimpleQuery/SimpleLogin/Booking流程）")
+    parser.add_argument("--host", default=config.BASE_URL, help=f"被测系统地址（默认 {config.BASE_URL}）")
+    parser.add_argument("-u", "--users", type=int, default=1000, help="虚拟用户数（默认1000）")
+    parser.add_argument("-r", "--spawn-rate", type=float, default=100.0, help="每秒启动的虚拟用户数（默认100）")
+    parser.add_argument("-t", "--run-time", type=parse_timespan, default=None, help="运行时间（例如 300s、10m、1h30m，默认运行到Ctrl+C）")
+    parser.add_argument("--csv", dest="csv_prefix", default=None, help="CSV文件前缀（与locust --csv相同的文件和列）")
+    parser.add_argument("--connection-limit", type=int, default=None,
+                        help=f"连接池的最大连接数，0表示不限制（默认 {config.AIO_CONNECTION_LIMIT}）")
+    args = parser.parse_args()
+
+    logging_setup.configure_logging()
+    run(args.host, args.users, args.spawn_rate, args.run_time, args.csv_prefix, args.connection_limit)
+
+
+if __name__ == "__main__":
+    main()
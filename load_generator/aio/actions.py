@@ -0,0 +1,282 @@
+"""
+asyncio引擎的Action - AuthAction、TravelAction、ContactAction中流程用到的方法的异步版本
+
+请求参数、统计名称、响应解码和业务结果分类与同步版本完全相同（复用BaseAction的实现），
+只有发送请求改为 await AsyncTransport；方法名、参数和返回值与同步版本一一对应
+"""
+from typing import Any
+from action.base_action import BaseAction
+from action.endpoints import stats_name
+from action.auth_action import USER_LIST_FIELDS
+from cache import cached
+from .transport import AsyncTransport
+
+
+class AsyncBaseAction(BaseAction):
+    """异步Action基类，_post/_get/_put/_delete返回协程"""
+
+    def __init__(self, transport: AsyncTransport):
+        """
+        初始化Action
+
+        Args:
+            transport: 共享的异步传输适配器
+        """
+        self.client = None
+        self.transport = transport
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        json_data: dict[str, Any] | None = None,
+        params: dict[str, object] | None = None,
+        name: str | None = None,
+        headers: dict[str, str] | None = None,
+        fields: tuple[str, ...] | None = None,
+        status_only: bool = False
+    ) -> dict[str, object] | list[dict[str, object]]:
+        """
+        发送HTTP请求并将响应统一转换为字典或列表（与BaseAction._request相同）
+
+        Returns:
+            响应JSON数据（可能是字典或列表）
+        """
+        name = name or stats_name(endpoint)
+        return await self.transport.checked_request(
+            method,
+            endpoint,
+            lambda response: self._check_response(response, endpoint, name, fields, status_only),
+            json_data=json_data,
+            params=params,
+            name=name,
+            headers=headers
+        )
+
+
+class AsyncAuthAction(AsyncBaseAction):
+    """认证相关的API操作（异步）"""
+
+    async def login(self, username: str, password: str, verification_code: str | None = None) -> str:
+        """
+        用户登录（见AuthAction.login）
+
+        Returns:
+            token字符串，如果登录失败则返回空字符串
+        """
+        user_info = await self.login_detail(username, password, verification_code)
+        token = user_info.get("token")
+        return str(token) if token else ""
+
+    async def login_detail(self, username: str, password: str, verification_code: str | None = None) -> dict[str, object]:
+        """
+        用户登录，返回完整的用户信息（见AuthAction.login_detail）
+
+        Returns:
+            登录响应中的data对象，如果登录失败则返回空字典
+        """
+        data = {
+            "username": username,
+            "password": password
+        }
+        if verification_code:
+            data["verificationCode"] = verification_code
+
+        result = await self._post("/api/v1/users/login", data)
+        if isinstance(result, dict) and result.get("status") == 1:
+            data_obj = result.get("data")
+            if isinstance(data_obj, dict) and data_obj.get("token"):
+                return data_obj
+        return {}
+
+    async def get_all_users(self) -> list[dict[str, object]]:
+        """
+        获取所有用户（见AuthAction.get_all_users）
+
+        Returns:
+            用户列表，如果失败则返回空列表
+        """
+        response_json = await self._get("/api/v1/users", fields=USER_LIST_FIELDS)
+        return response_json if isinstance(response_json, list) else []
+
+
+class AsyncTravelAction(AsyncBaseAction):
+    """旅行相关的API操作（异步）"""
+
+    async def _query_trips(self, endpoint: str, start_place: str, end_place: str, departure_time: str) -> list[dict[str, object]]:
+        data = {
+            "startPlace": start_place,
+            "endPlace": end_place,
+            "departureTime": departure_time
+        }
+        result = await self._post(endpoint, data)
+        # 参数为空时接口直接返回列表，否则为Response包装
+        if isinstance(result, list):
+            return result
+        if isinstance(result, dict) and "status" in result and isinstance(result.get("data"), list):
+            return result["data"]
+        return []
+
+    async def query_trips_left(self, start_place: str, end_place: str, departure_time: str) -> list[dict[str, object]]:
+        """
+        查询高铁/动车剩余车票（见TravelAction.query_trips_left）
+
+        Returns:
+            车次列表，如果失败则返回空列表
+        """
+        return await self._query_trips("/api/v1/travelservice/trips/left", start_place, end_place, departure_time)
+
+    async def query_trips_left_normal(self, start_place: str, end_place: str, departure_time: str) -> list[dict[str, object]]:
+        """
+        查询普通火车剩余车票（见TravelAction.query_trips_left_normal）
+
+        Returns:
+            车次列表，如果失败则返回空列表
+        """
+        return await self._query_trips("/api/v1/travel2service/trips/left", start_place, end_place, departure_time)
+
+    @cached("assurance_types", key=lambda token: ())
+    async def get_assurance_types(self, token: str) -> list[dict[str, object]]:
+        """
+        获取保险类型（见TravelAction.get_assurance_types）
+
+        Returns:
+            保险类型列表，如果失败则返回空列表
+        """
+        headers = {"Authorization": f"Bearer {token}"}
+        result = await self._get("/api/v1/assuranceservice/assurances/types", headers=headers)
+        if isinstance(result, dict):
+            if result.get("status") == 1 and isinstance(result.get("data"), list):
+                return result["data"]
+        elif isinstance(result, list):
+            return result
+        return []
+
+    @cached("foods", key=lambda date, start_station, end_station, trip_id: (date, start_station, end_station, trip_id))
+    async def get_all_foods(self, date: str, start_station: str, end_station: str, trip_id: str) -> dict[str, object]:
+        """
+        获取所有食物信息（见TravelAction.get_all_foods）
+
+        Returns:
+            食物数据对象，如果失败则返回空字典
+        """
+        result = await self._get(f"/api/v1/foodservice/foods/{date}/{start_station}/{end_station}/{trip_id}")
+        if isinstance(result, dict) and result.get("status") == 1 and isinstance(result.get("data"), dict):
+            return result["data"]
+        return {}
+
+    async def preserve_ticket(
+        self,
+        account_id: str,
+        contacts_id: str,
+        trip_id: str,
+        seat_type: str,
+        date: str,
+        from_station: str,
+        to_station: str,
+        assurance: str,
+        token: str,
+        food_type: int = 0,
+        station_name: str | None = None,
+        store_name: str | None = None,
+        food_name: str | None = None,
+        food_price: float | None = None
+    ) -> dict[str, object]:
+        """
+        预订动车车票（见TravelAction.preserve_ticket）
+
+        Returns:
+            预订响应的status和msg，如果失败则返回空字典或错误信息
+        """
+        data: dict[str, Any] = {
+            "accountId": account_id,
+            "contactsId": contacts_id,
+            "tripId": trip_id,
+            "seatType": seat_type,
+            "date": date,
+            "from": from_station,
+            "to": to_station,
+            "assurance": assurance
+        }
+        if food_type != 0:
+            data["foodType"] = food_type
+            if station_name:
+                data["stationName"] = station_name
+            if store_name:
+                data["storeName"] = store_name
+            if food_name:
+                data["foodName"] = food_name
+            if food_price is not None:
+                data["foodPrice"] = food_price
+
+        headers = {"Authorization": f"Bearer {token}"}
+        result = await self._post("/api/v1/preserveservice/preserve", data, headers=headers, status_only=True)
+        return result if isinstance(result, dict) else {}
+
+    async def preserve_other_ticket(
+        self,
+        account_id: str,
+        contacts_id: str,
+        trip_id: str,
+        seat_type: str,
+        date: str,
+        from_station: str,
+        to_station: str,
+        assurance: str,
+        token: str,
+        food_type: int = 0,
+        food_name: str | None = None,
+        food_price: float | None = None,
+        station_name: str | None = None,
+        store_name: str | None = None
+    ) -> dict[str, object]:
+        """
+        预订普通火车车票（见TravelAction.preserve_other_ticket）
+
+        Returns:
+            预订响应的status和msg，如果失败则返回空字典或错误信息
+        """
+        data: dict[str, Any] = {
+            "accountId": account_id,
+            "contactsId": contacts_id,
+            "tripId": trip_id,
+            "seatType": seat_type,
+            "date": date,
+            "from": from_station,
+            "to": to_station,
+            "assurance": assurance
+        }
+        if food_type != 0:
+            data["foodType"] = food_type
+            if food_name:
+                data["foodName"] = food_name
+            if food_price is not None:
+                data["foodPrice"] = food_price
+            # stationName和storeName可以为空字符串
+            data["stationName"] = station_name if station_name else ""
+            data["storeName"] = store_name if store_name else ""
+
+        headers = {"Authorization": f"Bearer {token}"}
+        result = await self._post("/api/v1/preserveotherservice/preserveOther", data, headers=headers, status_only=True)
+        return result if isinstance(result, dict) else {}
+
+
+class AsyncContactAction(AsyncBaseAction):
+    """联系人相关的API操作（异步）"""
+
+    @cached("contacts", key=lambda account_id, token: (account_id,))
+    async def get_contacts_by_account(self, account_id: str, token: str) -> list[dict[str, object]]:
+        """
+        根据账户ID获取所有联系人（见ContactAction.get_contacts_by_account）
+
+        Returns:
+            联系人列表，如果失败则返回空列表
+        """
+        headers = {"Authorization": f"Bearer {token}"}
+        result = await self._get(f"/api/v1/contactservice/contacts/account/{account_id}", headers=headers)
+        if isinstance(result, dict):
+            if result.get("status") == 1 and isinstance(result.get("data"), list):
+                return result["data"]
+        elif isinstance(result, list):
+            return result
+        return []
@@ -0,0 +1,277 @@
+"""
+asyncio负载引擎 - 在一个asyncio事件循环中运行大量虚拟用户（每个用户是一个asyncio任务）
+
+虚拟用户的行为与locustfile.py中的闭环用户相同：启动时从账号池租借账号并登录，
+之后按config.AIO_FLOW_WEIGHTS的权重循环执行流程，流程之间等待config.AIO_WAIT_TIME秒。
+统计输出与Locust相同（控制台表格、--csv 的四个CSV文件、自定义指标CSV），
+另外输出每个虚拟用户的内存占用和每核RPS，用于与gevent worker对比
+"""
+import asyncio
+import itertools
+import logging
+import os
+import random
+import re
+import resource
+import time
+import traceback
+from .flows import AsyncBookingFlow, AsyncSimpleLoginFlow, AsyncSimpleQueryFlow, ensure_session
+from .actions import AsyncAuthAction, AsyncContactAction
+from .stats import RequestStats, StatsCSVWriter, format_table
+from .transport import AsyncTransport, create_session
+from flow.context import current_user
+from session import UserSession
+import config
+import metrics
+import payload_pool
+import user_pool
+import utils
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# 流程名称（与locustfile.FLOW_TASKS相同）到异步Flow类的映射
+FLOWS = {
+    "simple_query": AsyncSimpleQueryFlow,
+    "simple_login": AsyncSimpleLoginFlow,
+    "booking": AsyncBookingFlow,
+}
+
+HTTP_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"}
+
+# 控制台输出统计的间隔（秒）
+CONSOLE_INTERVAL = 2.0
+
+# 全部用户启动后等待登录完成、再测量内存的时间（秒）
+SETTLE_SECONDS = 5.0
+
+_TIMESPAN_PATTERN = re.compile(r"^(?:(\d+)h)?\s*(?:(\d+)m)?\s*(?:(\d+)s)?$")
+
+
+def parse_timespan(text: str) -> int:
+    """
+    解析时间长度（与Locust的 -t 相同的格式，例如 "90"、"30s"、"10m"、"1h30m"）
+
+    Args:
+        text: 时间长度
+
+    Returns:
+        秒数
+
+    Raises:
+        ValueError: 格式错误
+    """
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    match = _TIMESPAN_PATTERN.match(text)
+    if not text or match is None:
+        raise ValueError(f"无法解析的时间长度: {text}")
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def rss_bytes() -> int:
+    """
+    当前进程的常驻内存（RSS）
+
+    Returns:
+        字节数；没有/proc时返回历史最大RSS
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def raise_file_limit():
+    """把打开文件数的软限制提高到硬限制（每个连接占用一个文件描述符）"""
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError) as e:
+        logger.warning("无法提高打开文件数限制: %s", e)
+
+
+class AsyncEngine:
+    """asyncio负载引擎"""
+
+    def __init__(self, host: str, users: int, spawn_rate: float, run_time: float | None,
+                 csv_prefix: str | None = None, connection_limit: int | None = None):
+        """
+        Args:
+            host: 被测系统地址
+            users: 虚拟用户数
+            spawn_rate: 每秒启动的虚拟用户数
+            run_time: 运行时间（秒，为None时运行到Ctrl+C）
+            csv_prefix: CSV文件前缀（与locust --csv相同，可选）
+            connection_limit: 连接池的最大连接数（可选，默认使用config.AIO_CONNECTION_LIMIT，0表示不限制）
+        """
+        self.host = host
+        self.users = users
+        self.spawn_rate = spawn_rate
+        self.run_time = run_time
+        self.csv_prefix = csv_prefix
+        self.connection_limit = config.AIO_CONNECTION_LIMIT if connection_limit is None else connection_limit
+        self.stats = RequestStats()
+        self.user_count = 0
+        self.report: dict[str, float] = {}
+        # 全部用户启动并完成登录后的常驻内存（运行时间内没有全部启动时为None）
+        self._spawned_rss: int | None = None
+        self._sequence = itertools.count(1)
+        self._flow_names = list(config.AIO_FLOW_WEIGHTS)
+        self._flow_weights = [config.AIO_FLOW_WEIGHTS[name] for name in self._flow_names]
+
+    async def _user(self, transport: AsyncTransport):
+        """一个虚拟用户：租借账号并登录，然后循环执行流程"""
+        account = user_pool.get_pool().lease()
+        session = UserSession(account["username"], account["password"])
+        current_user.set(f"{account['username']}#{next(self._sequence)}")
+        self.user_count += 1
+        try:
+            if not await ensure_session(session, AsyncAuthAction(transport), AsyncContactAction(transport)):
+                logger.warning("新用户启动，登录失败，将在下一次Flow中重试: %s", session.username)
+            while True:
+                flow_name = random.choices(self._flow_names, self._flow_weights)[0]
+                # 与闭环用户相同，只有订票流程复用会话缓存
+                flow = FLOWS[flow_name](transport, session if flow_name == "booking" else None)
+                try:
+                    await flow.run()
+                except Exception as e:
+                    self.stats.log_exception(repr(e), traceback.format_exc())
+                await asyncio.sleep(random.uniform(*config.AIO_WAIT_TIME))
+        finally:
+            self.user_count -= 1
+            user_pool.get_pool().release(account)
+
+    async def _spawn(self, transport: AsyncTransport, tasks: list[asyncio.Task]):
+        """按spawn_rate启动虚拟用户（每0.1秒启动一批）"""
+        started = time.monotonic()
+        while len(tasks) < self.users:
+            target = min(self.users, int((time.monotonic() - started) * self.spawn_rate) + 1)
+            while len(tasks) < target:
+                tasks.append(asyncio.create_task(self._user(transport)))
+            await asyncio.sleep(0.1)
+        logger.info("全部 %d 个虚拟用户已启动", self.users)
+
+    async def _report(self, csv_writer: StatsCSVWriter | None):
+        """定期输出控制台统计和 _stats_history.csv"""
+        last_console = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            if csv_writer is not None:
+                csv_writer.write_history(self.user_count)
+            if time.monotonic() - last_console >= CONSOLE_INTERVAL:
+                last_console = time.monotonic()
+                total = self.stats.total
+                logger.info("用户数: %d, 请求数: %d, 失败数: %d, 当前RPS: %.1f",
+                            self.user_count, total.num_requests, total.num_failures, total.current_rps)
+
+    async def _hold(self, spawner: asyncio.Task):
+        """等待全部用户启动，登录完成后测量内存，之后一直等待（由run的运行时间结束）"""
+        await spawner
+        # 排除运行中响应体等瞬时内存
+        await asyncio.sleep(SETTLE_SECONDS)
+        self._spawned_rss = rss_bytes()
+        await asyncio.Event().wait()
+
+    async def run(self) -> RequestStats:
+        """
+        运行负载直到运行时间结束（或被取消）
+
+        Returns:
+            请求统计
+        """
+        raise_file_limit()
+        # 与locustfile的init事件相同：预先加载路线目录、账号池和合成数据池
+        utils.get_route_index()
+        user_pool.get_pool()
+        if config.PAYLOAD_POOL_ENABLED:
+            payload_pool.warm_up()
+
+        http_session = create_session(self.connection_limit)
+        transport = AsyncTransport(http_session, self.host, self.stats)
+        csv_writer = StatsCSVWriter(self.stats, self.csv_prefix) if self.csv_prefix else None
+        tasks: list[asyncio.Task] = []
+
+        baseline_rss = rss_bytes()
+        cpu_start = time.process_time()
+        self.stats.start_time = time.time()
+        reporter = asyncio.create_task(self._report(csv_writer))
+        spawner = asyncio.create_task(self._spawn(transport, tasks))
+        try:
+            # 运行时间从开始启动用户时计算，包括启动阶段
+            await asyncio.wait_for(self._hold(spawner), self.run_time)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            spawned = len(tasks)
+            for task in [spawner, reporter, *tasks]:
+                task.cancel()
+            await asyncio.gather(spawner, reporter, *tasks, return_exceptions=True)
+            await http_session.close()
+            cpu_seconds = time.process_time() - cpu_start
+            self._finish(csv_writer, baseline_rss, spawned, cpu_seconds)
+        return self.stats
+
+    def _finish(self, csv_writer: StatsCSVWriter | None, baseline_rss: int, spawned: int, cpu_seconds: float):
+        """输出最终统计、内存占用和每核RPS（运行时间内没有全部启动并完成登录时不输出内存占用）"""
+        http_requests = sum(entry.num_requests for entry in self.stats.entries.values() if entry.method in HTTP_METHODS)
+        self.report = {
+            "users": spawned,
+            "cpu_seconds": round(cpu_seconds, 2),
+            "http_requests": http_requests,
+            "rps_per_core": round(http_requests / cpu_seconds, 1) if cpu_seconds > 0 else 0.0,
+        }
+        if self._spawned_rss is not None:
+            self.report["rss_mb"] = round(self._spawned_rss / 1024 / 1024, 1)
+            self.report["memory_per_user_kb"] = round((self._spawned_rss - baseline_rss) / max(spawned, 1) / 1024, 2)
+        print(format_table(self.stats))
+        if self._spawned_rss is not None:
+            print(f"\n虚拟用户数 {spawned}，常驻内存 {self.report['rss_mb']} MB，"
+                  f"每个虚拟用户 {self.report['memory_per_user_kb']} KB")
+        else:
+            print(f"\n运行时间内只启动了 {spawned}/{self.users} 个虚拟用户（或启动后不足 {SETTLE_SECONDS:g} 秒），"
+                  f"不输出每个虚拟用户的内存占用")
+        print(f"HTTP请求 {http_requests} 个，CPU {self.report['cpu_seconds']} 秒，每核RPS {self.report['rps_per_core']}")
+
+        summary = metrics.summary()
+        if summary:
+            logger.info("自定义指标汇总: %s", summary)
+        if csv_writer is not None:
+            csv_writer.write_final()
+            for name, value in self.report.items():
+                metrics.counters.incr(f"aio.{name}", value)
+            metrics.write_csv(f"{self.csv_prefix}_custom.csv")
+
+
+def run(host: str, users: int, spawn_rate: float, run_time: float | None,
+        csv_prefix: str | None = None, connection_limit: int | None = None) -> AsyncEngine:
+    """
+    创建事件循环并运行asyncio引擎（安装了uvloop时使用uvloop）
+
+    Args:
+        host: 被测系统地址
+        users: 虚拟用户数
+        spawn_rate: 每秒启动的虚拟用户数
+        run_time: 运行时间（秒，为None时运行到Ctrl+C）
+        csv_prefix: CSV文件前缀（可选）
+        connection_limit: 连接池的最大连接数（可选）
+
+    Returns:
+        运行结束的引擎（report中包含内存占用和每核RPS）
+    """
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    engine = AsyncEngine(host, users, spawn_rate, run_time, csv_prefix, connection_limit)
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        logger.info("已中断")
+    return engine
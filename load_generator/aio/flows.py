@@ -0,0 +1,362 @@
+"""
+asyncio引擎的Flow - SimpleQueryFlow、SimpleLoginFlow、BookingFlow的异步版本
+
+流程步骤、随机选择、返回值和FLOW/STEP统计与同步版本相同：路线和车次选择、联系人/食物/保险选择、
+订票结果和流程结果的分类使用同步版本的函数（flow.base_flow、flow.travel_flow），这里只实现请求的发送；
+concurrent模式下相互独立的步骤用asyncio.gather并发执行（同步版本使用gevent协程组）
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+from flow.base_flow import StepResult, check_trips, flow_failure, select_session
+from flow.context import current_flow, current_step
+from flow.travel_flow import (
+    check_preserve, choose_route, invalidate_rejected_session, is_high_speed, merge_trips,
+    select_assurance, select_contact, select_food, select_seat_type
+)
+from session import UserSession
+from .actions import AsyncAuthAction, AsyncContactAction, AsyncTravelAction
+from .transport import AsyncTransport
+import config
+import metrics
+import utils
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_session(session: UserSession, auth: AsyncAuthAction, contact: AsyncContactAction | None = None) -> bool:
+    """
+    确保会话可用，必要时重新登录（UserSession.ensure的异步版本）
+
+    Args:
+        session: 虚拟用户的会话缓存
+        auth: 异步AuthAction
+        contact: 异步ContactAction（为None时不获取联系人）
+
+    Returns:
+        会话可用返回True
+    """
+    if session.is_valid():
+        return True
+    if not session.apply_login(await auth.login_detail(session.username, session.password)):
+        return False
+    if contact is not None:
+        session.contacts = await contact.get_contacts_by_account(session.user_id, session.token)
+    logger.info("会话已刷新: %s, 联系人数量: %s", session.username, len(session.contacts))
+    return True
+
+
+class AsyncFlow:
+    """异步Flow基类，与flow.BaseFlow对应"""
+
+    def __init__(self, transport: AsyncTransport, session: UserSession | None = None, execution_mode: str | None = None):
+        """
+        初始化Flow
+
+        Args:
+            transport: 共享的异步传输适配器
+            session: 虚拟用户的会话缓存（可选）
+            execution_mode: 独立步骤的执行方式，"sequential"或"concurrent"（可选，默认使用config.FLOW_EXECUTION_MODE）
+        """
+        self.transport = transport
+        self.session = session
+        self.execution_mode = execution_mode or config.FLOW_EXECUTION_MODE
+        # 每个步骤的耗时（毫秒），按步骤名称记录
+        self.timings: dict[str, float] = {}
+        self.auth = AsyncAuthAction(transport)
+        self.travel = AsyncTravelAction(transport)
+        self.contact = AsyncContactAction(transport)
+
+    @property
+    def flow_name(self) -> str:
+        """统计中的流程名称，与同步版本相同（例如AsyncBookingFlow为"BookingFlow"）"""
+        return type(self).__name__.removeprefix("Async")
+
+    async def execute(self, *args, **kwargs) -> dict[str, object]:
+        """执行流程（子类必须实现）"""
+        raise NotImplementedError("子类必须实现execute方法")
+
+    async def run(self, *args, **kwargs) -> dict[str, object]:
+        """
+        执行流程，结束后以"FLOW"请求类型上报端到端耗时、是否成功和失败原因（与BaseFlow.run相同）
+
+        Returns:
+            执行结果字典
+        """
+        flow_name = self.flow_name
+        token = current_flow.set(flow_name)
+        start = time.perf_counter()
+        result: dict[str, object] | None = None
+        try:
+            result = await self.execute(*args, **kwargs)
+            return result
+        finally:
+            if config.FLOW_STATS_ENABLED:
+                self.transport.fire_request_event("FLOW", flow_name, (time.perf_counter() - start) * 1000, exception=flow_failure(result))
+            current_flow.reset(token)
+
+    @contextmanager
+    def _step(self, name: str) -> Iterator[StepResult]:
+        """
+        记录一个步骤的耗时，并以"STEP"请求类型上报（统计名称为"流程名.步骤名"，与BaseFlow._step相同）
+
+        Args:
+            name: 步骤名称
+
+        Yields:
+            步骤的执行结果
+        """
+        token = current_step.set(name)
+        start = time.perf_counter()
+        step = StepResult()
+        try:
+            yield step
+        except Exception as e:
+            step.failure = e
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = elapsed
+            if config.FLOW_STATS_ENABLED:
+                self.transport.fire_request_event(
+                    "STEP",
+                    f"{self.flow_name}.{name}",
+                    elapsed,
+                    exception=step.failure
+                )
+            current_step.reset(token)
+
+    async def _run_step(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        check: Callable[[object], str | None] | None = None
+    ) -> object:
+        with self._step(name) as step:
+            value = await func()
+            reason = check(value) if check is not None else None
+            if reason is not None:
+                step.fail(reason)
+            return value
+
+    async def _run_steps(
+        self,
+        steps: dict[str, Callable[[], Awaitable[object]]],
+        checks: dict[str, Callable[[object], str | None]] | None = None
+    ) -> dict[str, object]:
+        """
+        执行一组相互独立的步骤（sequential模式逐个执行，concurrent模式并发执行）
+
+        Args:
+            steps: 步骤名称到返回协程的函数的映射
+            checks: 步骤名称到返回值检查函数的映射（可选，见BaseFlow._run_step）
+
+        Returns:
+            步骤名称到返回值的映射
+        """
+        checks = checks or {}
+        if self.execution_mode != "concurrent":
+            return {name: await self._run_step(name, func, checks.get(name)) for name, func in steps.items()}
+        # 每个任务复制一份流程上下文，步骤名称互不影响
+        tasks = {
+            name: asyncio.create_task(self._run_step(name, func, checks.get(name)), context=contextvars.copy_context())
+            for name, func in steps.items()
+        }
+        await asyncio.gather(*tasks.values())
+        return {name: task.result() for name, task in tasks.items()}
+
+    async def _get_session(self, username: str | None = None, password: str | None = None) -> UserSession | None:
+        """
+        获取可用的登录会话（与BaseFlow._get_session相同）
+
+        Returns:
+            可用的会话，登录失败则返回None
+        """
+        session = select_session(self.session, username, password)
+        if not await ensure_session(session, self.auth, self.contact):
+            return None
+        return session
+
+
+class AsyncSimpleQueryFlow(AsyncFlow):
+    """简单查询流程（异步）- 只执行查票操作"""
+
+    async def execute(self, start: str | None = None, end: str | None = None, date: str | None = None) -> dict[str, object]:
+        """
+        执行简单查询流程（见SimpleQueryFlow.execute）
+
+        Returns:
+            查询结果
+        """
+        result = {"success": False, "data": None, "error": None}
+        try:
+            start = start or utils.get_random_start_station()
+            end = end or utils.get_random_end_station(start)
+            date = date or utils.get_random_travel_date()
+            logger.info("查询车票: %s -> %s, 日期: %s", start, end, date)
+
+            query_result = await self.travel.query_trips_left(start, end, date)
+            if query_result:
+                result["success"] = True
+                result["data"] = query_result
+            else:
+                result["error"] = "未查询到符合条件的车次"
+        except Exception as e:
+            logger.error("查询失败: %s", e, exc_info=True)
+            result["error"] = str(e)
+        return result
+
+
+class AsyncSimpleLoginFlow(AsyncFlow):
+    """简单登录流程（异步）- 只执行登录操作"""
+
+    async def execute(self, username: str | None = None, password: str | None = None,
+                      verification_code: str | None = None) -> dict[str, object]:
+        """
+        执行简单登录流程（见SimpleLoginFlow.execute）
+
+        Returns:
+            登录结果，包含token
+        """
+        result = {"success": False, "token": None, "error": None}
+        try:
+            if username is None or password is None:
+                username, password = utils.get_random_user_credentials()
+            logger.info("用户登录: %s", username)
+            token = await self.auth.login(username, password, verification_code)
+            if token:
+                result["success"] = True
+                result["token"] = token
+            else:
+                result["error"] = "登录失败，未获取到token"
+        except Exception as e:
+            logger.error("登录失败: %s", e, exc_info=True)
+            result["error"] = str(e)
+        return result
+
+
+class AsyncBookingFlow(AsyncFlow):
+    """订票流程（异步）- 查票 -> 登录（复用会话缓存） -> 获取联系人 -> 订票"""
+
+    async def execute(
+        self,
+        start: str | None = None,
+        end: str | None = None,
+        date: str | None = None,
+        username: str | None = None,
+        password: str | None = None,
+        seat_type: str | None = None,
+        assurance: str | None = None,
+        food_type: int | None = None
+    ) -> dict[str, object]:
+        """
+        执行订票流程（见BookingFlow.execute）
+
+        Returns:
+            订票结果
+        """
+        result = {"success": False, "order_id": None, "trip_id": None, "error": None, "timings": self.timings}
+        try:
+            route = choose_route(start, end)
+            if route is None:
+                result["error"] = "无法找到存在的路线"
+                return result
+            start, end = route
+            date = date or utils.get_random_travel_date()
+            logger.info("开始订票流程: %s -> %s, 日期: %s", start, end, date)
+
+            # 根据路线表查询为该站点对提供服务的车次
+            train_types = utils.plan_trip_queries(start, end)
+            query_steps = {}
+            if "high_speed" in train_types:
+                query_steps["query_high_speed"] = lambda: self.travel.query_trips_left(start, end, date)
+            else:
+                metrics.counters.incr("query_planner.skipped.travelservice")
+            if "normal" in train_types:
+                query_steps["query_normal"] = lambda: self.travel.query_trips_left_normal(start, end, date)
+            else:
+                metrics.counters.incr("query_planner.skipped.travel2service")
+            query_results = await self._run_steps(query_steps, {name: check_trips for name in query_steps})
+
+            trips = merge_trips(query_results)
+            if not trips:
+                result["error"] = "未查询到符合条件的车次"
+                return result
+
+            trip_id_str = utils.select_random_trip(trips)
+            if not trip_id_str:
+                result["error"] = "选择车次失败"
+                return result
+
+            with self._step("session") as step:
+                session = await self._get_session(username, password)
+                if session is None:
+                    step.fail("登录失败")
+            if session is None:
+                result["error"] = "登录失败"
+                return result
+            token = session.token
+            account_id = session.user_id
+            if not token or not account_id:
+                result["error"] = "登录成功但无法获取token或用户ID"
+                return result
+
+            async def get_contacts():
+                return session.contacts or await self.contact.get_contacts_by_account(account_id, token)
+
+            reference_results = await self._run_steps({
+                "assurance": lambda: self.travel.get_assurance_types(token),
+                "contacts": get_contacts,
+                "foods": lambda: self.travel.get_all_foods(date, start, end, trip_id_str),
+            })
+
+            assurance = select_assurance(reference_results["assurance"], assurance)
+
+            contacts = reference_results["contacts"]
+            session.contacts = contacts
+            if not contacts:
+                result["error"] = "用户没有联系人信息，无法订票"
+                return result
+            contact_id = select_contact(contacts)
+            if contact_id is None:
+                result["error"] = "联系人ID无效"
+                return result
+
+            seat_type = select_seat_type(seat_type)
+            selected_food_type, food_name, food_price, station_name, store_name = select_food(reference_results["foods"], food_type)
+
+            preserve = self.travel.preserve_ticket if is_high_speed(trip_id_str) else self.travel.preserve_other_ticket
+            with self._step("preserve") as step:
+                preserve_result = await preserve(
+                    account_id=account_id,
+                    contacts_id=contact_id,
+                    trip_id=trip_id_str,
+                    seat_type=seat_type,
+                    date=date,
+                    from_station=start,
+                    to_station=end,
+                    assurance=assurance,
+                    token=token,
+                    food_type=selected_food_type,
+                    food_name=food_name,
+                    food_price=food_price,
+                    station_name=station_name,
+                    store_name=store_name
+                )
+                reason = check_preserve(preserve_result)
+                if reason is not None:
+                    step.fail(reason)
+
+            if reason is None:
+                result["success"] = True
+                result["trip_id"] = trip_id_str
+            else:
+                result["error"] = reason
+                invalidate_rejected_session(session, token, preserve_result)
+        except Exception as e:
+            logger.error("订票流程失败: %s", e, exc_info=True)
+            result["error"] = str(e)
+        return result
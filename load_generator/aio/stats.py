@@ -0,0 +1,340 @@
+"""
+asyncio引擎的请求统计 - 与Locust的统计口径和CSV格式一致
+
+asyncio进程中不能导入locust（导入时会对标准库打gevent补丁），这里按Locust的方式实现统计：
+响应时间按约两位有效数字分桶计数（百分位数由分桶计算），失败按 (方法, 名称, 错误) 归并；
+CSV文件与 locust --csv 输出的 {prefix}_stats.csv、_stats_history.csv、_failures.csv、_exceptions.csv 格式相同，
+可以直接用scripts/compare_backends.py等读取Locust CSV的工具处理
+"""
+import csv
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# 与Locust相同的百分位数
+PERCENTILES_TO_REPORT = [0.50, 0.66, 0.75, 0.80, 0.90, 0.95, 0.98, 0.99, 0.999, 0.9999, 1.0]
+
+# 当前RPS的统计窗口（秒），与Locust相同：最近12秒中去掉最后2秒
+CURRENT_WINDOW = 12
+
+
+def bucket_response_time(response_time: float) -> int:
+    """把响应时间取整为约两位有效数字（与Locust相同）"""
+    if response_time < 100:
+        return round(response_time)
+    if response_time < 1000:
+        return int(round(response_time, -1))
+    if response_time < 10000:
+        return int(round(response_time, -2))
+    return int(round(response_time, -3))
+
+
+def readable_percentiles(percentiles: list[float]) -> list[str]:
+    """百分位数的列名，例如 0.999 -> "99.9%" """
+    return [
+        f"{int(p * 100) if (p * 100).is_integer() else round(100 * p, 6)}%"
+        for p in percentiles
+    ]
+
+
+def parse_error(error: object) -> str:
+    """错误的文本形式（与Locust相同，去掉对象地址）"""
+    text = error if isinstance(error, str) else repr(error)
+    index = text.find("object at 0x")
+    if index < 0:
+        return text
+    start = index + len("object at 0x") - 2
+    end = text.find(">", start)
+    return text if end < 0 else text.replace(text[start:end], "0x....")
+
+
+class StatsEntry:
+    """一个 (方法, 名称) 的统计"""
+
+    def __init__(self, stats: "RequestStats", method: str, name: str):
+        self.stats = stats
+        self.method = method
+        self.name = name
+        self.num_requests = 0
+        self.num_failures = 0
+        self.total_response_time = 0.0
+        self.min_response_time: float | None = None
+        self.max_response_time = 0.0
+        self.total_content_length = 0
+        # 分桶后的响应时间 -> 次数
+        self.response_times: dict[int, int] = defaultdict(int)
+        # 秒级时间戳 -> 请求数/失败数
+        self.num_reqs_per_sec: dict[int, int] = defaultdict(int)
+        self.num_fail_per_sec: dict[int, int] = defaultdict(int)
+
+    def log(self, response_time: float, content_length: int, now: float):
+        self.num_requests += 1
+        self.num_reqs_per_sec[int(now)] += 1
+        self.total_response_time += response_time
+        if self.min_response_time is None or response_time < self.min_response_time:
+            self.min_response_time = response_time
+        if response_time > self.max_response_time:
+            self.max_response_time = response_time
+        self.response_times[bucket_response_time(response_time)] += 1
+        self.total_content_length += content_length
+
+    def log_error(self, now: float):
+        self.num_failures += 1
+        self.num_fail_per_sec[int(now)] += 1
+
+    @property
+    def avg_response_time(self) -> float:
+        return self.total_response_time / self.num_requests if self.num_requests else 0.0
+
+    @property
+    def avg_content_length(self) -> float:
+        return self.total_content_length / self.num_requests if self.num_requests else 0
+
+    def percentile(self, percent: float) -> int:
+        """
+        获取百分位响应时间（与Locust相同的分桶算法）
+
+        Args:
+            percent: 百分位（0~1）
+
+        Returns:
+            响应时间（毫秒）
+        """
+        threshold = int(self.num_requests * percent)
+        processed = 0
+        for response_time in sorted(self.response_times, reverse=True):
+            processed += self.response_times[response_time]
+            if self.num_requests - processed <= threshold:
+                return response_time
+        return 0
+
+    @property
+    def median_response_time(self) -> float:
+        if not self.response_times:
+            return 0
+        median = self.percentile(0.5)
+        # 分桶只有两位有效数字，中位数不应超出实际的最小/最大值
+        return min(max(median, self.min_response_time or 0), self.max_response_time)
+
+    @property
+    def total_rps(self) -> float:
+        duration = self.stats.last_request_timestamp - self.stats.start_time
+        return self.num_requests / duration if duration > 0 else 0.0
+
+    @property
+    def total_fail_per_sec(self) -> float:
+        duration = self.stats.last_request_timestamp - self.stats.start_time
+        return self.num_failures / duration if duration > 0 else 0.0
+
+    def _current(self, per_sec: dict[int, int]) -> float:
+        last = int(self.stats.last_request_timestamp)
+        start = max(last - CURRENT_WINDOW, int(self.stats.start_time))
+        seconds = range(start, last - 2)
+        return sum(per_sec.get(t, 0) for t in seconds) / max(len(seconds), 1)
+
+    @property
+    def current_rps(self) -> float:
+        return self._current(self.num_reqs_per_sec)
+
+    @property
+    def current_fail_per_sec(self) -> float:
+        return self._current(self.num_fail_per_sec)
+
+
+class StatsError:
+    """按 (方法, 名称, 错误) 归并的失败"""
+
+    def __init__(self, method: str, name: str, error: str):
+        self.method = method
+        self.name = name
+        self.error = error
+        self.occurrences = 0
+        self.first_seen: float | None = None
+        self.last_seen: float | None = None
+
+    def occurred(self, now: float):
+        self.occurrences += 1
+        if self.first_seen is None:
+            self.first_seen = now
+        self.last_seen = now
+
+
+class RequestStats:
+    """进程内的全部请求统计"""
+
+    def __init__(self):
+        self.entries: dict[tuple[str, str], StatsEntry] = {}
+        self.total = StatsEntry(self, "", "Aggregated")
+        self.errors: dict[tuple[str, str, str], StatsError] = {}
+        # 未处理的异常：消息 -> {"count", "msg", "traceback"}
+        self.exceptions: dict[str, dict[str, object]] = {}
+        self.start_time = time.time()
+        self.last_request_timestamp = self.start_time
+
+    def log_request(self, method: str, name: str, response_time: float, content_length: int):
+        """
+        记录一个请求（成功和失败的请求都要记录）
+
+        Args:
+            method: 请求类型（GET/POST或FLOW、STEP等合成请求类型）
+            name: 统计名称
+            response_time: 响应时间（毫秒）
+            content_length: 响应长度
+        """
+        now = time.time()
+        self.last_request_timestamp = now
+        entry = self.entries.get((name, method))
+        if entry is None:
+            entry = self.entries[(name, method)] = StatsEntry(self, method, name)
+        entry.log(response_time, content_length, now)
+        self.total.log(response_time, content_length, now)
+
+    def log_error(self, method: str, name: str, error: object):
+        """
+        记录一个失败（在log_request之外调用，与Locust相同）
+
+        Args:
+            method: 请求类型
+            name: 统计名称
+            error: 失败原因
+        """
+        now = time.time()
+        self.entries[(name, method)].log_error(now)
+        self.total.log_error(now)
+        text = parse_error(error)
+        key = (method, name, text)
+        stats_error = self.errors.get(key)
+        if stats_error is None:
+            stats_error = self.errors[key] = StatsError(method, name, text)
+        stats_error.occurred(now)
+
+    def log_exception(self, message: str, traceback_text: str):
+        """
+        记录虚拟用户中未处理的异常（对应Locust的 _exceptions.csv）
+
+        Args:
+            message: 异常消息
+            traceback_text: 异常堆栈
+        """
+        entry = self.exceptions.setdefault(message, {"count": 0, "msg": message, "traceback": traceback_text})
+        entry["count"] += 1
+
+    def sorted_entries(self) -> list[StatsEntry]:
+        """按 (名称, 方法) 排序的统计条目（与Locust的CSV顺序相同）"""
+        return [self.entries[key] for key in sorted(self.entries)]
+
+
+def _format_utc(timestamp: float | None) -> str:
+    if timestamp is None:
+        return ""
+    return datetime.fromtimestamp(int(timestamp), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class StatsCSVWriter:
+    """按Locust的 --csv 格式输出统计"""
+
+    REQUESTS_COLUMNS = [
+        "Type", "Name", "Request Count", "Failure Count", "Median Response Time", "Average Response Time",
+        "Min Response Time", "Max Response Time", "Average Content Size", "Requests/s", "Failures/s",
+        *readable_percentiles(PERCENTILES_TO_REPORT),
+    ]
+    HISTORY_COLUMNS = [
+        "Timestamp", "User Count", "Type", "Name", "Requests/s", "Failures/s",
+        *readable_percentiles(PERCENTILES_TO_REPORT),
+        "Total Request Count", "Total Failure Count", "Total Median Response Time", "Total Average Response Time",
+        "Total Min Response Time", "Total Max Response Time", "Total Average Content Size",
+    ]
+    FAILURES_COLUMNS = ["Method", "Name", "Error", "Occurrences", "First Seen", "Last Seen"]
+    EXCEPTIONS_COLUMNS = ["Count", "Message", "Traceback", "Nodes"]
+
+    def __init__(self, stats: RequestStats, base_filepath: str):
+        """
+        Args:
+            stats: 请求统计
+            base_filepath: CSV文件前缀（与locust --csv相同）
+        """
+        self.stats = stats
+        self.base_filepath = base_filepath
+        self._history_file = open(f"{base_filepath}_stats_history.csv", "w", newline="")
+        self._history = csv.writer(self._history_file)
+        self._history.writerow(self.HISTORY_COLUMNS)
+
+    def _percentiles(self, entry: StatsEntry) -> list[object]:
+        if not entry.num_requests:
+            return ["N/A"] * len(PERCENTILES_TO_REPORT)
+        return [entry.percentile(p) for p in PERCENTILES_TO_REPORT]
+
+    def write_history(self, user_count: int):
+        """
+        追加一行当前的汇总统计到 _stats_history.csv（每秒调用一次）
+
+        Args:
+            user_count: 当前虚拟用户数
+        """
+        total = self.stats.total
+        self._history.writerow([
+            int(time.time()), user_count, "", total.name,
+            f"{total.current_rps:2f}", f"{total.current_fail_per_sec:2f}",
+            *self._percentiles(total),
+            total.num_requests, total.num_failures, total.median_response_time, total.avg_response_time,
+            total.min_response_time or 0, total.max_response_time, total.avg_content_length,
+        ])
+        self._history_file.flush()
+
+    def write_final(self):
+        """写出 _stats.csv、_failures.csv 和 _exceptions.csv，并关闭 _stats_history.csv"""
+        with open(f"{self.base_filepath}_stats.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.REQUESTS_COLUMNS)
+            for entry in [*self.stats.sorted_entries(), self.stats.total]:
+                writer.writerow([
+                    entry.method, entry.name, entry.num_requests, entry.num_failures,
+                    entry.median_response_time, entry.avg_response_time, entry.min_response_time or 0,
+                    entry.max_response_time, entry.avg_content_length, entry.total_rps, entry.total_fail_per_sec,
+                    *self._percentiles(entry),
+                ])
+
+        with open(f"{self.base_filepath}_failures.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.FAILURES_COLUMNS)
+            for key in sorted(self.stats.errors):
+                error = self.stats.errors[key]
+                writer.writerow([
+                    error.method, error.name, error.error, error.occurrences,
+                    _format_utc(error.first_seen), _format_utc(error.last_seen),
+                ])
+
+        with open(f"{self.base_filepath}_exceptions.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.EXCEPTIONS_COLUMNS)
+            for exception in self.stats.exceptions.values():
+                writer.writerow([exception["count"], exception["msg"], exception["traceback"], "local"])
+
+        self._history_file.close()
+
+
+def format_table(stats: RequestStats) -> str:
+    """
+    把统计格式化为与Locust控制台输出相同的表格
+
+    Args:
+        stats: 请求统计
+
+    Returns:
+        表格文本
+    """
+    lines = [
+        "%-8s %-84s %7s %12s |%7s %7s %7s%7s | %7s %11s" % (
+            "Type", "Name", "# reqs", "# fails", "Avg", "Min", "Max", "Med", "req/s", "failures/s"),
+        "-" * 160,
+    ]
+    for entry in [*stats.sorted_entries(), stats.total]:
+        if entry is stats.total:
+            lines.append("-" * 160)
+        ratio = entry.num_failures / entry.num_requests * 100 if entry.num_requests else 0.0
+        lines.append("%-8s %-84s %7d %12s |%7d %7d %7d%7d | %7.2f %11.2f" % (
+            entry.method, entry.name, entry.num_requests, f"{entry.num_failures}({ratio:.2f}%)",
+            entry.avg_response_time, entry.min_response_time or 0, entry.max_response_time,
+            entry.median_response_time, entry.total_rps, entry.total_fail_per_sec,
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""
+asyncio引擎的传输层 - 基于aiohttp，接口与action.Transport一致
+
+所有虚拟用户共享一个aiohttp.ClientSession（一个连接池），每个请求的响应时间、长度和业务结果
+记录到aio.stats.RequestStats中，统计口径与Locust相同：响应时间包括读取完整响应体
+
+按接口分组的超时和keep-alive设置与Locust路径相同（action/connections.py）；连接池由所有虚拟用户共享，
+分组的pool_size、max_reuse和连接抖动模式不适用
+"""
+import asyncio
+import time
+from typing import Callable, TypeVar
+import config
+from action import connections
+from action.transport import TransportResponse
+from .stats import RequestStats
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+T = TypeVar("T")
+
+
+class RawResponse:
+    """读取完毕的响应，提供TransportResponse需要的属性"""
+
+    __slots__ = ("status_code", "content", "error")
+
+    def __init__(self, status_code: int, content: bytes, error: Exception | None = None):
+        self.status_code = status_code
+        self.content = content
+        self.error = error
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+class AsyncTransport:
+    """asyncio的HTTP传输适配器，所有异步Action通过它发送请求"""
+
+    def __init__(self, session: "aiohttp.ClientSession", base_url: str, stats: RequestStats):
+        """
+        初始化传输适配器
+
+        Args:
+            session: 共享的aiohttp会话
+            base_url: 被测系统地址
+            stats: 请求统计
+        """
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        # 分组 -> (超时, 是否keep-alive)
+        self._group_options: dict[str, tuple["aiohttp.ClientTimeout", bool]] = {}
+
+    def _options(self, endpoint: str) -> tuple["aiohttp.ClientTimeout", bool]:
+        """请求路径所属分组的超时和keep-alive设置"""
+        group = connections.group_of(endpoint)
+        options = self._group_options.get(group)
+        if options is None:
+            settings = connections.settings_of(group)
+            timeout = aiohttp.ClientTimeout(connect=settings["connect_timeout"], sock_read=settings["read_timeout"])
+            options = self._group_options[group] = (timeout, bool(settings["keep_alive"]))
+        return options
+
+    async def checked_request(
+        self,
+        method: str,
+        endpoint: str,
+        check: Callable[[TransportResponse], tuple[T, Exception | None]],
+        json_data: dict[str, object] | None = None,
+        params: dict[str, object] | None = None,
+        name: str | None = None,
+        headers: dict[str, str] | None = None
+    ) -> T:
+        """
+        发送HTTP请求，由调用方根据响应内容判断是否成功（与Transport.checked_request相同）
+
+        Args:
+            method: HTTP方法（GET/POST/PUT/DELETE）
+            endpoint: API端点路径
+            check: 接收响应，返回 (结果, 失败原因)，失败原因为None表示成功
+            json_data: 请求体JSON数据（可选）
+            params: URL参数（可选）
+            name: 统计名称（如果为None，使用endpoint）
+            headers: 请求头（可选）
+
+        Returns:
+            check返回的结果
+        """
+        name = name or endpoint
+        timeout, keep_alive = self._options(endpoint)
+        if not keep_alive:
+            headers = {**(headers or {}), "Connection": "close"}
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, self.base_url + endpoint, json=json_data, params=params,
+                                            headers=headers, timeout=timeout) as response:
+                content = await response.read()
+            raw = RawResponse(response.status, content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raw = RawResponse(0, b"", e)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        response = TransportResponse(raw, elapsed)
+        try:
+            result, failure = check(response)
+        except Exception as e:
+            self.stats.log_request(method, name, elapsed, len(raw.content))
+            self.stats.log_error(method, name, e)
+            raise
+        self.stats.log_request(method, name, elapsed, len(raw.content))
+        if failure is not None:
+            self.stats.log_error(method, name, failure)
+        return result
+
+    def fire_request_event(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int = 0,
+        exception: Exception | None = None,
+        start_time: float | None = None
+    ):
+        """
+        记录一个合成请求（流程级、步骤级等非HTTP统计），参数与Transport.fire_request_event相同
+
+        Args:
+            request_type: 统计中的请求类型，例如"FLOW"、"STEP"
+            name: 统计名称
+            response_time: 耗时（毫秒）
+            response_length: 长度（可选）
+            exception: 失败原因（可选，为None表示成功）
+            start_time: 开始时间（Unix时间戳，可选，不使用）
+        """
+        self.stats.log_request(request_type, name, response_time, response_length)
+        if exception is not None:
+            self.stats.log_error(request_type, name, exception)
+
+
+def create_session(connection_limit: int) -> "aiohttp.ClientSession":
+    """
+    创建所有虚拟用户共享的aiohttp会话（必须在事件循环中调用）
+
+    Args:
+        connection_limit: 连接池的最大连接数，0表示不限制
+
+    Returns:
+        aiohttp会话
+
+    Raises:
+        RuntimeError: 没有安装aiohttp
+    """
+    if aiohttp is None:
+        raise RuntimeError("asyncio引擎需要aiohttp，请先安装: pip install aiohttp")
+    connector = aiohttp.TCPConnector(limit=connection_limit, limit_per_host=0, ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=config.DEFAULT_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT),
+        # 不同虚拟用户的token通过请求头传递，不需要cookie
+        cookie_jar=aiohttp.DummyCookieJar(),
+    )
@@ -0,0 +1,107 @@
+"""
+开环到达调度器 - 按到达过程（泊松或固定速率）启动流程，与被测系统的响应时间无关
+
+闭环模型（wait_time = between(1, 3)）中，系统变慢时用户发出的请求也随之变少，报告的延迟偏乐观；
+开环模型中每种流程按目标速率到达，到达时刻只由到达过程决定。
+同时在执行中的流程数由有界协程池限制，池满时的到达按配置丢弃或延迟，并分别计数
+"""
+import logging
+import random
+import time
+from typing import Callable
+import gevent
+from gevent.pool import Pool
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ArrivalScheduler:
+    """按到达过程启动流程的开环调度器"""
+
+    def __init__(
+        self,
+        rates: dict[str, float],
+        launch: Callable[[str, float], object],
+        max_in_flight: int,
+        process: str = "poisson",
+        overflow: str = "drop"
+    ):
+        """
+        初始化调度器
+
+        Args:
+            rates: 流程名称到目标到达速率（次/秒）的映射，速率不大于0的流程不启动
+            launch: 启动流程的函数，参数为流程名称和计划到达时刻（time.monotonic()时间）
+            max_in_flight: 同时执行中的流程数上限
+            process: 到达过程，"poisson"（指数分布间隔）或"fixed"（固定间隔）
+            overflow: 池满时的处理方式，"drop"丢弃该次到达，"delay"等待空位后再启动
+        """
+        self.rates = {name: rate for name, rate in rates.items() if rate > 0}
+        self.launch = launch
+        self.process = process
+        self.overflow = overflow
+        self.pool = Pool(max_in_flight)
+        self._generators: list[gevent.Greenlet] = []
+
+    def run(self):
+        """为每种流程启动一个到达生成协程，阻塞直到调度器被停止"""
+        self._generators = [gevent.spawn(self._generate, name, rate) for name, rate in self.rates.items()]
+        try:
+            gevent.joinall(self._generators, raise_error=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止到达生成，并结束所有执行中的流程"""
+        gevent.killall(self._generators)
+        self.pool.kill()
+
+    def _next_interval(self, rate: float) -> float:
+        """
+        计算到下一次到达的间隔
+
+        Args:
+            rate: 到达速率（次/秒）
+
+        Returns:
+            间隔（秒）
+        """
+        if self.process == "fixed":
+            return 1.0 / rate
+        return random.expovariate(rate)
+
+    def _generate(self, flow_name: str, rate: float):
+        """
+        按到达过程不断产生到达
+
+        下一次到达时刻只由上一次计划到达时刻和到达间隔决定，与流程执行耗时无关
+
+        Args:
+            flow_name: 流程名称
+            rate: 到达速率（次/秒）
+        """
+        next_arrival = time.monotonic()
+        while True:
+            next_arrival += self._next_interval(rate)
+            delay = next_arrival - time.monotonic()
+            if delay > 0:
+                gevent.sleep(delay)
+            self._arrive(flow_name, next_arrival)
+
+    def _arrive(self, flow_name: str, intended_time: float):
+        """
+        处理一次到达：有空位时立即启动流程，池满时丢弃或等待
+
+        Args:
+            flow_name: 流程名称
+            intended_time: 计划到达时刻（time.monotonic()时间）
+        """
+        metrics.counters.incr(f"open_loop.arrivals.{flow_name}")
+        if self.pool.full():
+            if self.overflow == "drop":
+                metrics.counters.incr(f"open_loop.dropped.{flow_name}")
+                return
+            metrics.counters.incr(f"open_loop.delayed.{flow_name}")
+            self.pool.wait_available()
+        self.pool.spawn(self.launch, flow_name, intended_time)
@@ -0,0 +1,172 @@
+"""
+参考数据缓存模块 - 进程内共享的TTL+LRU缓存
+
+用于缓存运行期间几乎不变的参考数据（保险类型、食物菜单、联系人），
+每个Action方法按config.REFERENCE_CACHE单独开启，命中/未命中/淘汰次数记录在自定义指标中；
+开启config.CACHE_STATS_ENABLED时每次查找另外以"CACHE"合成请求上报，在Locust统计中直接显示命中率
+"""
+import functools
+import inspect
+import time
+from collections import OrderedDict
+from typing import Callable
+import config
+import metrics
+
+
+class CacheMiss(Exception):
+    """缓存未命中，作为"CACHE"合成请求的失败原因上报（不是错误，失败比例即未命中率）"""
+
+
+class TTLCache:
+    """带过期时间和最大容量（LRU淘汰）的缓存"""
+
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        """
+        初始化缓存
+
+        Args:
+            name: 缓存名称，用于指标命名
+            ttl: 缓存条目的有效时间（秒）
+            max_entries: 最大条目数，超过时淘汰最久未使用的条目
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+
+    def lookup(self, key: tuple) -> tuple[bool, object]:
+        """
+        查找缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 缓存值) 元组，未命中时缓存值为None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                metrics.counters.incr(f"cache.{self.name}.hits")
+                return True, value
+            del self._entries[key]
+        metrics.counters.incr(f"cache.{self.name}.misses")
+        return False, None
+
+    def store(self, key: tuple, value: object):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.counters.incr(f"cache.{self.name}.evictions")
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 进程内共享的缓存实例，按名称懒加载
+_caches: dict[str, TTLCache] = {}
+
+
+def get_cache(name: str) -> TTLCache | None:
+    """
+    获取指定名称的缓存
+
+    Args:
+        name: 缓存名称（config.REFERENCE_CACHE中的键）
+
+    Returns:
+        缓存实例，如果该缓存未开启则返回None
+    """
+    cache = _caches.get(name)
+    if cache is not None:
+        return cache
+    settings = config.REFERENCE_CACHE.get(name)
+    if not settings or not settings.get("enabled"):
+        return None
+    cache = TTLCache(name, settings["ttl"], settings["max_entries"])
+    _caches[name] = cache
+    return cache
+
+
+def _report(action, name: str, hit: bool, start: float):
+    """
+    开启config.CACHE_STATS_ENABLED时，把一次缓存查找以"CACHE"合成请求上报
+
+    Args:
+        action: 被装饰方法所属的Action（通过其transport上报）
+        name: 缓存名称（统计名称）
+        hit: 是否命中
+        start: 查找开始时刻（time.perf_counter()）
+    """
+    if config.CACHE_STATS_ENABLED:
+        action.transport.fire_request_event(
+            "CACHE",
+            name,
+            (time.perf_counter() - start) * 1000,
+            exception=None if hit else CacheMiss("未命中")
+        )
+
+
+def cached(name: str, key: Callable[..., tuple]):
+    """
+    为Action方法开启缓存的装饰器（只有config.REFERENCE_CACHE中开启了该缓存时才生效）
+
+    空结果（请求失败）不会被缓存；被装饰的方法是协程函数时返回协程函数
+
+    Args:
+        name: 缓存名称（config.REFERENCE_CACHE中的键）
+        key: 根据方法参数生成缓存键的函数，参数名与被装饰方法一致（不含self）
+
+    Returns:
+        装饰器
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            # asyncio引擎的Action方法（见aio/actions.py）
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                cache = get_cache(name)
+                if cache is None:
+                    return await method(self, *args, **kwargs)
+                start = time.perf_counter()
+                cache_key = key(*args, **kwargs)
+                hit, value = cache.lookup(cache_key)
+                if not hit:
+                    value = await method(self, *args, **kwargs)
+                    if value:
+                        cache.store(cache_key, value)
+                _report(self, name, hit, start)
+                return value
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = get_cache(name)
+            if cache is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            cache_key = key(*args, **kwargs)
+            hit, value = cache.lookup(cache_key)
+            if not hit:
+                value = method(self, *args, **kwargs)
+                if value:
+                    cache.store(cache_key, value)
+            _report(self, name, hit, start)
+            return value
+        return wrapper
+    return decorator
@@ -16,6 +16,64 @@ BASE_URL = os.getenv("TRAINTICKET_BASE_URL", "http://10.10.1.98:32677")
 # 请求超时时间（秒）
 REQUEST_TIMEOUT = 30
 
+# Locust HTTP客户端后端："requests"使用HttpUser（默认），"fasthttp"使用FastHttpUser（geventhttpclient）
+HTTP_BACKEND = os.getenv("LOCUST_HTTP_BACKEND", "requests")
+
+# Flow内部相互独立步骤的执行方式："sequential"逐个执行（模拟一次只发一个请求的浏览器），
+# "concurrent"使用gevent协程组并发执行
+FLOW_EXECUTION_MODE = os.getenv("FLOW_EXECUTION_MODE", "sequential")
+
+# 负载模型："closed"为闭环（每个用户执行完一个流程后等待1~3秒再执行下一个）；
+# "open"为开环（按到达过程启动流程，与响应时间无关，见arrival.py）；
+# "replay"为回放录制的请求追踪（见replay.py）
+LOAD_MODEL = os.getenv("LOAD_MODEL", "closed")
+
+# 开环模式下每个开环用户每种流程的目标到达速率（次/秒），总速率 = 速率 × 开环用户数（-u）
+OPEN_LOOP_RATES: Dict[str, float] = {
+    "simple_query": 3.0,
+    "simple_login": 1.0,
+    "booking": 2.0,
+    # 注册流程（每次注册REGISTER_BATCH_SIZE个用户），默认不启动
+    "register": 0.0,
+}
+
+# 开环模式的到达过程："poisson"（指数分布间隔）或"fixed"（固定间隔）
+OPEN_LOOP_PROCESS = os.getenv("OPEN_LOOP_PROCESS", "poisson")
+
+# 开环模式下每个开环用户同时执行中的流程数上限
+OPEN_LOOP_MAX_IN_FLIGHT = int(os.getenv("OPEN_LOOP_MAX_IN_FLIGHT", "100"))
+
+# 开环模式下执行中的流程数达到上限时的处理方式："drop"丢弃该次到达，"delay"等待空位后再启动
+OPEN_LOOP_OVERFLOW = os.getenv("OPEN_LOOP_OVERFLOW", "drop")
+
+# 负载曲线配置文件（YAML或JSON，见load_shape.py），设置后用户数、启动速率和流程权重由负载曲线控制，
+# 为空时用户数由命令行 -u/-r 指定
+LOAD_SHAPE_PROFILE = os.getenv("LOAD_SHAPE_PROFILE", "")
+
+# 是否把流程级（FLOW）和步骤级（STEP）耗时作为合成请求上报到Locust统计
+FLOW_STATS_ENABLED = os.getenv("FLOW_STATS", "1") == "1"
+
+# 是否把每次响应解码的耗时作为"DECODE"合成请求上报（统计名称与对应请求相同）；
+# 关闭时解码耗时只累计在自定义指标 decode.ms 中，两种情况下都不计入请求的响应时间
+DECODE_STATS_ENABLED = os.getenv("DECODE_STATS", "0") == "1"
+
+# 是否把参考数据缓存（cache.py）的每次查找作为"CACHE"合成请求上报（统计名称为缓存名称，耗时为包括未命中时请求在内的调用耗时）；
+# 未命中上报为失败，Locust统计中该行的失败比例即未命中率（也会计入汇总行的失败数和Locust的退出码，因此默认关闭）
+CACHE_STATS_ENABLED = os.getenv("CACHE_STATS", "0") == "1"
+
+# 是否把业务成功的订票、查票等请求另外作为"GOODPUT"合成请求上报（统计名称为GOODPUT_ENDPOINTS中的分组），
+# 该行的RPS即每秒成功的订票数、查票数；请求本身总是按业务结果（action/outcome.py）标记成功或失败
+GOODPUT_STATS_ENABLED = os.getenv("GOODPUT_STATS", "1") == "1"
+
+# 计入goodput的接口及其分组: {接口路径: 分组}
+GOODPUT_ENDPOINTS = {
+    "/api/v1/preserveservice/preserve": "booking",
+    "/api/v1/preserveotherservice/preserveOther": "booking",
+    "/api/v1/travelservice/trips/left": "query",
+    "/api/v1/travel2service/trips/left": "query",
+    "/api/v1/users/login": "login",
+}
+
 # 默认请求头
 DEFAULT_HEADERS = {
     "Content-Type": "application/json",
@@ -23,15 +81,159 @@ DEFAULT_HEADERS = {
 }
 
 
+# ============================================================================
+# 日志配置
+# ============================================================================
+
+# 日志模式："plain"为普通文本日志；"async_json"为异步结构化JSON日志（后台线程写出，支持采样）
+LOG_MODE = os.getenv("LOG_MODE", "plain")
+
+# 日志级别
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# async_json模式下的日志文件路径，为空时写入stderr
+LOG_FILE = os.getenv("LOG_FILE", "")
+
+# async_json模式下INFO及以下级别日志的默认采样率（0~1），WARNING及以上总是输出
+LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+# 按流程配置的采样率，覆盖默认采样率；流程中的所有日志（包括Action等模块的日志）按所属流程采样
+# 格式: {Flow类名: 采样率}，例如 {"BookingFlow": 0.01, "SimpleQueryFlow": 0.001}
+# 流程之外的日志按logger名称查找，键也可以是logger名称，例如 {"replay": 0.1}
+LOG_SAMPLING: Dict[str, float] = {}
+
+
+# ============================================================================
+# 请求追踪记录配置
+# ============================================================================
+
+# 是否把每个请求记录到追踪文件（recorder.py）
+RECORDER_ENABLED = os.getenv("RECORDER", "0") == "1"
+
+# 追踪文件输出目录（每个进程写自己的文件）
+RECORDER_DIR = os.getenv("RECORDER_DIR", "traces")
+
+# 单个追踪文件的大小上限（MB），超过后轮转到新文件
+RECORDER_MAX_FILE_MB = int(os.getenv("RECORDER_MAX_FILE_MB", "256"))
+
+# 每个进程最多保留的追踪文件数，超过时删除最旧的文件，0表示不限制
+RECORDER_MAX_FILES = int(os.getenv("RECORDER_MAX_FILES", "0"))
+
+# 写缓冲区达到该字节数时写盘
+RECORDER_FLUSH_BYTES = 64 * 1024
+
+# 距离上次写盘超过该时间（秒）时写盘
+RECORDER_FLUSH_INTERVAL = 1.0
+
+
+# ============================================================================
+# 连接配置（按接口分组的超时、连接池、keep-alive，见action/connections.py）
+# ============================================================================
+
+# 接口分组: {服务路径前缀: 分组}，未列出的服务属于"default"分组
+CONNECTION_GROUPS: Dict[str, str] = {
+    "/api/v1/users": "auth",
+    "/api/v1/adminuserservice": "auth",
+    "/api/v1/travelservice": "query",
+    "/api/v1/travel2service": "query",
+    "/api/v1/preserveservice": "booking",
+    "/api/v1/preserveotherservice": "booking",
+}
+
+# 各分组的连接设置，分组中没有的项使用"default"中的值：
+#   connect_timeout: 建立连接的超时（秒）
+#   read_timeout: 等待响应数据的超时（秒）
+#   pool_size: 每个虚拟用户在该分组上的最大连接数（fasthttp后端的请求超过时排队等待连接）
+#   keep_alive: 是否复用连接，False时每个请求结束后关闭该请求使用的连接（请求头带 Connection: close）
+#   max_reuse: 每发送多少个请求关闭一次连接（第max_reuse个请求关闭它使用的连接），0表示不限制；
+#              按分组计数，分组的请求依次发送时即一个连接最多发送的请求数
+# "default"使用虚拟用户自己的客户端；这里单独配置了的分组（例如
+# "booking": {"read_timeout": 60.0, "keep_alive": False}）每个虚拟用户使用独立的连接池
+CONNECTION_SETTINGS: Dict[str, Dict[str, object]] = {
+    "default": {
+        "connect_timeout": 10.0,
+        "read_timeout": float(REQUEST_TIMEOUT),
+        "pool_size": 10,
+        "keep_alive": True,
+        "max_reuse": 0,
+    },
+}
+
+# 连接抖动模式：每个流程使用自己新建的连接，流程结束后关闭，不影响同一虚拟用户并发执行的其他流程，
+# 模拟大量不同的客户端经过Ingress/NodePort（新建连接的次数记录在自定义指标 connections.churn 中）
+CONNECTION_CHURN = os.getenv("CONNECTION_CHURN", "0") == "1"
+
+
+# ============================================================================
+# 追踪回放配置（LOAD_MODEL=replay）
+# ============================================================================
+
+# 要回放的追踪：recorder.py输出的追踪文件或目录，或访问日志（combined格式，支持.gz）
+REPLAY_TRACE = os.getenv("REPLAY_TRACE", "traces")
+
+# 回放速度倍数（0.5~20），保持原始请求间隔按该倍数缩放，2表示以两倍速回放
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1.0"))
+
+# 同时存在的回放通道（原始用户）数上限，达到上限时新用户的请求等待空闲通道
+REPLAY_MAX_LANES = int(os.getenv("REPLAY_MAX_LANES", "1000"))
+
+# 每个回放通道排队等待发送的请求数上限，超过时读取追踪暂停（内存占用有界）
+REPLAY_LANE_QUEUE = 100
+
+# 回放通道空闲超过该时间（秒）后结束，释放通道
+REPLAY_LANE_IDLE_TIMEOUT = 30.0
+
+
+# ============================================================================
+# asyncio引擎配置（python -m aio，见aio/engine.py）
+# ============================================================================
+
+# 所有虚拟用户共享的连接池的最大连接数，0表示不限制（同时执行中的请求各占一个连接，
+# 限制过小时请求会在客户端排队，排队时间计入响应时间）
+AIO_CONNECTION_LIMIT = int(os.getenv("AIO_CONNECTION_LIMIT", "0"))
+
+# 虚拟用户的流程权重（与locustfile中 @task 的权重相同）
+AIO_FLOW_WEIGHTS: Dict[str, int] = {
+    "simple_query": 3,
+    "simple_login": 1,
+    "booking": 2,
+}
+
+# 虚拟用户执行完一个流程后的等待时间范围（秒，与 wait_time = between(1, 3) 相同）
+AIO_WAIT_TIME = (1.0, 3.0)
+
+
+# ============================================================================
+# HDR延迟直方图配置
+# ============================================================================
+
+# 闭环用户流程（FLOW）的预期间隔（毫秒），用于协调遗漏修正：
+# 流程延迟超过该间隔时，补记停顿期间本应发生的流程采样；单个请求和步骤不修正
+# 未设置时取闭环用户类wait_time的均值（between(1, 3)即2000）；设为0表示不修正
+# 开环模式下的流程按计划到达时刻修正，不使用该值
+_hdr_expected_interval = os.getenv("HDR_EXPECTED_INTERVAL_MS", "")
+HDR_EXPECTED_INTERVAL_MS = float(_hdr_expected_interval) if _hdr_expected_interval else None
+
+# 无头模式（没有Web UI）下提供 /hdr 实时报告接口的端口，0表示不启动
+HDR_HTTP_PORT = int(os.getenv("HDR_HTTP_PORT", "0"))
+
+
 # ============================================================================
 # API端点配置
 # ============================================================================
 
+# 路径模板中的 {参数} 匹配一个路径段，BaseAction以匹配的模板作为Locust统计名称（见action/endpoints.py）
 API_ENDPOINTS = {
     # 认证服务
     "auth": {
         "login": "/api/v1/users/login",
         "register": "/api/v1/auth",
+        "get_all_users": "/api/v1/users",
+    },
+    # 管理员用户服务
+    "admin_user": {
+        "register": "/api/v1/adminuserservice/users",
+        "delete": "/api/v1/adminuserservice/users/{userId}",
     },
     # 旅行服务 - G/D列车
     "travel": {
@@ -75,6 +277,15 @@ API_ENDPOINTS = {
     "contact": {
         "get_by_id": "/api/v1/contactservice/contacts/{id}",
         "get_by_account": "/api/v1/contactservice/contacts/account/{accountId}",
+        "create": "/api/v1/contactservice/contacts",
+    },
+    # 保险服务
+    "assurance": {
+        "types": "/api/v1/assuranceservice/assurances/types",
+    },
+    # 食物服务
+    "food": {
+        "get_all": "/api/v1/foodservice/foods/{date}/{startStation}/{endStation}/{tripId}",
     },
     # 路线服务
     "route": {
@@ -84,6 +295,39 @@ API_ENDPOINTS = {
 }
 
 
+# ============================================================================
+# 参考数据缓存配置
+# ============================================================================
+
+# 开启缓存的参考数据（逗号分隔），例如 "assurance_types,foods,contacts"，"all"表示全部开启
+# 全部开启后，订票流程在缓存预热后只剩下查票和订票请求（"只写订票"实验）
+_REFERENCE_CACHE_ENABLED = os.getenv("REFERENCE_CACHE", "")
+
+# 每个Action方法的缓存配置：ttl为有效时间（秒），max_entries为最大条目数（超过时LRU淘汰）
+REFERENCE_CACHE = {
+    # TravelAction.get_assurance_types
+    "assurance_types": {"ttl": 600, "max_entries": 1},
+    # TravelAction.get_all_foods，按 (日期, 起点站, 终点站, 车次) 缓存
+    "foods": {"ttl": 300, "max_entries": 4096},
+    # ContactAction.get_contacts_by_account，按账户ID缓存
+    "contacts": {"ttl": 300, "max_entries": 10000},
+}
+for _name, _settings in REFERENCE_CACHE.items():
+    _settings["enabled"] = _REFERENCE_CACHE_ENABLED == "all" or _name in _REFERENCE_CACHE_ENABLED.split(",")
+
+
+# ============================================================================
+# 合成数据池配置
+# ============================================================================
+
+# 是否使用预先批量生成的合成数据（身份证号、用户名、邮箱、旅行日期、车站，见payload_pool.py）
+# 关闭时每次调用都用random模块现场生成
+PAYLOAD_POOL_ENABLED = os.getenv("PAYLOAD_POOL", "1") == "1"
+
+# 每种合成数据每批生成的数量，用到一半时在后台生成下一批
+PAYLOAD_POOL_SIZE = int(os.getenv("PAYLOAD_POOL_SIZE", "8192"))
+
+
 # ============================================================================
 # 认证模块配置
 # ============================================================================
@@ -94,10 +338,24 @@ DEFAULT_USERS = [
     # 可以添加更多测试用户
 ]
 
+# 测试账号池文件（JSONL，由 scripts/provision_users.py 批量注册生成，每行一个账号）
+# 文件存在时虚拟用户从账号池中选择账号，不存在时使用DEFAULT_USERS
+USER_POOL_FILE = os.getenv("USER_POOL_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_pool.jsonl"))
+
 # 管理员账号（用于注册等需要管理员权限的操作）
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "222222")
 
+# 注册流程每次注册的用户数：1为单个注册（SimpleRegisterFlow），大于1时在同一个keep-alive连接上
+# 连续发送多个注册请求（BatchRegisterFlow）；管理员token在进程内共享，过期前才重新登录
+REGISTER_BATCH_SIZE = int(os.getenv("REGISTER_BATCH_SIZE", "1"))
+
+# 会话缓存：在JWT过期前多少秒主动刷新token（重新登录）
+SESSION_REFRESH_MARGIN = 60
+
+# 会话缓存：无法从token中解析出exp时，会话的最长有效时间（秒）
+SESSION_MAX_AGE = 3600
+
 
 # ============================================================================
 # 车站模块配置
@@ -150,7 +408,14 @@ DEFAULT_TRAVEL_DATES = None
 # 路线模块配置
 # ============================================================================
 
-# 路线信息
+# 路线目录文件（由 scripts/verify_routes.py 生成，见route_catalogue.py）
+# 文件存在时优先使用目录中的路线，不存在时使用下面的ROUTES_HIGH_SPEED和ROUTES_NORMAL
+ROUTE_CATALOGUE = os.getenv("ROUTE_CATALOGUE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "routes_catalogue.json"))
+
+# 使用路线目录时，是否按各站点对的平均车次数加权采样（与ROUTE_WEIGHTS相乘）
+ROUTE_WEIGHT_BY_TRIPS = os.getenv("ROUTE_WEIGHT_BY_TRIPS", "1") == "1"
+
+# 路线信息（没有路线目录时使用）
 # 格式: {起点站: {终点站: True/False}}
 # 用于快速判断两个站点之间是否有路线
 
@@ -219,3 +484,13 @@ ROUTES_NORMAL: Dict[str, Dict[str, bool]] = {
         "jinan": True,
     },
 }
+
+# 查票时是否总是同时查询高铁/动车和普通火车两个服务（用于刻意制造扇出）
+# 默认False：根据路线表只查询为该站点对提供服务的车次服务
+QUERY_PROBE_BOTH = os.getenv("QUERY_PROBE_BOTH", "0") == "1"
+
+# 路线采样权重（用于偏向某些线路）
+# 格式: {(起点站, 终点站): 权重}
+# 未配置的站点对权重为1.0；同一站点对同时有高铁/动车和普通火车时，每种车型各按该权重采样；
+# 权重为0表示不采样该站点对
+ROUTE_WEIGHTS: Dict[tuple[str, str], float] = {}
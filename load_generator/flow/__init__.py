@@ -2,7 +2,7 @@
 Flow模块 - 按复杂程度分类的业务流程
 """
 from .base_flow import BaseFlow
-from .simple_flow import SimpleQueryFlow, SimpleLoginFlow, SimpleRegisterFlow
+from .simple_flow import SimpleQueryFlow, SimpleLoginFlow, SimpleRegisterFlow, BatchRegisterFlow
 from .travel_flow import BookingFlow
 
 __all__ = [
@@ -10,6 +10,7 @@ __all__ = [
     "SimpleQueryFlow",
     "SimpleLoginFlow",
     "SimpleRegisterFlow",
+    "BatchRegisterFlow",
     "BookingFlow",
 ]
 
@@ -1,23 +1,107 @@
 """
 基础Flow类 - 所有Flow的基类
 """
+import contextvars
 import logging
-from action import AuthAction, TravelAction, ContactAction
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterator
+from action import Transport, AuthAction, TravelAction, ContactAction, connections
+from session import UserSession
+from .context import current_flow, current_step
+import utils
+import config
 
 logger = logging.getLogger(__name__)
 
 
+class FlowFailure(Exception):
+    """流程或步骤失败，作为合成请求事件的失败原因上报给Locust"""
+
+
+class StepResult:
+    """
+    步骤的执行结果（BaseFlow._step产生的对象）
+
+    Action捕获请求错误后返回空结果或status不为1的响应，不会抛出异常；
+    步骤内的代码据此调用fail，步骤以"STEP"请求类型上报为失败
+    """
+
+    def __init__(self):
+        self.failure: Exception | None = None
+
+    def fail(self, reason: str):
+        """
+        把步骤标记为失败
+
+        Args:
+            reason: 失败原因
+        """
+        self.failure = FlowFailure(reason)
+
+
+def check_trips(trips: object) -> str | None:
+    """查票步骤的结果检查：没有查到车次（包括请求失败时Action返回的空列表）时步骤失败"""
+    return None if trips else "未查询到车次"
+
+
+def flow_failure(result: dict[str, object] | None) -> FlowFailure | None:
+    """
+    流程结果分类：根据execute的返回值确定"FLOW"合成请求的失败原因
+
+    Args:
+        result: execute的返回值，execute抛出异常时为None
+
+    Returns:
+        失败原因，流程成功时返回None
+    """
+    if result is None:
+        return FlowFailure("流程异常退出")
+    if not result.get("success"):
+        return FlowFailure(result.get("error") or "流程失败")
+    return None
+
+
+def select_session(session: UserSession | None, username: str | None = None, password: str | None = None) -> UserSession:
+    """
+    选择流程使用的会话（不登录）
+
+    优先复用虚拟用户的会话缓存；如果显式指定了其他用户的凭据，或者没有会话缓存，则返回新的临时会话
+
+    Args:
+        session: 虚拟用户的会话缓存（可选）
+        username: 用户名（可选）
+        password: 密码（可选）
+
+    Returns:
+        流程使用的会话
+    """
+    if session is None or (username is not None and username != session.username):
+        if username is None or password is None:
+            username, password = utils.get_random_user_credentials()
+        session = UserSession(username, password)
+    return session
+
+
 class BaseFlow:
     """Flow基类，提供通用的流程执行框架"""
     
-    def __init__(self, client):
+    def __init__(self, client, session: UserSession | None = None, execution_mode: str | None = None):
         """
         初始化Flow
         
         Args:
             client: Locust的HttpUser.client对象
+            session: 虚拟用户的会话缓存（可选），提供时复用其中的token和联系人，避免每次都登录
+            execution_mode: 独立步骤的执行方式，"sequential"或"concurrent"（可选，默认使用config.FLOW_EXECUTION_MODE）
         """
         self.client = client
+        self.session = session
+        self.execution_mode = execution_mode or config.FLOW_EXECUTION_MODE
+        # 每个步骤的耗时（毫秒），按步骤名称记录
+        self.timings: dict[str, float] = {}
+        # 用于发出流程级、步骤级的合成请求事件
+        self.transport = Transport(client)
         # 初始化各个Action类
         self.auth = AuthAction(client)
         self.travel = TravelAction(client)
@@ -36,6 +120,131 @@ class BaseFlow:
         """
         raise NotImplementedError("子类必须实现execute方法")
     
+    def run(self, *args, **kwargs) -> dict[str, object]:
+        """
+        在流程上下文中执行流程，参数和返回值与execute相同
+        
+        执行期间发出的请求会被标注为属于该流程（见flow.context）；
+        结束后以"FLOW"请求类型上报端到端耗时、是否成功和失败原因
+        
+        Returns:
+            执行结果字典
+        """
+        flow_name = type(self).__name__
+        token = current_flow.set(flow_name)
+        start_time = time.time()
+        start = time.perf_counter()
+        result: dict[str, object] | None = None
+        try:
+            with ExitStack() as stack:
+                # 连接抖动模式：每个流程使用自己的新连接，结束后关闭
+                if config.CONNECTION_CHURN and self.transport.connections is not None:
+                    stack.enter_context(connections.flow_scope(self.client))
+                result = self.execute(*args, **kwargs)
+            return result
+        finally:
+            if config.FLOW_STATS_ENABLED:
+                self.transport.fire_request_event(
+                    "FLOW",
+                    flow_name,
+                    (time.perf_counter() - start) * 1000,
+                    exception=flow_failure(result),
+                    start_time=start_time
+                )
+            current_flow.reset(token)
+    
+    @contextmanager
+    def _step(self, name: str) -> Iterator[StepResult]:
+        """
+        记录一个步骤的耗时，并以"STEP"请求类型上报（统计名称为"流程名.步骤名"）
+        
+        步骤抛出异常或在步骤内调用了StepResult.fail时上报为失败
+        
+        Args:
+            name: 步骤名称
+        
+        Yields:
+            步骤的执行结果
+        """
+        token = current_step.set(name)
+        start_time = time.time()
+        start = time.perf_counter()
+        step = StepResult()
+        try:
+            yield step
+        except Exception as e:
+            step.failure = e
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = elapsed
+            if config.FLOW_STATS_ENABLED:
+                self.transport.fire_request_event(
+                    "STEP",
+                    f"{type(self).__name__}.{name}",
+                    elapsed,
+                    exception=step.failure,
+                    start_time=start_time
+                )
+            current_step.reset(token)
+    
+    def _run_step(
+        self,
+        name: str,
+        func: Callable[[], object],
+        check: Callable[[object], str | None] | None = None
+    ) -> object:
+        """
+        执行单个步骤并记录耗时
+        
+        Args:
+            name: 步骤名称
+            func: 步骤函数
+            check: 检查步骤函数的返回值（可选），返回失败原因时步骤上报为失败
+            
+        Returns:
+            步骤函数的返回值
+        """
+        with self._step(name) as step:
+            value = func()
+            reason = check(value) if check is not None else None
+            if reason is not None:
+                step.fail(reason)
+            return value
+    
+    def _run_steps(
+        self,
+        steps: dict[str, Callable[[], object]],
+        checks: dict[str, Callable[[object], str | None]] | None = None
+    ) -> dict[str, object]:
+        """
+        执行一组相互独立的步骤
+        
+        sequential模式下按顺序逐个执行；concurrent模式下每个步骤在独立的gevent协程中并发执行，
+        所有步骤完成后返回，任一步骤抛出异常时向上抛出
+        
+        Args:
+            steps: 步骤名称到步骤函数的映射
+            checks: 步骤名称到返回值检查函数的映射（可选，见_run_step）
+            
+        Returns:
+            步骤名称到返回值的映射
+        """
+        checks = checks or {}
+        if self.execution_mode != "concurrent":
+            return {name: self._run_step(name, func, checks.get(name)) for name, func in steps.items()}
+        
+        # gevent只在concurrent模式下需要，Locust运行时总是可用
+        from gevent.pool import Group
+        group = Group()
+        # 新协程不继承调用方的上下文，需要各自复制一份流程上下文
+        greenlets = {
+            name: group.spawn(contextvars.copy_context().run, self._run_step, name, func, checks.get(name))
+            for name, func in steps.items()
+        }
+        group.join(raise_error=True)
+        return {name: greenlet.value for name, greenlet in greenlets.items()}
+    
     def _extract_token(self, login_result: dict[str, object]) -> str | None:
         """
         从登录结果中提取token
@@ -67,4 +276,22 @@ class BaseFlow:
             if isinstance(data, dict):
                 return data.get("userId")
         return None
-    
\ No newline at end of file
+    
+    def _get_session(self, username: str | None = None, password: str | None = None) -> UserSession | None:
+        """
+        获取可用的登录会话
+        
+        优先复用虚拟用户的会话缓存（过期前自动刷新）；
+        如果显式指定了其他用户的凭据，或者没有会话缓存，则登录一次并返回临时会话
+        
+        Args:
+            username: 用户名（可选）
+            password: 密码（可选）
+            
+        Returns:
+            可用的会话，登录失败则返回None
+        """
+        session = select_session(self.session, username, password)
+        if not session.ensure(self.auth, self.contact):
+            return None
+        return session
@@ -0,0 +1,26 @@
+"""
+Flow上下文 - 记录当前协程所属的用户、正在执行的流程名称和步骤名称
+
+使用contextvars实现，每个Locust用户（gevent协程）各自独立；
+请求事件监听器（例如请求记录器）据此把每个HTTP请求归属到对应的流程和步骤
+"""
+from contextvars import ContextVar
+
+# 当前协程所属的Locust用户标识（进程内唯一），不在用户协程中时为空字符串
+# 开环模式下同一用户同时执行多个流程，每个流程使用带流程序号的标识
+# 请求记录器据此区分用户，回放时按该标识划分回放通道（同一标识的请求依次发送）
+current_user: ContextVar[str] = ContextVar("current_user", default="")
+
+# 当前正在执行的流程名称（Flow类名），不在流程中时为空字符串
+current_flow: ContextVar[str] = ContextVar("current_flow", default="")
+
+# 当前正在执行的步骤名称，不在步骤中时为空字符串
+current_step: ContextVar[str] = ContextVar("current_step", default="")
+
+# 开环模式下当前流程的计划到达时刻（time.monotonic()时间），闭环模式下为None
+# 延迟直方图据此按计划到达时刻计算流程延迟（协调遗漏修正）
+intended_start: ContextVar[float | None] = ContextVar("intended_start", default=None)
+
+# 开环模式下当前流程实际开始时刻比计划到达时刻晚的时间（毫秒），闭环模式下为0
+# 延迟直方图据此修正开环模式下流程内请求和步骤的延迟
+start_delay_ms: ContextVar[float] = ContextVar("start_delay_ms", default=0.0)
@@ -3,7 +3,9 @@
 """
 import logging
 import random
-from .base_flow import BaseFlow
+import time
+from .base_flow import BaseFlow, FlowFailure
+from session import get_admin_session
 import utils
 import config
 
@@ -38,7 +40,7 @@ class SimpleQueryFlow(BaseFlow):
             end = end or utils.get_random_end_station(start)
             date = date or utils.get_random_travel_date()
             
-            logger.info(f"查询车票: {start} -> {end}, 日期: {date}")
+            logger.info("查询车票: %s -> %s, 日期: %s", start, end, date)
             
             query_result = self.travel.query_trips_left(start, end, date)
             
@@ -49,7 +51,7 @@ class SimpleQueryFlow(BaseFlow):
                 result["error"] = "未查询到符合条件的车次"
             
         except Exception as e:
-            logger.error(f"查询失败: {str(e)}", exc_info=True)
+            logger.error("查询失败: %s", e, exc_info=True)
             result["error"] = str(e)
         
         return result
@@ -82,25 +84,25 @@ class SimpleLoginFlow(BaseFlow):
             if username is None or password is None:
                 username, password = utils.get_random_user_credentials()
             
-            logger.info(f"用户登录: {username}")
+            logger.info("用户登录: %s", username)
             token = self.auth.login(username, password, verification_code)
             
             if token:
                 result["success"] = True
                 result["token"] = token
-                logger.info(f"登录成功，获取到token")
+                logger.info("登录成功，获取到token")
             else:
                 result["error"] = "登录失败，未获取到token"
                 
         except Exception as e:
-            logger.error(f"登录失败: {str(e)}", exc_info=True)
+            logger.error("登录失败: %s", e, exc_info=True)
             result["error"] = str(e)
         
         return result
 
 
 class SimpleRegisterFlow(BaseFlow):
-    """简单注册流程 - 先登录获取token，然后注册新用户"""
+    """简单注册流程 - 使用进程内共享的管理员会话注册新用户"""
     
     def execute(self, user_name: str | None = None, password: str | None = None,
                 gender: int | None = None, document_type: int | None = None,
@@ -119,96 +121,161 @@ class SimpleRegisterFlow(BaseFlow):
         Returns:
             注册结果，包含注册的用户信息
         """
+        try:
+            register_data = self._register_data(user_name, password, gender, document_type, document_num, email)
+            return self._register(register_data)
+        except Exception as e:
+            logger.error("注册流程失败: %s", e, exc_info=True)
+            return {"success": False, "user_id": None, "user_name": None, "error": str(e)}
+    
+    def _register_data(self, user_name: str | None = None, password: str | None = None,
+                       gender: int | None = None, document_type: int | None = None,
+                       document_num: str | None = None, email: str | None = None) -> dict[str, object]:
+        """
+        补全注册数据，未提供的字段随机生成
+        
+        Returns:
+            注册数据：user_name, password, gender, document_type, document_num, email
+        """
+        if user_name is None or password is None:
+            # 使用工具函数生成完整的注册数据
+            register_data = utils.generate_register_data(user_name, password)
+            user_name = str(register_data.get("user_name", ""))
+            password = str(register_data.get("password", ""))
+            if gender is None:
+                gender_val = register_data.get("gender", 1)
+                gender = int(gender_val) if isinstance(gender_val, (int, str)) else 1
+            if document_type is None:
+                doc_type_val = register_data.get("document_type", 1)
+                document_type = int(doc_type_val) if isinstance(doc_type_val, (int, str)) else 1
+            if document_num is None:
+                document_num = str(register_data.get("document_num", ""))
+            if email is None:
+                email = str(register_data.get("email", ""))
+        else:
+            # 如果提供了用户名和密码，但其他字段未提供，则生成
+            if gender is None:
+                gender = random.choice([0, 1])
+            if document_type is None:
+                document_type = 1
+            if document_num is None:
+                document_num = utils.generate_random_id_number()
+            if email is None:
+                email = utils.generate_random_email(user_name)
+        
+        return {
+            "user_name": user_name,
+            "password": password,
+            "gender": gender,
+            "document_type": document_type,
+            "document_num": document_num,
+            "email": email,
+        }
+    
+    def _register(self, register_data: dict[str, object]) -> dict[str, object]:
+        """
+        使用共享的管理员会话注册一个用户，并以"REGISTER"请求类型上报（统计中的RPS即每秒注册数）
+        
+        管理员token在JWT即将过期时由共享会话刷新；注册请求被拒绝（401/403）时刷新token后重试一次
+        
+        Args:
+            register_data: 注册数据（见_register_data）
+            
+        Returns:
+            注册结果：success, user_id, user_name, error
+        """
         result = {
             "success": False,
             "user_id": None,
             "user_name": None,
             "error": None
         }
+        start_time = time.time()
+        start = time.perf_counter()
+        admin = get_admin_session()
         
-        try:
-            # 第一步：使用管理员账号登录获取token（从config中读取）
-            logger.info(f"管理员登录: {config.ADMIN_USERNAME}")
-            token = self.auth.login(config.ADMIN_USERNAME, config.ADMIN_PASSWORD)
-            
-            if not token:
+        logger.info("注册新用户: %s, 邮箱: %s", register_data["user_name"], register_data["email"])
+        for attempt in range(2):
+            if not admin.ensure(self.auth):
                 result["error"] = "管理员登录失败，无法获取token"
                 logger.error(result["error"])
-                return result
-            
-            logger.info("管理员登录成功，获取到token")
+                break
+            token = str(admin.token)
+            register_result = self.auth.register(token=token, **register_data)
+            if register_result.get("status_code") in (401, 403) and attempt == 0:
+                admin.invalidate_token(token)
+                continue
             
-            # 第二步：生成或使用提供的注册数据
-            if user_name is None or password is None:
-                # 使用工具函数生成完整的注册数据
-                register_data = utils.generate_register_data(user_name, password)
-                user_name = str(register_data.get("user_name", ""))
-                password = str(register_data.get("password", ""))
-                if gender is None:
-                    gender_val = register_data.get("gender", 1)
-                    gender = int(gender_val) if isinstance(gender_val, (int, str)) else 1
-                if document_type is None:
-                    doc_type_val = register_data.get("document_type", 1)
-                    document_type = int(doc_type_val) if isinstance(doc_type_val, (int, str)) else 1
-                if document_num is None:
-                    document_num = str(register_data.get("document_num", ""))
-                if email is None:
-                    email = str(register_data.get("email", ""))
+            if register_result.get("status") == 1:
+                data = register_result.get("data", {})
+                if isinstance(data, dict):
+                    result["success"] = True
+                    result["user_id"] = data.get("userId")
+                    result["user_name"] = data.get("userName")
+                    logger.info("注册成功！用户ID: %s, 用户名: %s", result['user_id'], result['user_name'])
+                else:
+                    result["error"] = "注册响应数据格式错误"
             else:
-                # 如果提供了用户名和密码，但其他字段未提供，则生成
-                if gender is None:
-                    gender = random.choice([0, 1])
-                if document_type is None:
-                    document_type = 1
-                if document_num is None:
-                    document_num = utils.generate_random_id_number()
-                if email is None:
-                    email = utils.generate_random_email(user_name)
-            
-            # 确保所有必需字段都有值
-            assert user_name is not None, "user_name不能为None"
-            assert password is not None, "password不能为None"
-            assert gender is not None, "gender不能为None"
-            assert document_type is not None, "document_type不能为None"
-            assert document_num is not None, "document_num不能为None"
-            assert email is not None, "email不能为None"
-            
-            logger.info(f"注册新用户: {user_name}, 邮箱: {email}")
+                result["error"] = register_result.get("msg") or register_result.get("message") or "注册失败"
+                logger.error("注册失败: %s", result['error'])
+            break
+        
+        self.transport.fire_request_event(
+            "REGISTER",
+            "register",
+            (time.perf_counter() - start) * 1000,
+            exception=None if result["success"] else FlowFailure(result["error"]),
+            start_time=start_time
+        )
+        return result
+
+
+class BatchRegisterFlow(SimpleRegisterFlow):
+    """
+    批量注册流程 - 在同一个客户端连接（keep-alive）上连续发送多个注册请求
+    
+    所有注册共享一个管理员token，每个注册单独以"REGISTER"请求类型上报
+    """
+    
+    def execute(self, count: int | None = None, password: str | None = None) -> dict[str, object]:
+        """
+        执行批量注册流程
+        
+        Args:
+            count: 本批注册的用户数（可选，默认使用config.REGISTER_BATCH_SIZE）
+            password: 所有用户的密码（可选，如果不提供则使用默认密码"111111"）
             
-            # 第三步：调用注册接口
-            register_result = self.auth.register(
-                user_name=user_name,
-                password=password,
-                gender=gender,
-                document_type=document_type,
-                document_num=document_num,
-                email=email,
-                token=token
-            )
+        Returns:
+            注册结果：success（全部成功时为True）, registered, failed, user_ids, error（最后一个失败原因）
+        """
+        count = count or config.REGISTER_BATCH_SIZE
+        result: dict[str, object] = {
+            "success": False,
+            "registered": 0,
+            "failed": 0,
+            "user_ids": [],
+            "error": None
+        }
+        
+        try:
+            # 先确保管理员会话可用，登录失败时不再发送整批注册请求
+            if not get_admin_session().ensure(self.auth):
+                result["error"] = "管理员登录失败，无法获取token"
+                logger.error(result["error"])
+                return result
             
-            # 检查注册结果
-            if isinstance(register_result, dict):
-                if register_result.get("status") == 1:
-                    # 注册成功
-                    data = register_result.get("data", {})
-                    if isinstance(data, dict):
-                        result["success"] = True
-                        result["user_id"] = data.get("userId")
-                        result["user_name"] = data.get("userName")
-                        logger.info(f"注册成功！用户ID: {result['user_id']}, 用户名: {result['user_name']}")
-                    else:
-                        result["error"] = "注册响应数据格式错误"
+            for _ in range(count):
+                register_result = self._register(self._register_data(password=password))
+                if register_result["success"]:
+                    result["registered"] += 1
+                    result["user_ids"].append(register_result["user_id"])
                 else:
-                    # 注册失败
-                    result["error"] = register_result.get("msg", "注册失败")
-                    logger.error(f"注册失败: {result['error']}")
-            else:
-                result["error"] = "注册响应格式错误"
-                logger.error(result["error"])
-                
+                    result["failed"] += 1
+                    result["error"] = register_result["error"]
+            result["success"] = result["failed"] == 0
+            logger.info("批量注册完成: 成功 %d, 失败 %d", result["registered"], result["failed"])
         except Exception as e:
-            logger.error(f"注册流程失败: {str(e)}", exc_info=True)
+            logger.error("批量注册流程失败: %s", e, exc_info=True)
             result["error"] = str(e)
         
         return result
-
@@ -3,14 +3,16 @@
 """
 import logging
 import random
-from .base_flow import BaseFlow
+from .base_flow import BaseFlow, check_trips
+from session import SharedSession, UserSession
 import utils
+import metrics
 
 logger = logging.getLogger(__name__)
 
 
 class BookingFlow(BaseFlow):
-    """订票流程 - 查票 -> 登录 -> 获取联系人 -> 订票"""
+    """订票流程 - 查票 -> 登录（复用会话缓存） -> 获取联系人 -> 订票"""
     
     def execute(
         self,
@@ -30,8 +32,8 @@ class BookingFlow(BaseFlow):
             start: 起点站名称（可选，如果不提供则随机选择）
             end: 终点站名称（可选，如果不提供则随机选择，且不同于起点）
             date: 出发日期（可选，如果不提供则随机选择未来日期）
-            username: 用户名（可选，如果不提供则随机选择）
-            password: 密码（可选，如果不提供则随机选择，与用户名对应）
+            username: 用户名（可选，如果不提供则复用会话缓存，没有会话缓存时随机选择）
+            password: 密码（可选，与用户名对应）
             seat_type: 座位类型，"1"表示舒适座，"2"表示经济座，None表示随机选择
             assurance: 保险类型索引，"0"表示不购买保险，None表示随机选择
             food_type: 食物类型，0表示不订购食物，None表示随机选择
@@ -43,55 +45,48 @@ class BookingFlow(BaseFlow):
             "success": False,
             "order_id": None,
             "trip_id": None,
-            "error": None
+            "error": None,
+            "timings": self.timings  # 每个步骤的耗时（毫秒）
         }
         
         try:
             # 第一步：如果没有提供参数，则使用工具函数生成
-            # 使用基于路线配置的函数确保路线存在
-            if start is None:
-                start = utils.get_random_start_station()
-            
-            if end is None:
-                # 根据config中的路线信息选择终点站，确保路线存在
-                end = utils.get_random_end_station_by_route(start)
-                if end is None:
-                    # 如果找不到存在的路线，尝试随机选择其他起点站
-                    max_attempts = 10
-                    for _ in range(max_attempts):
-                        start = utils.get_random_start_station()
-                        end = utils.get_random_end_station_by_route(start)
-                        if end is not None:
-                            break
-                    if end is None:
-                        result["error"] = "无法找到存在的路线"
-                        logger.error(result["error"])
-                        return result
+            # 使用基于路线索引的函数确保路线存在
+            route = choose_route(start, end)
+            if route is None:
+                result["error"] = "无法找到存在的路线"
+                logger.error(result["error"])
+                return result
+            start, end = route
             
             date = date or utils.get_random_travel_date()
             
-            logger.info(f"开始订票流程: {start} -> {end}, 日期: {date}")
+            logger.info("开始订票流程: %s -> %s, 日期: %s", start, end, date)
             
-            # 第二步：同时查询高铁/动车和普通火车车票
-            logger.info("步骤1: 查询车票（同时查询高铁/动车和普通火车）")
+            # 第二步：根据路线表查询为该站点对提供服务的车次（高铁/动车和/或普通火车）
+            train_types = utils.plan_trip_queries(start, end)
+            logger.info("步骤1: 查询车票（车型: %s）", ', '.join(train_types))
             
-            # 同时查询两种类型的车次
-            trips_high_speed = self.travel.query_trips_left(start, end, date)
-            trips_normal = self.travel.query_trips_left_normal(start, end, date)
+            query_steps = {}
+            if "high_speed" in train_types:
+                query_steps["query_high_speed"] = lambda: self.travel.query_trips_left(start, end, date)
+            else:
+                metrics.counters.incr("query_planner.skipped.travelservice")
+            if "normal" in train_types:
+                query_steps["query_normal"] = lambda: self.travel.query_trips_left_normal(start, end, date)
+            else:
+                metrics.counters.incr("query_planner.skipped.travel2service")
             
-            # 合并结果
-            trips = []
-            if isinstance(trips_high_speed, list):
-                trips.extend(trips_high_speed)
-            if isinstance(trips_normal, list):
-                trips.extend(trips_normal)
+            # 两种车次的查询互不依赖，concurrent模式下并发执行
+            query_results = self._run_steps(query_steps, {name: check_trips for name in query_steps})
+            trips = merge_trips(query_results)
             
             if not trips:
                 result["error"] = "未查询到符合条件的车次"
                 logger.warning(result["error"])
                 return result
             
-            logger.info(f"查询到的车次数量: {len(trips)}")
+            logger.info("查询到的车次数量: %s", len(trips))
             
             # 第三步：随机选择一个车次
             trip_id_str = utils.select_random_trip(trips)
@@ -100,63 +95,47 @@ class BookingFlow(BaseFlow):
                 logger.warning(result["error"])
                 return result
             
-            # 判断是否是高铁/动车：G或D开头
-            is_high_speed = trip_id_str.startswith("G") or trip_id_str.startswith("D")
-            
-            logger.info(f"选择车次: {trip_id_str} ({'高铁/动车' if is_high_speed else '普通火车'})")
+            high_speed = is_high_speed(trip_id_str)
             
-            # 第四步：登录获取token和用户ID
-            logger.info("步骤2: 用户登录")
-            if username is None or password is None:
-                username, password = utils.get_random_user_credentials()
+            logger.info("选择车次: %s (%s)", trip_id_str, '高铁/动车' if high_speed else '普通火车')
             
-            # 登录并获取完整响应（需要修改login方法或直接调用_post）
-            login_data = {
-                "username": username,
-                "password": password
-            }
-            login_result = self.auth._post("/api/v1/users/login", login_data)
+            # 第四步：获取登录会话（复用虚拟用户缓存的token和用户ID，过期前自动刷新）
+            logger.info("步骤2: 获取用户会话")
+            with self._step("session") as step:
+                session = self._get_session(username, password)
+                if session is None:
+                    step.fail("登录失败")
             
-            if not isinstance(login_result, dict) or login_result.get("status") != 1:
+            if session is None:
                 result["error"] = "登录失败"
                 logger.error(result["error"])
                 return result
             
-            login_data_obj = login_result.get("data", {})
-            if not isinstance(login_data_obj, dict):
-                result["error"] = "登录响应数据格式错误"
-                logger.error(result["error"])
-                return result
-            
-            token = login_data_obj.get("token")
-            account_id = login_data_obj.get("userId")
+            token = session.token
+            account_id = session.user_id
             
             if not token or not account_id:
                 result["error"] = "登录成功但无法获取token或用户ID"
                 logger.error(result["error"])
                 return result
             
-            logger.info(f"登录成功，用户ID: {account_id}")
+            logger.info("获取会话成功，用户ID: %s", account_id)
             
-            # 第五步：查询保险类型并随机选择
-            logger.info("步骤3: 查询保险类型")
-            assurance_types = self.travel.get_assurance_types(token)
+            # 保险类型、联系人、食物信息互不依赖，concurrent模式下并发获取
+            # 会话中已缓存联系人时不再查询
+            logger.info("步骤3-5: 查询保险类型、联系人、食物信息")
+            reference_results = self._run_steps({
+                "assurance": lambda: self.travel.get_assurance_types(token),
+                "contacts": lambda: session.contacts or self.contact.get_contacts_by_account(account_id, token),
+                "foods": lambda: self.travel.get_all_foods(date, start, end, trip_id_str),
+            })
             
-            # 随机决定要不要保险，如果要的话随机选择一个
-            if assurance is None:
-                if assurance_types and random.random() < 0.5:  # 50%概率购买保险
-                    selected_assurance = random.choice(assurance_types)
-                    assurance = str(selected_assurance.get("index", "0"))
-                    logger.info(f"随机选择保险: {selected_assurance.get('name', 'Unknown')} (索引: {assurance})")
-                else:
-                    assurance = "0"
-                    logger.info("随机决定不购买保险")
-            else:
-                logger.info(f"使用指定保险: {assurance}")
+            # 第五步：随机选择保险类型
+            assurance = select_assurance(reference_results["assurance"], assurance)
             
-            # 第六步：获取联系人
-            logger.info("步骤4: 获取联系人")
-            contacts = self.contact.get_contacts_by_account(account_id, token)
+            # 第六步：选择联系人
+            contacts = reference_results["contacts"]
+            session.contacts = contacts
             
             if not contacts:
                 result["error"] = "用户没有联系人信息，无法订票"
@@ -164,134 +143,286 @@ class BookingFlow(BaseFlow):
                 return result
             
             # 随机选择一个联系人
-            selected_contact = random.choice(contacts)
-            contact_id = selected_contact.get("id")
-            if not contact_id:
+            contact_id = select_contact(contacts)
+            if contact_id is None:
                 result["error"] = "联系人ID无效"
                 logger.error(result["error"])
                 return result
             
-            # 确保contact_id是字符串类型
-            contact_id = str(contact_id)
-            
-            logger.info(f"选择联系人: {selected_contact.get('name', 'Unknown')}")
-            
             # 第七步：随机选择座位类型
-            if seat_type is None:
-                seat_type = random.choice(["1", "2"])  # "1"表示舒适座，"2"表示经济座
-                logger.info(f"随机选择座位类型: {'舒适座' if seat_type == '1' else '经济座'}")
-            else:
-                logger.info(f"使用指定座位类型: {'舒适座' if seat_type == '1' else '经济座'}")
-            
-            # 第八步：查询食物信息并随机选择
-            logger.info("步骤5: 查询食物信息")
-            foods_data = self.travel.get_all_foods(date, start, end, trip_id_str)
+            seat_type = select_seat_type(seat_type)
             
-            # 随机决定要不要食物，如果要的话随机选择一个
-            selected_food_type = 0
-            food_name = None
-            food_price = None
-            station_name = None
-            store_name = None
-            
-            if food_type is None:
-                if foods_data and random.random() < 0.4:  # 40%概率订购食物
-                    # 优先从 trainFoodList 中选择
-                    train_food_list = foods_data.get("trainFoodList", [])
-                    if train_food_list and isinstance(train_food_list, list):
-                        selected_food = random.choice(train_food_list)
-                        if isinstance(selected_food, dict):
-                            selected_food_type = selected_food.get("foodType", 1)  # 默认使用foodType
-                            food_name = selected_food.get("foodName")
-                            food_price = selected_food.get("price")
-                            logger.info(f"随机选择食物: {food_name} (类型: {selected_food_type}, 价格: {food_price})")
-                    else:
-                        # 如果没有trainFoodList，尝试从foodStoreListMap中选择
-                        food_store_map = foods_data.get("foodStoreListMap", {})
-                        if food_store_map and isinstance(food_store_map, dict):
-                            # 随机选择一个站点
-                            stations = list(food_store_map.keys())
-                            if stations:
-                                station_name = random.choice(stations)
-                                stores = food_store_map.get(station_name, {})
-                                if stores and isinstance(stores, dict):
-                                    # 随机选择一个商店
-                                    store_names = list(stores.keys())
-                                    if store_names:
-                                        store_name = random.choice(store_names)
-                                        store_foods = stores.get(store_name, [])
-                                        if store_foods and isinstance(store_foods, list):
-                                            selected_food = random.choice(store_foods)
-                                            if isinstance(selected_food, dict):
-                                                selected_food_type = selected_food.get("foodType", 1)
-                                                food_name = selected_food.get("foodName")
-                                                food_price = selected_food.get("price")
-                                                logger.info(f"随机选择食物: {food_name} (类型: {selected_food_type}, 价格: {food_price}, 站点: {station_name}, 商店: {store_name})")
-                    if selected_food_type == 0:
-                        logger.info("查询到食物但无法选择，不订购食物")
-                else:
-                    logger.info("随机决定不订购食物")
-            else:
-                selected_food_type = food_type if food_type is not None else 0
-                logger.info(f"使用指定食物类型: {selected_food_type}")
+            # 第八步：随机选择食物
+            selected_food_type, food_name, food_price, station_name, store_name = select_food(reference_results["foods"], food_type)
             
             # 第九步：根据车次类型订票
             logger.info("步骤6: 预订车票")
             
-            if is_high_speed:
-                logger.info(f"预订高铁/动车车票: {trip_id_str}")
-                preserve_result = self.travel.preserve_ticket(
-                    account_id=account_id,
-                    contacts_id=contact_id,
-                    trip_id=trip_id_str,
-                    seat_type=seat_type,
-                    date=date,
-                    from_station=start,
-                    to_station=end,
-                    assurance=assurance,
-                    token=token,
-                    food_type=selected_food_type,
-                    food_name=food_name,
-                    food_price=food_price,
-                    station_name=station_name,
-                    store_name=store_name
-                )
-            else:
-                logger.info(f"预订普通火车车票: {trip_id_str}")
-                preserve_result = self.travel.preserve_other_ticket(
-                    account_id=account_id,
-                    contacts_id=contact_id,
-                    trip_id=trip_id_str,
-                    seat_type=seat_type,
-                    date=date,
-                    from_station=start,
-                    to_station=end,
-                    assurance=assurance,
-                    token=token,
-                    food_type=selected_food_type,
-                    food_name=food_name,
-                    food_price=food_price,
-                    station_name=station_name,
-                    store_name=store_name
-                )
+            with self._step("preserve") as step:
+                if high_speed:
+                    logger.info("预订高铁/动车车票: %s", trip_id_str)
+                    preserve_result = self.travel.preserve_ticket(
+                        account_id=account_id,
+                        contacts_id=contact_id,
+                        trip_id=trip_id_str,
+                        seat_type=seat_type,
+                        date=date,
+                        from_station=start,
+                        to_station=end,
+                        assurance=assurance,
+                        token=token,
+                        food_type=selected_food_type,
+                        food_name=food_name,
+                        food_price=food_price,
+                        station_name=station_name,
+                        store_name=store_name
+                    )
+                else:
+                    logger.info("预订普通火车车票: %s", trip_id_str)
+                    preserve_result = self.travel.preserve_other_ticket(
+                        account_id=account_id,
+                        contacts_id=contact_id,
+                        trip_id=trip_id_str,
+                        seat_type=seat_type,
+                        date=date,
+                        from_station=start,
+                        to_station=end,
+                        assurance=assurance,
+                        token=token,
+                        food_type=selected_food_type,
+                        food_name=food_name,
+                        food_price=food_price,
+                        station_name=station_name,
+                        store_name=store_name
+                    )
+                # 余票不足等业务失败时Action返回status不为1的响应，不抛出异常
+                reason = check_preserve(preserve_result)
+                if reason is not None:
+                    step.fail(reason)
             
             # 检查订票结果
-            if isinstance(preserve_result, dict):
-                if preserve_result.get("status") == 1:
-                    result["success"] = True
-                    result["trip_id"] = trip_id_str
-                    # 订票成功，但响应中可能没有order_id，需要从订单服务查询
-                    logger.info("订票成功！")
-                else:
-                    result["error"] = preserve_result.get("msg", "订票失败")
-                    logger.error(f"订票失败: {result['error']}")
+            if reason is None:
+                result["success"] = True
+                result["trip_id"] = trip_id_str
+                # 订票成功，但响应中可能没有order_id，需要从订单服务查询
+                logger.info("订票成功！")
             else:
-                result["error"] = "订票响应格式错误"
-                logger.error(result["error"])
+                result["error"] = reason
+                logger.error("订票失败: %s", reason)
+                invalidate_rejected_session(session, token, preserve_result)
                 
         except Exception as e:
-            logger.error(f"订票流程失败: {str(e)}", exc_info=True)
+            logger.error("订票流程失败: %s", e, exc_info=True)
             result["error"] = str(e)
         
         return result
 
+
+def choose_route(start: str | None = None, end: str | None = None) -> tuple[str, str] | None:
+    """
+    确定订票的起点站和终点站，未指定的站点随机选择
+
+    使用基于路线索引的函数，保证选出的站点对之间存在路线
+
+    Args:
+        start: 起点站名称（可选）
+        end: 终点站名称（可选）
+
+    Returns:
+        (起点站, 终点站)，找不到存在的路线时返回None
+    """
+    if end is None:
+        end = utils.get_random_end_station_by_route(start) if start is not None else None
+        if end is None:
+            # 未指定起点，或指定的起点没有路线：从路线索引中一次抽取一个有效的站点对
+            route = utils.get_random_route()
+            if route is None:
+                return None
+            start, end, _ = route
+    elif start is None:
+        start = utils.get_random_start_station()
+    return start, end
+
+
+def merge_trips(query_results: dict[str, object]) -> list[dict[str, object]]:
+    """
+    合并高铁/动车和普通火车的查票结果
+
+    Args:
+        query_results: 查票步骤名称（query_high_speed/query_normal）到查票结果的映射
+
+    Returns:
+        两种车次的列表
+    """
+    trips = []
+    for name in ("query_high_speed", "query_normal"):
+        trips_of_type = query_results.get(name)
+        if isinstance(trips_of_type, list):
+            trips.extend(trips_of_type)
+    return trips
+
+
+def is_high_speed(trip_id: str) -> bool:
+    """判断车次是否是高铁/动车（G或D开头），决定使用哪个订票接口"""
+    return trip_id.startswith("G") or trip_id.startswith("D")
+
+
+def select_contact(contacts: list[dict[str, object]]) -> str | None:
+    """
+    随机选择一个联系人
+
+    Args:
+        contacts: 联系人列表（不能为空）
+
+    Returns:
+        联系人ID字符串，联系人没有ID时返回None
+    """
+    selected_contact = random.choice(contacts)
+    contact_id = selected_contact.get("id")
+    if not contact_id:
+        return None
+    logger.info("选择联系人: %s", selected_contact.get('name', 'Unknown'))
+    return str(contact_id)
+
+
+def select_seat_type(seat_type: str | None = None) -> str:
+    """
+    选择座位类型
+
+    Args:
+        seat_type: 指定的座位类型（可选，None表示随机选择）
+
+    Returns:
+        座位类型，"1"表示舒适座，"2"表示经济座
+    """
+    if seat_type is None:
+        seat_type = random.choice(["1", "2"])
+        logger.info("随机选择座位类型: %s", '舒适座' if seat_type == '1' else '经济座')
+    else:
+        logger.info("使用指定座位类型: %s", '舒适座' if seat_type == '1' else '经济座')
+    return seat_type
+
+
+def check_preserve(preserve_result: object) -> str | None:
+    """
+    订票结果检查
+
+    Args:
+        preserve_result: 订票接口的响应
+
+    Returns:
+        失败原因，订票成功时返回None
+    """
+    if not isinstance(preserve_result, dict):
+        return "订票响应格式错误"
+    if preserve_result.get("status") != 1:
+        return preserve_result.get("msg") or "订票失败"
+    return None
+
+
+def invalidate_rejected_session(session: UserSession, token: str, preserve_result: object):
+    """
+    订票请求的token被拒绝（401/403）时让会话失效，下一次Flow会重新登录
+
+    共享会话（开环模式）只在token仍是本流程使用的token时失效，不清除其他流程刚刷新的token
+
+    Args:
+        session: 本流程使用的会话
+        token: 本流程使用的token
+        preserve_result: 订票接口的响应
+    """
+    if not isinstance(preserve_result, dict) or preserve_result.get("status_code") not in (401, 403):
+        return
+    if isinstance(session, SharedSession):
+        session.invalidate_token(token)
+    else:
+        session.invalidate()
+
+
+def select_assurance(assurance_types: list[dict[str, object]], assurance: str | None = None) -> str:
+    """
+    选择保险类型
+
+    Args:
+        assurance_types: 保险类型列表
+        assurance: 指定的保险类型索引（可选，None表示以50%概率随机选择一个）
+
+    Returns:
+        保险类型索引，"0"表示不购买保险
+    """
+    if assurance is not None:
+        logger.info("使用指定保险: %s", assurance)
+        return assurance
+    # 随机决定要不要保险，如果要的话随机选择一个
+    if assurance_types and random.random() < 0.5:  # 50%概率购买保险
+        selected_assurance = random.choice(assurance_types)
+        assurance = str(selected_assurance.get("index", "0"))
+        logger.info("随机选择保险: %s (索引: %s)", selected_assurance.get('name', 'Unknown'), assurance)
+        return assurance
+    logger.info("随机决定不购买保险")
+    return "0"
+
+
+def select_food(
+    foods_data: dict[str, object],
+    food_type: int | None = None
+) -> tuple[int, str | None, float | None, str | None, str | None]:
+    """
+    选择食物
+
+    Args:
+        foods_data: 食物数据对象（{"trainFoodList": [...], "foodStoreListMap": {...}}）
+        food_type: 指定的食物类型（可选，None表示以40%概率随机选择一个）
+
+    Returns:
+        (食物类型, 食物名称, 食物价格, 站点名称, 商店名称)，食物类型为0表示不订购食物
+    """
+    selected_food_type = 0
+    food_name = None
+    food_price = None
+    station_name = None
+    store_name = None
+
+    if food_type is not None:
+        logger.info("使用指定食物类型: %s", food_type)
+        return food_type, food_name, food_price, station_name, store_name
+
+    # 随机决定要不要食物，如果要的话随机选择一个
+    if not foods_data or random.random() >= 0.4:  # 40%概率订购食物
+        logger.info("随机决定不订购食物")
+        return selected_food_type, food_name, food_price, station_name, store_name
+
+    # 优先从 trainFoodList 中选择
+    train_food_list = foods_data.get("trainFoodList", [])
+    if train_food_list and isinstance(train_food_list, list):
+        selected_food = random.choice(train_food_list)
+        if isinstance(selected_food, dict):
+            selected_food_type = selected_food.get("foodType", 1)  # 默认使用foodType
+            food_name = selected_food.get("foodName")
+            food_price = selected_food.get("price")
+            logger.info("随机选择食物: %s (类型: %s, 价格: %s)", food_name, selected_food_type, food_price)
+    else:
+        # 如果没有trainFoodList，尝试从foodStoreListMap中选择
+        food_store_map = foods_data.get("foodStoreListMap", {})
+        if food_store_map and isinstance(food_store_map, dict):
+            # 随机选择一个站点
+            stations = list(food_store_map.keys())
+            if stations:
+                station_name = random.choice(stations)
+                stores = food_store_map.get(station_name, {})
+                if stores and isinstance(stores, dict):
+                    # 随机选择一个商店
+                    store_names = list(stores.keys())
+                    if store_names:
+                        store_name = random.choice(store_names)
+                        store_foods = stores.get(store_name, [])
+                        if store_foods and isinstance(store_foods, list):
+                            selected_food = random.choice(store_foods)
+                            if isinstance(selected_food, dict):
+                                selected_food_type = selected_food.get("foodType", 1)
+                                food_name = selected_food.get("foodName")
+                                food_price = selected_food.get("price")
+                                logger.info("随机选择食物: %s (类型: %s, 价格: %s, 站点: %s, 商店: %s)", food_name, selected_food_type, food_price, station_name, store_name)
+    if selected_food_type == 0:
+        logger.info("查询到食物但无法选择，不订购食物")
+    return selected_food_type, food_name, food_price, station_name, store_name
@@ -0,0 +1,399 @@
+"""
+延迟直方图模块 - 每个端点、每个流程的HDR直方图，带协调遗漏（coordinated omission）修正
+
+Locust自带的响应时间分桶会四舍五入，而且闭环用户在慢响应期间停顿，
+本该在停顿期间发生的采样不会出现，导致尾延迟被低估。本模块：
+
+- 用HDR（高动态范围）直方图记录延迟，3位有效数字，覆盖微秒到小时
+- 对每个统计项（请求类型 + 名称）同时维护原始直方图和修正直方图，只修正流程（FLOW）：
+  - 开环模式下的流程：按计划到达时刻计算延迟（包含排队等待时间），不依赖估计
+  - 闭环模式下的流程：用户按wait_time的节奏执行流程，按预期的流程间隔补齐停顿期间缺失的采样；
+    预期间隔为config.HDR_EXPECTED_INTERVAL_MS，未设置时取闭环用户类wait_time的均值
+  - 开环模式下的单个请求和步骤（STEP）：流程开始得比计划晚时，流程内的每个请求都被推迟了同样的时间，
+    修正延迟 = 实际延迟 + 流程的启动延迟（见flow.context.start_delay_ms）
+  - 闭环模式下的单个请求和步骤不修正：流程内的请求是连续发出的，没有可用于补齐采样的计划间隔；
+    这些统计项只保存原始直方图（不占用额外的内存和上报流量），报告中的修正列为空
+- 在测试结束时输出p50/p99/p99.9/p99.99（日志和 {csv前缀}_hdr.csv），并提供实时HTTP接口 /hdr
+"""
+import csv
+import json
+import logging
+import math
+import time
+import config
+from flow.context import intended_start, start_delay_ms
+
+logger = logging.getLogger(__name__)
+
+# 报告中输出的百分位
+REPORT_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 99.99)
+
+# 总是维护修正直方图的请求类型（统计项名称以 "{请求类型} " 开头），其他统计项只在开环模式下修正
+CORRECTED_REQUEST_TYPES = ("FLOW",)
+
+# 估计wait_time均值时的采样次数
+WAIT_TIME_SAMPLES = 1000
+
+
+class HdrHistogram:
+    """
+    HDR直方图（稀疏存储）
+
+    以微秒为单位记录整数值，每个2的幂区间内划分2048个子桶，相对误差不超过0.1%（3位有效数字）
+    """
+
+    SUB_BUCKET_COUNT = 2048
+    SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT // 2
+    SUB_BUCKET_HALF_COUNT_MAGNITUDE = 10
+    SUB_BUCKET_MASK = SUB_BUCKET_COUNT - 1
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.total_count = 0
+        self.max_value = 0
+
+    def _index_of(self, value: int) -> int:
+        """
+        计算值所在的桶下标
+
+        Args:
+            value: 非负整数值
+
+        Returns:
+            桶下标
+        """
+        bucket_index = (value | self.SUB_BUCKET_MASK).bit_length() - (self.SUB_BUCKET_HALF_COUNT_MAGNITUDE + 1)
+        sub_bucket_index = value >> bucket_index
+        if bucket_index == 0:
+            return sub_bucket_index
+        return ((bucket_index + 1) << self.SUB_BUCKET_HALF_COUNT_MAGNITUDE) + (sub_bucket_index - self.SUB_BUCKET_HALF_COUNT)
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        """
+        计算桶下标对应的最大等价值（与该桶中所有值在精度范围内相等的最大值）
+
+        Args:
+            index: 桶下标
+
+        Returns:
+            最大等价值
+        """
+        if index < self.SUB_BUCKET_COUNT:
+            return index
+        bucket_index = (index >> self.SUB_BUCKET_HALF_COUNT_MAGNITUDE) - 1
+        sub_bucket_index = (index & (self.SUB_BUCKET_HALF_COUNT - 1)) + self.SUB_BUCKET_HALF_COUNT
+        return ((sub_bucket_index + 1) << bucket_index) - 1
+
+    def record_value(self, value: int, count: int = 1):
+        """
+        记录一个值
+
+        Args:
+            value: 值（微秒），负数按0处理
+            count: 记录次数
+        """
+        value = max(int(value), 0)
+        index = self._index_of(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        if value > self.max_value:
+            self.max_value = value
+
+    def record_corrected_value(self, value: int, expected_interval: int):
+        """
+        记录一个值，并补齐协调遗漏导致缺失的采样
+
+        当值大于预期间隔时，说明在这段时间内本应再发出若干请求，
+        依次补记 value - expected_interval、value - 2 * expected_interval ... 直到小于预期间隔
+
+        Args:
+            value: 值（微秒）
+            expected_interval: 预期请求间隔（微秒），不大于0时不修正
+        """
+        self.record_value(value)
+        if expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record_value(missing)
+            missing -= expected_interval
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """
+        计算百分位值
+
+        Args:
+            percentile: 百分位（0~100）
+
+        Returns:
+            百分位值（微秒），直方图为空时返回0
+        """
+        if self.total_count == 0:
+            return 0
+        target = max(1, math.ceil(percentile / 100.0 * self.total_count))
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= target:
+                return min(self._highest_equivalent_value(index), self.max_value)
+        return self.max_value
+
+    def merge(self, other: "HdrHistogram"):
+        """
+        合并另一个直方图
+
+        Args:
+            other: 另一个直方图
+        """
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.max_value = max(self.max_value, other.max_value)
+
+    def to_list(self) -> list:
+        """
+        序列化为可通过Locust消息传输的列表
+
+        Returns:
+            [max_value, [[桶下标, 次数], ...]]
+        """
+        return [self.max_value, [[index, count] for index, count in self.counts.items()]]
+
+    @classmethod
+    def from_list(cls, data: list) -> "HdrHistogram":
+        """
+        从to_list的结果反序列化
+
+        Args:
+            data: to_list的结果
+
+        Returns:
+            直方图
+        """
+        histogram = cls()
+        histogram.max_value = data[0]
+        for index, count in data[1]:
+            histogram.counts[index] = count
+            histogram.total_count += count
+        return histogram
+
+
+def is_corrected(key: str) -> bool:
+    """
+    统计项是否总是维护修正直方图
+
+    Args:
+        key: 统计项名称（请求类型 + 名称）
+
+    Returns:
+        流程（FLOW）统计项返回True
+    """
+    return key.partition(" ")[0] in CORRECTED_REQUEST_TYPES
+
+
+class LatencyHistograms:
+    """按统计项（请求类型 + 名称）管理原始直方图和修正直方图（流程和开环模式下的请求、步骤有修正直方图）"""
+
+    def __init__(self):
+        self.raw: dict[str, HdrHistogram] = {}
+        self.corrected: dict[str, HdrHistogram] = {}
+
+    def record(self, key: str, latency_ms: float, corrected_ms: float | None, expected_interval_ms: float):
+        """
+        记录一次延迟
+
+        Args:
+            key: 统计项名称
+            latency_ms: 实际测得的延迟（毫秒）
+            corrected_ms: 按计划时刻计算的延迟（毫秒），为None时流程按预期间隔修正，请求和步骤记录原始值
+            expected_interval_ms: 流程的预期间隔（毫秒），不大于0时修正直方图记录原始值
+        """
+        raw = self.raw.get(key)
+        if raw is None:
+            raw = self.raw[key] = HdrHistogram()
+        corrected = self.corrected.get(key)
+        if corrected is None and (corrected_ms is not None or is_corrected(key)):
+            # 请求和步骤第一次有计划时刻时创建修正直方图，之前没有计划的采样（例如on_start中的登录）按原始值计入
+            corrected = self.corrected[key] = HdrHistogram()
+            corrected.merge(raw)
+        raw.record_value(int(latency_ms * 1000))
+        if corrected is None:
+            return
+        if corrected_ms is not None:
+            corrected.record_value(int(corrected_ms * 1000))
+        elif is_corrected(key):
+            corrected.record_corrected_value(int(latency_ms * 1000), int(expected_interval_ms * 1000))
+        else:
+            corrected.record_value(int(latency_ms * 1000))
+
+    def drain(self) -> dict[str, list]:
+        """
+        取出所有直方图并清空（worker上报增量时使用）
+
+        Returns:
+            统计项名称到 [原始直方图, 修正直方图] 序列化结果的映射，没有修正直方图的统计项只有原始直方图
+        """
+        data = {
+            key: [raw.to_list(), self.corrected[key].to_list()] if key in self.corrected else [raw.to_list()]
+            for key, raw in self.raw.items()
+        }
+        self.reset()
+        return data
+
+    def merge(self, data: dict[str, list]):
+        """
+        合并worker上报的直方图（master汇总时使用）
+
+        Args:
+            data: drain的结果
+        """
+        for key, histograms in data.items():
+            if key not in self.raw:
+                self.raw[key] = HdrHistogram()
+            self.raw[key].merge(HdrHistogram.from_list(histograms[0]))
+            if len(histograms) > 1:
+                self.corrected.setdefault(key, HdrHistogram()).merge(HdrHistogram.from_list(histograms[1]))
+
+    def reset(self):
+        """清空所有直方图"""
+        self.raw = {}
+        self.corrected = {}
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """
+        生成百分位报告
+
+        Returns:
+            统计项名称到指标的映射，指标包括样本数、修正后的百分位和最大值（毫秒）、原始p99（毫秒）；
+            没有修正直方图的统计项（闭环模式下的请求和步骤）修正后的指标为None
+        """
+        report = {}
+        for key in sorted(self.raw):
+            raw = self.raw[key]
+            corrected = self.corrected.get(key)
+            row: dict[str, float | None] = {
+                "count": raw.total_count,
+                "corrected_count": corrected.total_count if corrected is not None else None,
+            }
+            for percentile in REPORT_PERCENTILES:
+                value = corrected.value_at_percentile(percentile) / 1000.0 if corrected is not None else None
+                row[f"p{percentile:g}"] = value
+            row["raw_p99"] = raw.value_at_percentile(99.0) / 1000.0
+            row["max"] = corrected.max_value / 1000.0 if corrected is not None else None
+            report[key] = row
+        return report
+
+
+# 进程内共享的直方图
+histograms = LatencyHistograms()
+
+
+def write_csv(path: str):
+    """
+    把百分位报告写入CSV文件
+
+    Args:
+        path: CSV文件路径
+    """
+    report = histograms.report()
+    columns = ["count", "corrected_count"] + [f"p{p:g}" for p in REPORT_PERCENTILES] + ["raw_p99", "max"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name"] + columns)
+        for key, row in report.items():
+            writer.writerow([key] + ["" if row[column] is None else row[column] for column in columns])
+
+
+def expected_flow_interval_ms(user_classes: list) -> float:
+    """
+    闭环用户流程之间的预期间隔：用户类wait_time的均值
+
+    Args:
+        user_classes: 参与测试的Locust用户类
+
+    Returns:
+        预期间隔（毫秒），设置了config.HDR_EXPECTED_INTERVAL_MS时使用该值；
+        wait_time依赖用户实例（例如constant_pacing）而无法估计的用户类不参与计算
+    """
+    if config.HDR_EXPECTED_INTERVAL_MS is not None:
+        return config.HDR_EXPECTED_INTERVAL_MS
+    samples = []
+    for user_class in user_classes:
+        try:
+            samples += [user_class.wait_time(None) for _ in range(WAIT_TIME_SAMPLES)]
+        except Exception as e:
+            logger.warning("无法估计用户类 %s 的wait_time均值，流程不做间隔修正: %s", user_class.__name__, e)
+    return sum(samples) / len(samples) * 1000 if samples else 0.0
+
+
+def _serve_report(environ, start_response):
+    """没有Web UI（无头模式）时使用的最小WSGI应用，只提供 /hdr 接口"""
+    if environ.get("PATH_INFO") != "/hdr":
+        start_response("404 Not Found", [("Content-Type", "text/plain")])
+        return [b"not found"]
+    body = json.dumps(histograms.report(), ensure_ascii=False).encode("utf-8")
+    start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+def init_locust(environment):
+    """
+    在Locust中注册延迟直方图的记录、汇总与输出，应在init事件中调用
+
+    Args:
+        environment: Locust的Environment对象
+    """
+    events = environment.events
+    is_worker = type(environment.runner).__name__ == "WorkerRunner"
+    flow_interval_ms = expected_flow_interval_ms(environment.user_classes)
+    if not is_worker:
+        logger.info("HDR协调遗漏修正：闭环流程的预期间隔 %.0f 毫秒", flow_interval_ms)
+
+    @events.request.add_listener
+    def on_request(request_type, name, response_time, **kwargs):
+        corrected_ms = None
+        interval_ms = 0.0
+        intended = intended_start.get()
+        if request_type == "FLOW":
+            if intended is not None:
+                corrected_ms = (time.monotonic() - intended) * 1000
+            else:
+                interval_ms = flow_interval_ms
+        elif intended is not None:
+            # 开环模式下流程内的请求和步骤：加上流程比计划晚开始的时间
+            corrected_ms = (response_time or 0.0) + start_delay_ms.get()
+        histograms.record(f"{request_type} {name}", response_time or 0.0, corrected_ms, interval_ms)
+
+    @events.report_to_master.add_listener
+    def on_report_to_master(client_id, data, **kwargs):
+        data["hdr_histograms"] = histograms.drain()
+
+    @events.worker_report.add_listener
+    def on_worker_report(client_id, data, **kwargs):
+        histograms.merge(data.get("hdr_histograms", {}))
+
+    @events.test_start.add_listener
+    def on_test_start(**kwargs):
+        histograms.reset()
+
+    @events.quitting.add_listener
+    def on_quitting(environment, **kwargs):
+        if is_worker:
+            return
+        for key, row in histograms.report().items():
+            logger.info("HDR延迟 %s: %s", key, json.dumps(row, ensure_ascii=False))
+        csv_prefix = getattr(environment.parsed_options, "csv_prefix", None) if environment.parsed_options else None
+        if csv_prefix:
+            write_csv(f"{csv_prefix}_hdr.csv")
+
+    if is_worker:
+        return
+    if environment.web_ui:
+        @environment.web_ui.app.route("/hdr")
+        def hdr_report():
+            return histograms.report()
+    elif config.HDR_HTTP_PORT:
+        from gevent.pywsgi import WSGIServer
+        server = WSGIServer(("0.0.0.0", config.HDR_HTTP_PORT), _serve_report, log=None)
+        server.start()
+        logger.info("HDR延迟报告接口: http://0.0.0.0:%s/hdr", config.HDR_HTTP_PORT)
@@ -0,0 +1,325 @@
+"""
+负载曲线模块 - 从配置文件（YAML或JSON）读取分阶段的负载曲线，驱动Locust的LoadTestShape
+
+配置文件格式：
+
+    time_scale: 288            # 可选，时间压缩倍数：配置中的时长按该倍数压缩，288表示24小时在5分钟内跑完
+    spawn_rate: 10             # 可选，各阶段默认的用户启动速率（个/秒）
+    phases:
+      - {type: warmup, duration: 1h, users: 10, weights: {simple_query: 1, simple_login: 1, booking: 0}}
+      - {type: ramp, duration: 2h, users: 200}
+      - {type: sine, duration: 24h, min_users: 50, max_users: 400, period: 24h}
+      - {type: spike, duration: 30m, users: 200, spike_users: 800, spike_at: 10m, spike_duration: 5m}
+      - {type: step, duration: 1h, start_users: 100, step_users: 50, step_duration: 10m}
+      - {type: sawtooth, duration: 2h, min_users: 50, max_users: 300, period: 30m}
+      - {type: steady, duration: 1h, users: 200, weights: {simple_query: 3, simple_login: 1, booking: 6}}
+
+阶段类型：
+- warmup / steady: 固定用户数 users
+- ramp: 从 start_users（默认为上一阶段结束时的用户数）线性变化到 users
+- spike: 基准用户数 users，在阶段内 spike_at 时刻起的 spike_duration 内升到 spike_users
+- sine: 昼夜曲线，在 min_users 和 max_users 之间按余弦变化（从 min_users 开始），周期 period（默认为阶段时长）
+- step: 从 start_users 起每 step_duration 增加 step_users（可用 max_users 限制上限）
+- sawtooth: 每个周期 period 内从 min_users 线性升到 max_users 后回落
+
+时长可以是秒数或 "90s"、"30m"、"1h30m" 这样的字符串。每个阶段都可以设置 spawn_rate 和 weights；
+weights 为流程权重（流程名称同 config.OPEN_LOOP_RATES），未设置时沿用上一阶段的权重，
+初始权重与 TrainTicketUser 中 @task 的权重相同。所有阶段结束后测试停止。
+
+流程权重由master（或单机进程）在阶段切换时通过自定义消息 flow_weights 广播给所有worker，
+闭环用户的任务按当前权重选择流程（见 locustfile.weighted_flow）
+"""
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from locust import LoadTestShape
+from locust.util.timespan import parse_timespan
+import config
+import utils
+
+logger = logging.getLogger(__name__)
+
+# 初始流程权重，与TrainTicketUser中 @task(3)、@task(1)、@task(2) 相同
+DEFAULT_FLOW_WEIGHTS: dict[str, float] = {
+    "simple_query": 3.0,
+    "simple_login": 1.0,
+    "booking": 2.0,
+    # 注册流程不在TrainTicketUser的 @task 中，需要在负载曲线的weights中显式开启
+    "register": 0.0,
+}
+
+# 各阶段默认的用户启动速率（个/秒）
+DEFAULT_SPAWN_RATE = 10.0
+
+# 流程权重未变化时也定期重新广播的间隔（秒），使后加入的worker也能收到当前权重
+WEIGHTS_RESEND_INTERVAL = 10.0
+
+PHASE_TYPES = ("warmup", "steady", "ramp", "spike", "sine", "step", "sawtooth")
+
+# 各阶段类型必须配置的参数
+PHASE_REQUIRED_KEYS: dict[str, tuple[str, ...]] = {
+    "warmup": ("users",),
+    "steady": ("users",),
+    "ramp": ("users",),
+    "spike": ("users", "spike_users", "spike_at", "spike_duration"),
+    "sine": ("min_users", "max_users"),
+    "step": ("start_users", "step_users", "step_duration"),
+    "sawtooth": ("min_users", "max_users", "period"),
+}
+
+# 用户数参数（step_users可以为负数，表示逐步减压）
+USER_KEYS = ("users", "start_users", "min_users", "max_users", "spike_users")
+
+# 时长参数，period和step_duration用作除数，必须大于0
+DURATION_KEYS = ("duration", "spike_at", "spike_duration", "period", "step_duration")
+POSITIVE_DURATION_KEYS = ("duration", "period", "step_duration")
+
+
+class FlowWeights:
+    """当前的流程权重，支持在运行中替换"""
+
+    def __init__(self, weights: dict[str, float]):
+        self.update(weights)
+
+    def update(self, weights: dict[str, float]):
+        """
+        替换流程权重
+
+        Args:
+            weights: 流程名称到权重的映射
+
+        Raises:
+            ValueError: 流程名称未知或权重总和不大于0
+        """
+        unknown = set(weights) - set(DEFAULT_FLOW_WEIGHTS)
+        if unknown:
+            raise ValueError(f"未知的流程名称: {sorted(unknown)}")
+        self.weights = dict(weights)
+        self._names = list(self.weights)
+        self._sampler = utils.AliasSampler([self.weights[name] for name in self._names])
+
+    def sample(self) -> str:
+        """
+        按权重随机选择一个流程
+
+        Returns:
+            流程名称
+        """
+        return self._names[self._sampler.sample()]
+
+
+# 进程内共享的流程权重（worker收到master广播后更新）
+flow_weights = FlowWeights(DEFAULT_FLOW_WEIGHTS)
+
+
+def _seconds(value: object) -> float:
+    """
+    把时长配置转换为秒数
+
+    Args:
+        value: 数字（秒）或 "1h30m" 形式的字符串
+
+    Returns:
+        秒数
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(parse_timespan(str(value)))
+
+
+def _check_phase(index: int, phase: dict[str, object]):
+    """
+    检查阶段的参数，使配置错误在启动时暴露，而不是在运行中计算用户数时出错
+
+    Args:
+        index: 阶段序号（从0开始）
+        phase: 阶段配置
+
+    Raises:
+        ValueError: 缺少必需的参数，或参数的类型、取值无效
+    """
+    name = f"第{index + 1}个阶段（{phase['type']}）"
+    missing = [key for key in ("duration",) + PHASE_REQUIRED_KEYS[phase["type"]] if key not in phase]
+    if missing:
+        raise ValueError(f"{name}缺少参数: {', '.join(missing)}")
+    for key in USER_KEYS + ("step_users",):
+        if key in phase and (isinstance(phase[key], bool) or not isinstance(phase[key], (int, float))):
+            raise ValueError(f"{name}的{key}必须是数字: {phase[key]!r}")
+        if key in USER_KEYS and key in phase and phase[key] < 0:
+            raise ValueError(f"{name}的{key}不能为负数: {phase[key]}")
+    for key in DURATION_KEYS:
+        if key not in phase:
+            continue
+        try:
+            seconds = _seconds(phase[key])
+        except ValueError as e:
+            raise ValueError(f"{name}的{key}不是有效的时长: {phase[key]!r}") from e
+        if seconds < 0 or (key in POSITIVE_DURATION_KEYS and seconds <= 0):
+            raise ValueError(f"{name}的{key}必须大于0: {phase[key]!r}")
+
+
+def load_profile(path: str | Path) -> dict[str, object]:
+    """
+    读取负载曲线配置文件
+
+    Args:
+        path: 配置文件路径（.yaml/.yml使用YAML解析，其他按JSON解析）
+
+    Returns:
+        配置字典
+
+    Raises:
+        ImportError: YAML文件但没有安装PyYAML
+        ValueError: 配置格式错误
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("读取YAML负载曲线需要安装PyYAML（pip install pyyaml），或改用JSON格式") from e
+        profile = yaml.safe_load(text)
+    else:
+        profile = json.loads(text)
+
+    if not isinstance(profile, dict) or not profile.get("phases"):
+        raise ValueError(f"负载曲线配置中没有phases: {path}")
+    for index, phase in enumerate(profile["phases"]):
+        if phase.get("type") not in PHASE_TYPES:
+            raise ValueError(f"第{index + 1}个阶段的类型无效: {phase.get('type')}，可选: {', '.join(PHASE_TYPES)}")
+        _check_phase(index, phase)
+
+    # 按阶段切换时的合并方式检查每个阶段的流程权重，错误的权重在启动时而不是在worker收到广播时暴露
+    weights = dict(DEFAULT_FLOW_WEIGHTS)
+    for index, phase in enumerate(profile["phases"]):
+        phase_weights = phase.get("weights", {})
+        if not isinstance(phase_weights, dict):
+            raise ValueError(f"第{index + 1}个阶段的weights必须是流程名称到权重的映射")
+        weights.update(phase_weights)
+        if any(not isinstance(weight, (int, float)) or weight < 0 for weight in weights.values()):
+            raise ValueError(f"第{index + 1}个阶段的流程权重必须是非负数: {weights}")
+        try:
+            FlowWeights(weights)
+        except ValueError as e:
+            raise ValueError(f"第{index + 1}个阶段的流程权重无效: {e}") from e
+    return profile
+
+
+def phase_users(phase: dict[str, object], elapsed: float, previous_users: int) -> int:
+    """
+    计算阶段内某一时刻的目标用户数
+
+    Args:
+        phase: 阶段配置
+        elapsed: 阶段开始后经过的时间（配置时间，秒）
+        previous_users: 上一阶段结束时的用户数
+
+    Returns:
+        目标用户数
+    """
+    kind = phase["type"]
+    duration = _seconds(phase["duration"])
+
+    if kind in ("warmup", "steady"):
+        users = phase["users"]
+    elif kind == "ramp":
+        start = phase.get("start_users", previous_users)
+        users = start + (phase["users"] - start) * min(elapsed / duration, 1.0)
+    elif kind == "spike":
+        spike_at = _seconds(phase["spike_at"])
+        in_spike = spike_at <= elapsed < spike_at + _seconds(phase["spike_duration"])
+        users = phase["spike_users"] if in_spike else phase["users"]
+    elif kind == "sine":
+        period = _seconds(phase.get("period", duration))
+        low, high = phase["min_users"], phase["max_users"]
+        users = low + (high - low) * (1 - math.cos(2 * math.pi * elapsed / period)) / 2
+    elif kind == "step":
+        steps = int(elapsed // _seconds(phase["step_duration"]))
+        users = phase["start_users"] + steps * phase["step_users"]
+        if "max_users" in phase:
+            users = min(users, phase["max_users"])
+    else:
+        period = _seconds(phase["period"])
+        low, high = phase["min_users"], phase["max_users"]
+        users = low + (high - low) * (elapsed % period) / period
+    return max(int(round(users)), 0)
+
+
+class ProfileLoadShape(LoadTestShape):
+    """按配置文件（config.LOAD_SHAPE_PROFILE）分阶段调整用户数、启动速率和流程权重"""
+
+    # 没有配置负载曲线时不启用，用户数仍由 -u/-r 指定
+    abstract = not config.LOAD_SHAPE_PROFILE
+
+    def __init__(self):
+        super().__init__()
+        profile = load_profile(config.LOAD_SHAPE_PROFILE)
+        self.phases: list[dict[str, object]] = profile["phases"]
+        self.time_scale = float(profile.get("time_scale", 1.0))
+        self.default_spawn_rate = float(profile.get("spawn_rate", DEFAULT_SPAWN_RATE))
+        # 每个阶段在配置时间中的结束时刻
+        self._ends: list[float] = []
+        total = 0.0
+        for phase in self.phases:
+            total += _seconds(phase["duration"])
+            self._ends.append(total)
+        self._phase_index = -1
+        self._phase_start_users = 0
+        self._last_users = 0
+        self._weights = dict(DEFAULT_FLOW_WEIGHTS)
+        self._weights_sent_at = float("-inf")
+
+    def tick(self) -> tuple[int, float] | None:
+        """
+        每秒由Locust调用一次
+
+        Returns:
+            (目标用户数, 启动速率)，所有阶段结束后返回None以停止测试
+        """
+        profile_time = self.get_run_time() * self.time_scale
+        index = next((i for i, end in enumerate(self._ends) if profile_time < end), None)
+        if index is None:
+            return None
+
+        phase = self.phases[index]
+        if index != self._phase_index:
+            self._phase_index = index
+            self._phase_start_users = self._last_users
+            self._weights.update(phase.get("weights", {}))
+            logger.info("负载曲线进入第%d个阶段: %s, 流程权重: %s", index + 1, phase["type"], self._weights)
+            self._weights_sent_at = float("-inf")
+
+        if time.monotonic() - self._weights_sent_at >= WEIGHTS_RESEND_INTERVAL:
+            self._broadcast_weights()
+
+        phase_start = self._ends[index] - _seconds(phase["duration"])
+        users = phase_users(phase, profile_time - phase_start, self._phase_start_users)
+        self._last_users = users
+        return users, float(phase.get("spawn_rate", self.default_spawn_rate))
+
+    def _broadcast_weights(self):
+        """把当前流程权重发送给所有worker（单机模式下发送给本进程）"""
+        self._weights_sent_at = time.monotonic()
+        if self.runner is not None:
+            self.runner.send_message("flow_weights", self._weights)
+
+
+def init_locust(environment):
+    """
+    在worker（或单机进程）上注册流程权重消息的处理，应在init事件中调用
+
+    Args:
+        environment: Locust的Environment对象
+    """
+    if not config.LOAD_SHAPE_PROFILE or environment.runner is None or type(environment.runner).__name__ == "MasterRunner":
+        return
+
+    def on_flow_weights(environment, msg, **kwargs):
+        if msg.data != flow_weights.weights:
+            flow_weights.update(msg.data)
+            logger.info("流程权重已更新: %s", msg.data)
+
+    environment.runner.register_message("flow_weights", on_flow_weights)
@@ -1,17 +1,59 @@
 """
 Locust负载测试文件 - TrainTicket系统负载生成器
 """
+import itertools
+import time
 import logging
-from locust import HttpUser, task, between
-from flow import SimpleQueryFlow, SimpleLoginFlow, BookingFlow
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from locust import HttpUser, FastHttpUser, task, between, constant, events
+from locust.exception import StopUser
+from action import AuthAction, ContactAction
+from flow import SimpleQueryFlow, SimpleLoginFlow, BookingFlow, SimpleRegisterFlow, BatchRegisterFlow
+from session import SharedSession, UserSession
+import utils
+import config
+import metrics
+import logging_setup
+import recorder
+import histogram
+import load_shape
+import user_pool
+import payload_pool
+from load_shape import ProfileLoadShape
+from arrival import ArrivalScheduler
+from replay import TraceReplayer, check_replay_config, open_trace
+from flow.context import current_user, intended_start, start_delay_ms
+
+# 配置日志（普通文本或异步JSON，见config.LOG_MODE）
+logging_setup.configure_logging()
 logger = logging.getLogger(__name__)
 
+# 进程内的用户序号，用于生成唯一的用户标识（请求记录按用户区分，回放时按用户划分通道）
+_user_sequence = itertools.count(1)
+
+# 进程内的开环流程序号：开环用户同时执行多个流程，每个流程以 用户标识/序号 记录，回放时各自一个通道
+_flow_sequence = itertools.count(1)
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    """Locust初始化时注册自定义指标的汇总与展示、请求追踪记录器、HDR延迟直方图、账号池划分，并加载路线目录、账号池和合成数据池"""
+    metrics.init_locust(environment)
+    recorder.init_locust(environment)
+    histogram.init_locust(environment)
+    load_shape.init_locust(environment)
+    user_pool.init_locust(environment)
+    # 预先加载路线目录并构建路线索引，避免第一个流程承担加载开销
+    utils.get_route_index()
+    user_pool.get_pool()
+    if config.PAYLOAD_POOL_ENABLED:
+        payload_pool.warm_up()
+    # 回放配置错误时在启动时失败（init事件中的异常会使Locust退出），而不是在回放任务中反复出错
+    if config.LOAD_MODEL == "replay" and type(environment.runner).__name__ != "MasterRunner":
+        check_replay_config(config.REPLAY_TRACE, config.REPLAY_SPEED)
+    # Locust加载locustfile后会重新配置日志，异步模式下需要重新挂上队列处理器
+    if config.LOG_MODE == "async_json":
+        logging_setup.configure_logging()
+
 
 class TrainTicketUser(HttpUser):
     """
@@ -19,12 +61,31 @@ class TrainTicketUser(HttpUser):
     模拟用户执行查询和登录操作
     """
     
+    # 通过config.HTTP_BACKEND和config.LOAD_MODEL选择用户类，未选中的用户类不会被Locust使用
+    abstract = config.HTTP_BACKEND != "requests" or config.LOAD_MODEL != "closed"
+    
     # 用户操作之间的等待时间（秒）
     wait_time = between(1, 3)
     
+    # 会话缓存的类型：同一用户的流程依次执行，不需要加锁
+    session_class = UserSession
+    
     def on_start(self):
-        """用户启动时执行，用于初始化"""
-        logger.info("新用户启动")
+        """用户启动时执行，用于初始化：登录一次并缓存token、userId和联系人"""
+        # 从本进程的账号池分片中独占租借一个账号，on_stop时归还
+        self.account = user_pool.get_pool().lease()
+        username, password = self.account["username"], self.account["password"]
+        self.session = self.session_class(username, password)
+        self.user_key = f"{username}#{next(_user_sequence)}"
+        current_user.set(self.user_key)
+        if self.session.ensure(AuthAction(self.client), ContactAction(self.client)):
+            logger.info("新用户启动，已登录: %s", username)
+        else:
+            logger.warning("新用户启动，登录失败，将在下一次Flow中重试: %s", username)
+    
+    def on_stop(self):
+        """用户停止时归还租借的账号"""
+        user_pool.get_pool().release(self.account)
     
     @task(3)
     def simple_query_flow(self):
@@ -34,12 +95,12 @@ class TrainTicketUser(HttpUser):
         Flow内部会自动生成起点、终点和日期
         """
         flow = SimpleQueryFlow(self.client)
-        result = flow.execute()
+        result = flow.run()
         
         if result["success"]:
             logger.info("简单查询流程完成")
         else:
-            logger.warning(f"简单查询流程失败: {result.get('error')}")
+            logger.warning("简单查询流程失败: %s", result.get('error'))
     
     @task(1)
     def simple_login_flow(self):
@@ -49,27 +110,167 @@ class TrainTicketUser(HttpUser):
         Flow内部会自动生成用户名和密码
         """
         flow = SimpleLoginFlow(self.client)
-        result = flow.execute()
+        result = flow.run()
         
         if result["success"]:
             logger.info("简单登录流程完成")
         else:
-            logger.warning(f"简单登录流程失败: {result.get('error')}")
+            logger.warning("简单登录流程失败: %s", result.get('error'))
     
     @task(2)
     def booking_flow(self):
         """
-        执行订票流程（查票 -> 登录 -> 获取联系人 -> 订票）
+        执行订票流程（查票 -> 获取会话 -> 获取联系人 -> 订票）
         权重为2，模拟完整的购票场景
-        Flow内部会自动生成起点、终点、日期和用户凭据
+        Flow内部会自动生成起点、终点和日期，登录态复用on_start中缓存的会话
+        """
+        flow = BookingFlow(self.client, self.session)
+        result = flow.run()
+        
+        if result["success"]:
+            logger.info("订票流程完成，车次: %s, 步骤耗时(ms): %s", result.get('trip_id'), result.get('timings'))
+        else:
+            logger.warning("订票流程失败: %s", result.get('error'))
+    
+    def register_flow(self):
+        """
+        执行注册流程（不是 @task，通过负载曲线的流程权重或开环速率中的"register"开启）
+        config.REGISTER_BATCH_SIZE大于1时每次连续注册一批用户，管理员token在进程内共享
         """
-        flow = BookingFlow(self.client)
-        result = flow.execute()
+        if config.REGISTER_BATCH_SIZE > 1:
+            result = BatchRegisterFlow(self.client).run(config.REGISTER_BATCH_SIZE)
+        else:
+            result = SimpleRegisterFlow(self.client).run()
         
         if result["success"]:
-            logger.info(f"订票流程完成，车次: {result.get('trip_id')}")
+            logger.info("注册流程完成")
         else:
-            logger.warning(f"订票流程失败: {result.get('error')}")
+            logger.warning("注册流程失败: %s", result.get('error'))
+
+
+class TrainTicketFastUser(FastHttpUser):
+    """
+    基于FastHttpUser（geventhttpclient）的用户类
+    任务、权重与TrainTicketUser完全相同，Action层通过传输适配器在两种客户端上返回一致的结果
+    """
+    
+    abstract = config.HTTP_BACKEND != "fasthttp" or config.LOAD_MODEL != "closed"
+    
+    # "default"分组的连接设置：FastHttpSession的超时和连接池大小在创建客户端时确定（见action/connections.py）
+    connection_timeout = config.CONNECTION_SETTINGS["default"]["connect_timeout"]
+    network_timeout = config.CONNECTION_SETTINGS["default"]["read_timeout"]
+    concurrency = config.CONNECTION_SETTINGS["default"]["pool_size"]
+    
+    wait_time = TrainTicketUser.wait_time
+    session_class = TrainTicketUser.session_class
+    tasks = TrainTicketUser.tasks
+    on_start = TrainTicketUser.on_start
+    on_stop = TrainTicketUser.on_stop
+
+
+# 开环模式下流程名称（config.OPEN_LOOP_RATES中的键）到流程任务的映射
+FLOW_TASKS = {
+    "simple_query": TrainTicketUser.simple_query_flow,
+    "simple_login": TrainTicketUser.simple_login_flow,
+    "booking": TrainTicketUser.booking_flow,
+    "register": TrainTicketUser.register_flow,
+}
+
+
+def weighted_flow(user):
+    """按当前流程权重（负载曲线的每个阶段可以修改）选择并执行一个流程"""
+    FLOW_TASKS[load_shape.flow_weights.sample()](user)
+
+
+# 配置了负载曲线时，闭环用户的流程权重不再固定为 @task 中的权重，而是由负载曲线在运行中调整
+if config.LOAD_SHAPE_PROFILE:
+    TrainTicketUser.tasks = [weighted_flow]
+    TrainTicketFastUser.tasks = [weighted_flow]
+
+
+class TrainTicketOpenLoopUser(FastHttpUser if config.HTTP_BACKEND == "fasthttp" else HttpUser):
+    """
+    开环负载模型的用户类（LOAD_MODEL=open时使用）
+    
+    每个开环用户按config.OPEN_LOOP_RATES中的速率产生流程到达，流程在有界协程池中并发执行，
+    到达时刻与被测系统的响应时间无关；池满时丢弃或延迟的到达次数记录在自定义指标open_loop.*中
+    """
+    
+    abstract = config.LOAD_MODEL != "open"
+    
+    # 使用fasthttp后端时"default"分组的超时（连接池大小见下方的concurrency，所有开环流程共用）
+    connection_timeout = TrainTicketFastUser.connection_timeout
+    network_timeout = TrainTicketFastUser.network_timeout
+    wait_time = constant(0)
+    on_start = TrainTicketUser.on_start
+    on_stop = TrainTicketUser.on_stop
+    # 同时执行的订票流程共用一个会话，token过期时只有一个流程重新登录
+    session_class = SharedSession
+    # FastHttpUser的连接池大小与同时执行的流程数一致
+    concurrency = config.OPEN_LOOP_MAX_IN_FLIGHT
+    
+    @task
+    def open_loop(self):
+        """运行到达调度器，直到用户被停止"""
+        scheduler = ArrivalScheduler(
+            config.OPEN_LOOP_RATES,
+            self._launch_flow,
+            config.OPEN_LOOP_MAX_IN_FLIGHT,
+            process=config.OPEN_LOOP_PROCESS,
+            overflow=config.OPEN_LOOP_OVERFLOW
+        )
+        scheduler.run()
+    
+    def _launch_flow(self, flow_name: str, intended_time: float):
+        """
+        执行一次到达的流程
+        
+        Args:
+            flow_name: 流程名称
+            intended_time: 计划到达时刻（time.monotonic()时间）
+        """
+        # 每个流程在自己的协程中执行，用户标识和计划到达时刻只对本次流程可见
+        current_user.set(f"{self.user_key}/{next(_flow_sequence)}")
+        intended_start.set(intended_time)
+        start_delay_ms.set(max(0.0, (time.monotonic() - intended_time) * 1000))
+        FLOW_TASKS[flow_name](self)
+
+
+class TrainTicketReplayUser(FastHttpUser if config.HTTP_BACKEND == "fasthttp" else HttpUser):
+    """
+    追踪回放的用户类（LOAD_MODEL=replay时使用，请以 -u 1 运行）
+    
+    按原始时间间隔（按config.REPLAY_SPEED缩放）回放config.REPLAY_TRACE中的请求，
+    每个原始用户一个回放通道；回放完成后停止本用户
+    """
+    
+    abstract = config.LOAD_MODEL != "replay"
+    
+    wait_time = constant(0)
+    connection_timeout = TrainTicketFastUser.connection_timeout
+    network_timeout = TrainTicketFastUser.network_timeout
+    concurrency = config.REPLAY_MAX_LANES
+    
+    @task
+    def replay(self):
+        """回放整个追踪（无论成功与否都只回放一次，结束后停止本用户）"""
+        replayer = None
+        try:
+            replayer = TraceReplayer(
+                self.client,
+                open_trace(config.REPLAY_TRACE),
+                speed=config.REPLAY_SPEED,
+                max_lanes=config.REPLAY_MAX_LANES,
+                lane_queue_size=config.REPLAY_LANE_QUEUE,
+                lane_idle_timeout=config.REPLAY_LANE_IDLE_TIMEOUT
+            )
+            replayer.run()
+        except Exception as e:
+            logger.error("追踪回放失败，停止回放用户: %s", e, exc_info=True)
+        finally:
+            if replayer is not None:
+                replayer.stop()
+        raise StopUser()
 
 
 """
@@ -85,6 +286,36 @@ class TrainTicketUser(HttpUser):
 保存测试结果到CSV：
    locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10 -t 60s --csv=results
 
+使用FastHttpUser后端（单核RPS更高）：
+   LOCUST_HTTP_BACKEND=fasthttp locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10 -t 60s
+
+并发执行订票流程中相互独立的步骤（默认sequential逐个执行）：
+   FLOW_EXECUTION_MODE=concurrent locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10 -t 60s
+
+异步结构化日志（后台线程写JSON，INFO日志按1%采样）：
+   LOG_MODE=async_json LOG_FILE=locust.jsonl LOG_SAMPLE_RATE=0.01 locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 500 -r 50
+
+记录每个请求的追踪数据（写入traces/目录，每个进程一组文件）：
+   RECORDER=1 locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10
+
+开环负载模型（按到达速率启动流程，每个开环用户的速率见config.OPEN_LOOP_RATES）：
+   LOAD_MODEL=open locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 4 -r 4
+
+按负载曲线配置运行（用户数、启动速率、流程权重分阶段变化，示例见profiles/目录）：
+   LOAD_SHAPE_PROFILE=profiles/diurnal.json locust -f locustfile.py --host=http://10.10.1.98:32677 --headless
+
+以两倍速回放录制的追踪（RECORDER=1生成的traces目录，或combined格式的访问日志）：
+   LOAD_MODEL=replay REPLAY_TRACE=traces REPLAY_SPEED=2 locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 1 -r 1
+
+无头模式下通过 http://localhost:8090/hdr 获取实时HDR延迟报告（结束时写入results_hdr.csv）：
+   HDR_HTTP_PORT=8090 locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10 -t 10m --csv=results
+
+对比两种后端的单核RPS：
+   python scripts/compare_backends.py --host=http://10.10.1.98:32677 -u 200 -t 60s
+
+单机多进程运行（一个master加每个CPU核一个worker，绑定CPU核、自动重启异常退出的worker，Ctrl+C有序停止）：
+   python scripts/run_local.py --host=http://10.10.1.98:32677 -u 2000 -r 100 -t 30m --csv=results --trace
+
 持续运行（后台运行，适合长期压力测试）：
     # 前台运行（可以看到实时输出）
     locust -f locustfile.py --host=http://10.10.1.98:32677 --headless -u 100 -r 10
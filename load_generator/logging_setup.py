@@ -0,0 +1,176 @@
+"""
+日志配置模块 - 支持普通模式和异步结构化（JSON）模式
+
+- plain（默认）：与之前相同的basicConfig文本日志，直接写入stderr
+- async_json：日志记录通过QueueHandler交给后台写线程，由后台线程格式化为一行一个JSON对象后写出；
+  INFO及以下级别按当前流程名称（流程之外按logger名称）采样，WARNING及以上总是输出
+
+后台写线程是真正的操作系统线程：Locust对threading和queue打了gevent补丁，普通的QueueListener线程
+会变成与虚拟用户共用事件循环的greenlet，因此这里使用gevent修补前的_thread和SimpleQueue（见unpatched模块）。
+采样在logger的isEnabledFor中进行（与级别过滤相同的位置），被丢弃的日志不会创建LogRecord；
+所有日志调用使用 logger.info("...%s", arg) 的惰性格式化形式，被过滤或丢弃的日志不会产生格式化开销
+"""
+import atexit
+import json
+import logging
+import random
+from logging.handlers import QueueHandler, QueueListener
+import config
+from flow.context import current_flow
+from unpatched import original
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 异步模式下的队列处理器和后台监听器（进程内只创建一次）
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """把日志记录格式化为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LogSampler:
+    """按流程名称对INFO及以下级别的日志进行采样"""
+
+    def __init__(self, rates: dict[str, float], default_rate: float):
+        """
+        初始化采样器
+
+        Args:
+            rates: 流程名称（Flow类名）或logger名称到采样率（0~1）的映射
+            default_rate: 未配置的流程和logger使用的采样率
+        """
+        self.rates = rates
+        self.default_rate = default_rate
+
+    def sample(self, name: str, level: int) -> bool:
+        """
+        判断一条日志是否保留
+
+        流程中的日志（包括流程调用的Action等模块的日志）按当前流程名称（flow.context.current_flow）
+        查找采样率，流程名称没有配置或不在流程中时按logger名称查找
+
+        Args:
+            name: logger名称
+            level: 日志级别
+
+        Returns:
+            是否保留
+        """
+        if level >= logging.WARNING:
+            return True
+        rate = self.rates.get(current_flow.get())
+        if rate is None:
+            rate = self.rates.get(name, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class SamplingLogger(logging.Logger):
+    """在创建日志记录之前按LogSampler采样的Logger"""
+
+    sampler: LogSampler | None = None
+
+    def isEnabledFor(self, level: int) -> bool:
+        if not super().isEnabledFor(level):
+            return False
+        sampler = SamplingLogger.sampler
+        return sampler is None or sampler.sample(self.name, level)
+
+
+class SamplingRootLogger(SamplingLogger, logging.RootLogger):
+    """启用采样的根logger"""
+
+
+def _install_sampler(sampler: LogSampler):
+    """为已创建和之后创建的所有logger启用采样"""
+    SamplingLogger.sampler = sampler
+    logging.setLoggerClass(SamplingLogger)
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if type(logger) is logging.Logger:
+            logger.__class__ = SamplingLogger
+    if type(logging.root) is logging.RootLogger:
+        logging.root.__class__ = SamplingRootLogger
+
+
+class ThreadQueueListener(QueueListener):
+    """
+    在操作系统线程（而不是gevent greenlet）中运行的QueueListener
+
+    修补后的threading.Thread（包括修补前的Thread类，它内部也调用被修补的_start_new_thread）
+    启动的是greenlet，因此直接使用修补前的_thread模块启动线程
+    """
+
+    def start(self):
+        self._done = original("_thread", "allocate_lock")()
+        self._done.acquire()
+        original("_thread", "start_new_thread")(self._run, ())
+
+    def _run(self):
+        try:
+            self._monitor()
+        finally:
+            self._done.release()
+
+    def stop(self):
+        """写出队列中剩余的日志后结束写线程"""
+        self.enqueue_sentinel()
+        self._done.acquire()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """不在调用方格式化消息的QueueHandler，格式化推迟到后台写线程"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging():
+    """
+    按config.LOG_MODE配置根logger
+
+    Locust会在加载locustfile之后重新配置日志，因此异步模式下需要在init事件中再调用一次，
+    重复调用时复用已经创建的队列和后台线程
+    """
+    global _queue_handler, _listener
+    level = getattr(logging, config.LOG_LEVEL.upper(), logging.INFO)
+
+    if config.LOG_MODE != "async_json":
+        logging.basicConfig(level=level, format=TEXT_FORMAT)
+        return
+
+    if _listener is None:
+        # 不需要线程/进程信息，减少每条日志记录的创建开销
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+        # 修补前的SimpleQueue：greenlet中put不阻塞，写线程中get阻塞时释放GIL
+        log_queue = original("queue", "SimpleQueue")()
+        target = logging.FileHandler(config.LOG_FILE, encoding="utf-8") if config.LOG_FILE else logging.StreamHandler()
+        target.setFormatter(JsonFormatter())
+        # 处理器只在写线程中使用，锁也使用修补前的RLock
+        target.lock = original("threading", "RLock")()
+
+        _queue_handler = DeferredQueueHandler(log_queue)
+        _install_sampler(LogSampler(config.LOG_SAMPLING, config.LOG_DEFAULT_SAMPLE_RATE))
+        _listener = ThreadQueueListener(log_queue, target)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
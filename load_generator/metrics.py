@@ -0,0 +1,150 @@
+"""
+自定义指标模块 - 进程内计数器，在Locust中汇总并与Locust统计一起展示
+
+- 单机模式：计数器在本进程内累加
+- 分布式模式：worker每次上报时把增量附加到报告中，master合并后得到全局总数
+- 展示方式：Web UI接口 /custom_stats、结束时的日志汇总、以及 --csv 指定时输出 {prefix}_custom.csv
+"""
+import csv
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CounterRegistry:
+    """按名称累加的计数器集合"""
+
+    def __init__(self):
+        self._counts: dict[str, float] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """
+        累加计数器
+
+        Args:
+            name: 计数器名称，建议使用"模块.指标"格式，例如"query_planner.skipped.travelservice"
+            value: 增量
+        """
+        self._counts[name] = self._counts.get(name, 0) + value
+
+    def get(self, name: str) -> float:
+        """
+        读取计数器当前值
+
+        Args:
+            name: 计数器名称
+
+        Returns:
+            当前值，不存在时返回0
+        """
+        return self._counts.get(name, 0)
+
+    def snapshot(self) -> dict[str, float]:
+        """
+        获取所有计数器的副本
+
+        Returns:
+            计数器名称到当前值的映射
+        """
+        return dict(self._counts)
+
+    def drain(self) -> dict[str, float]:
+        """
+        取出所有计数器并清零（worker上报增量时使用）
+
+        Returns:
+            清零前的计数器
+        """
+        counts = self._counts
+        self._counts = {}
+        return counts
+
+    def merge(self, counts: dict[str, float]):
+        """
+        合并其他进程上报的计数器（master汇总时使用）
+
+        Args:
+            counts: 计数器名称到增量的映射
+        """
+        for name, value in counts.items():
+            self.incr(name, value)
+
+    def reset(self):
+        """清空所有计数器"""
+        self._counts = {}
+
+
+# 进程内共享的计数器
+counters = CounterRegistry()
+
+
+def summary() -> dict[str, float]:
+    """
+    汇总当前所有自定义指标
+
+    对于"X.hits"/"X.misses"计数器，额外计算命中率"X.hit_ratio"
+
+    Returns:
+        指标名称到值的映射（按名称排序）
+    """
+    stats = counters.snapshot()
+    prefixes = {name.rsplit(".", 1)[0] for name in stats if name.endswith((".hits", ".misses"))}
+    for prefix in prefixes:
+        hits = stats.get(f"{prefix}.hits", 0)
+        total = hits + stats.get(f"{prefix}.misses", 0)
+        stats[f"{prefix}.hit_ratio"] = round(hits / total, 4) if total else 0.0
+    return dict(sorted(stats.items()))
+
+
+def write_csv(path: str):
+    """
+    把自定义指标写入CSV文件
+
+    Args:
+        path: CSV文件路径
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Value"])
+        for name, value in summary().items():
+            writer.writerow([name, value])
+
+
+def init_locust(environment):
+    """
+    在Locust中注册自定义指标的汇总与展示，应在init事件中调用
+
+    Args:
+        environment: Locust的Environment对象
+    """
+    events = environment.events
+
+    @events.report_to_master.add_listener
+    def on_report_to_master(client_id, data, **kwargs):
+        data["custom_counters"] = counters.drain()
+
+    @events.worker_report.add_listener
+    def on_worker_report(client_id, data, **kwargs):
+        counters.merge(data.get("custom_counters", {}))
+
+    @events.test_start.add_listener
+    def on_test_start(environment, **kwargs):
+        counters.reset()
+
+    @events.quitting.add_listener
+    def on_quitting(environment, **kwargs):
+        # worker的计数器已经上报给master，只在master或单机模式下输出
+        if type(environment.runner).__name__ == "WorkerRunner":
+            return
+        stats = summary()
+        if stats:
+            logger.info("自定义指标汇总: %s", json.dumps(stats, ensure_ascii=False))
+        csv_prefix = getattr(environment.parsed_options, "csv_prefix", None) if environment.parsed_options else None
+        if csv_prefix:
+            write_csv(f"{csv_prefix}_custom.csv")
+
+    if environment.web_ui:
+        @environment.web_ui.app.route("/custom_stats")
+        def custom_stats():
+            return summary()
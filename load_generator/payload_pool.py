@@ -0,0 +1,266 @@
+"""
+合成数据池模块 - 预先批量生成随机数据（身份证号、用户名、邮箱、日期、车站等），请求路径上只取出现成的值
+
+每种数据一个双缓冲的环形缓冲区（PayloadRing）：
+- 当前批次用到一半时，在后台的操作系统线程中生成下一批次：Locust对threading打了gevent补丁，
+  普通的Thread会变成与虚拟用户共用事件循环的greenlet，生成整批数据期间不让出，所有虚拟用户都会停顿，
+  因此与logging_setup的写线程相同，使用gevent修补前的_thread启动线程和创建锁（见unpatched模块）
+- 当前批次用完时切换到下一批次；下一批次还没生成好时同步生成，并记录在自定义指标 payload_pool.sync_refill.* 中
+- 安装了NumPy时使用向量化的随机数生成器和字符串拼接批量生成，否则使用random模块逐个生成（批量生成的方式不变）
+- 取值和切换批次在锁内进行（锁内不会切换协程），在真正的多线程中使用（例如scripts/provision_users.py的线程池）
+  也不会把同一个值取出两次
+
+日期表（今天起若干天的 YYYY-MM-DD 字符串）每天只生成一次，取日期时不再调用datetime.now()和strftime
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Callable
+import config
+import metrics
+from unpatched import original
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 身份证号的地区码
+AREA_CODES = ["110", "120", "130", "140", "150", "210", "220", "230", "310", "320", "330", "340", "350"]
+# 身份证号的校验码（简化版，随机选择）
+CHECK_CODES = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "X"]
+EMAIL_DOMAINS = ["gmail.com", "qq.com", "163.com", "sina.com", "outlook.com", "test.com"]
+# 日期表覆盖的最大天数
+MAX_DAYS_AHEAD = 60
+
+
+class PayloadRing:
+    """一种合成数据的双缓冲环形缓冲区"""
+
+    def __init__(self, name: str, generate: Callable[[int], list], size: int):
+        """
+        初始化并同步生成第一批数据
+
+        Args:
+            name: 数据名称（用于指标命名）
+            generate: 批量生成函数，参数为数量，返回值列表
+            size: 每批数量
+        """
+        self.name = name
+        self.size = size
+        self._generate = generate
+        self._current = generate(size)
+        self._position = 0
+        self._next: list | None = None
+        self._refilling = False
+        # 后台生成线程是操作系统线程，使用修补前的锁
+        self._lock = original("_thread", "allocate_lock")()
+
+    def take(self):
+        """
+        取出下一个值
+
+        Returns:
+            预先生成的值
+        """
+        with self._lock:
+            position = self._position
+            if position >= self.size:
+                self._swap()
+                position = 0
+            self._position = position + 1
+            value = self._current[position]
+            refill = position == self.size // 2 and not self._refilling and self._next is None
+            if refill:
+                self._refilling = True
+        # 在锁外启动后台生成线程
+        if refill:
+            original("_thread", "start_new_thread")(self._refill, ())
+        return value
+
+    def _swap(self):
+        """切换到下一批次，下一批次还没生成好时同步生成（调用方持有锁）"""
+        if self._next is None:
+            metrics.counters.incr(f"payload_pool.sync_refill.{self.name}")
+            self._next = self._generate(self.size)
+        else:
+            # 后台生成的批次在这里计数（计数器不是线程安全的，不在生成线程中更新）
+            metrics.counters.incr(f"payload_pool.refill.{self.name}")
+        self._current, self._next = self._next, None
+
+    def _refill(self):
+        """在后台线程中生成下一批次，生成好后在锁内放入"""
+        batch = None
+        try:
+            batch = self._generate(self.size)
+        finally:
+            with self._lock:
+                if batch is not None and self._next is None:
+                    self._next = batch
+                self._refilling = False
+
+
+def _generate_id_numbers(count: int) -> list[str]:
+    """批量生成18位身份证号：地区码 + 出生日期(1970~2000) + 顺序码 + 校验码"""
+    if np is not None:
+        rng = np.random.default_rng()
+        birth = rng.integers(1970, 2001, count) * 10000 + rng.integers(1, 13, count) * 100 + rng.integers(1, 29, count)
+        numbers = np.char.add(np.array(AREA_CODES)[rng.integers(0, len(AREA_CODES), count)], birth.astype("U8"))
+        numbers = np.char.add(numbers, rng.integers(100, 1000, count).astype("U3"))
+        return np.char.add(numbers, np.array(CHECK_CODES)[rng.integers(0, len(CHECK_CODES), count)]).tolist()
+    return [
+        f"{random.choice(AREA_CODES)}{random.randint(1970, 2000)}{random.randint(1, 12):02d}"
+        f"{random.randint(1, 28):02d}{random.randint(100, 999)}{random.choice(CHECK_CODES)}"
+        for _ in range(count)
+    ]
+
+
+def _generate_usernames(count: int) -> list[str]:
+    """批量生成用户名：test + 6位随机数"""
+    if np is not None:
+        suffixes = np.random.default_rng().integers(100000, 1000000, count).astype("U6")
+        return np.char.add("test", suffixes).tolist()
+    return [f"test{random.randint(100000, 999999)}" for _ in range(count)]
+
+
+def _generate_email_domains(count: int) -> list[str]:
+    """批量选择邮箱域名"""
+    if np is not None:
+        return np.array(EMAIL_DOMAINS)[np.random.default_rng().integers(0, len(EMAIL_DOMAINS), count)].tolist()
+    return random.choices(EMAIL_DOMAINS, k=count)
+
+
+def _generate_emails(count: int) -> list[str]:
+    """批量生成邮箱：user + 6位随机数 @ 域名"""
+    if np is not None:
+        suffixes = np.random.default_rng().integers(100000, 1000000, count).astype("U6")
+        local = np.char.add(np.char.add("user", suffixes), "@")
+        return np.char.add(local, np.array(_generate_email_domains(count))).tolist()
+    return [f"user{random.randint(100000, 999999)}@{domain}" for domain in _generate_email_domains(count)]
+
+
+def _generate_register_data(count: int) -> list[tuple[str, int, str, str]]:
+    """批量生成注册数据：(用户名, 性别, 证件号码, 邮箱)，邮箱使用用户名"""
+    usernames = _generate_usernames(count)
+    id_numbers = _generate_id_numbers(count)
+    domains = _generate_email_domains(count)
+    if np is not None:
+        genders = np.random.default_rng().integers(0, 2, count).tolist()
+    else:
+        genders = [random.randint(0, 1) for _ in range(count)]
+    return [
+        (username, gender, id_number, f"{username}@{domain}")
+        for username, gender, id_number, domain in zip(usernames, genders, id_numbers, domains)
+    ]
+
+
+def _generate_days(min_days: int, max_days: int, count: int) -> list[int]:
+    """批量生成日期距今的天数（min_days~max_days）"""
+    if np is not None:
+        return np.random.default_rng().integers(min_days, max_days + 1, count).tolist()
+    return [random.randint(min_days, max_days) for _ in range(count)]
+
+
+def _generate_stations(count: int) -> list[int]:
+    """批量生成车站下标（config.DEFAULT_STATIONS中的位置）"""
+    if np is not None:
+        return np.random.default_rng().integers(0, len(config.DEFAULT_STATIONS), count).tolist()
+    return [random.randrange(len(config.DEFAULT_STATIONS)) for _ in range(count)]
+
+
+class DateTable:
+    """今天起 0 ~ MAX_DAYS_AHEAD 天的日期字符串，跨过零点后重新生成"""
+
+    def __init__(self):
+        self._dates: list[str] = []
+        self._valid_until = 0.0
+
+    def get(self, days_ahead: int) -> str:
+        """
+        获取若干天后的日期
+
+        Args:
+            days_ahead: 距今天数（0 ~ MAX_DAYS_AHEAD）
+
+        Returns:
+            日期字符串，格式：YYYY-MM-DD
+        """
+        if time.time() >= self._valid_until:
+            self._rebuild()
+        return self._dates[days_ahead]
+
+    def _rebuild(self):
+        today = date.today()
+        self._dates = [(today + timedelta(days=days)).strftime("%Y-%m-%d") for days in range(MAX_DAYS_AHEAD + 1)]
+        self._valid_until = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+dates = DateTable()
+
+# 数据名称到批量生成函数的映射
+GENERATORS: dict[str, Callable[[int], list]] = {
+    "id_number": _generate_id_numbers,
+    "username": _generate_usernames,
+    "email": _generate_emails,
+    "email_domain": _generate_email_domains,
+    "register": _generate_register_data,
+    "station": _generate_stations,
+}
+
+# 预热的天数范围（utils.get_random_travel_date使用的1~30天）
+WARM_UP_DAYS = [(1, 30)]
+
+# 各种数据的缓冲区，首次使用时创建
+_rings: dict[str, PayloadRing] = {}
+
+
+def _ring(name: str) -> PayloadRing:
+    ring = _rings.get(name)
+    if ring is None:
+        ring = _rings[name] = PayloadRing(name, GENERATORS[name], config.PAYLOAD_POOL_SIZE)
+    return ring
+
+
+def _days_ring(min_days: int, max_days: int) -> PayloadRing:
+    name = f"days_{min_days}_{max_days}"
+    ring = _rings.get(name)
+    if ring is None:
+        ring = _rings[name] = PayloadRing(name, partial(_generate_days, min_days, max_days), config.PAYLOAD_POOL_SIZE)
+    return ring
+
+
+def take(name: str):
+    """
+    从指定数据的缓冲区中取出下一个值
+
+    Args:
+        name: 数据名称（GENERATORS中的键）
+
+    Returns:
+        预先生成的值
+    """
+    return _ring(name).take()
+
+
+def take_days(min_days: int, max_days: int) -> int:
+    """
+    从指定范围的天数缓冲区中取出下一个值（每个范围一个缓冲区）
+
+    Args:
+        min_days: 最小天数
+        max_days: 最大天数
+
+    Returns:
+        min_days~max_days之间的天数
+    """
+    return _days_ring(min_days, max_days).take()
+
+
+def warm_up():
+    """预先生成所有数据的第一批和日期表，避免第一个请求承担生成开销（应在Locust的init事件中调用）"""
+    for name in GENERATORS:
+        _ring(name)
+    for min_days, max_days in WARM_UP_DAYS:
+        _days_ring(min_days, max_days)
+    dates.get(0)
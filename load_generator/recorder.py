@@ -0,0 +1,398 @@
+"""
+请求追踪记录器 - 把每个请求以紧凑的定长二进制记录流式写入磁盘
+
+监听Locust的request事件，每个请求写一条记录：
+时间戳、用户、流程名称、步骤、端点（统计名称）、请求路径、HTTP状态码、业务status字段、延迟、响应字节数
+
+文件格式（小端序）：
+- 文件头: MAGIC（6字节）
+- 字符串定义记录: b"S" + id(uint16) + 长度(uint16) + UTF-8字节
+  字符串（用户、流程名、步骤、端点、路径等）在每个文件内首次出现时定义一次，之后用id引用
+- 请求记录: b"R" + 定长字段（见RECORD_STRUCT）
+
+内存占用有界：只保留写缓冲区和当前文件的字符串表，缓冲区达到阈值或超过刷新间隔时写盘，
+文件超过大小上限或字符串表写满时轮转到新文件；
+每个进程（Locust worker）写自己的文件（文件名包含主机名和进程号），多个worker并行写入互不竞争
+"""
+import heapq
+import logging
+import os
+import re
+import socket
+import struct
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Iterator
+import config
+from flow.context import current_flow, current_step, current_user
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TTREC2"
+FILE_SUFFIX = ".ttrec"
+
+# 字符串定义记录头：类型、id、长度
+STRING_STRUCT = struct.Struct("<cHH")
+
+# 请求记录：类型、时间戳、延迟(ms)、响应字节数、HTTP状态码、业务status、
+# 请求类型id、流程id、步骤id、端点id、路径id、用户id
+RECORD_STRUCT = struct.Struct("<cdfIHhHHHHHH")
+
+# 业务status字段未知（响应不是JSON或没有status字段）时的取值
+STATUS_UNKNOWN = -32768
+
+# 每个文件字符串表的最大条目数（id为uint16）
+MAX_STRINGS = 0xFFFF
+
+# 只在响应体开头查找业务status字段，避免完整解析JSON
+_STATUS_PATTERN = re.compile(rb'"status"\s*:\s*(-?\d+)')
+_STATUS_SCAN_BYTES = 256
+
+# 追踪文件名中的序号后缀：trace-{主机名}-{进程号}-{序号}.ttrec
+_SEQUENCE_SUFFIX = re.compile(r"-\d+$")
+
+
+def extract_business_status(response) -> int:
+    """
+    从响应体开头提取TrainTicket的业务status字段
+
+    Args:
+        response: Locust的响应对象（可能为None）
+
+    Returns:
+        业务status值，未找到时返回STATUS_UNKNOWN
+    """
+    content = getattr(response, "content", None)
+    if not content:
+        return STATUS_UNKNOWN
+    match = _STATUS_PATTERN.search(content[:_STATUS_SCAN_BYTES])
+    if match is None:
+        return STATUS_UNKNOWN
+    value = int(match.group(1))
+    return value if -32768 < value < 32768 else STATUS_UNKNOWN
+
+
+class TraceRecorder:
+    """单个进程的追踪记录器"""
+
+    def __init__(self, directory: str, max_file_bytes: int, max_files: int, flush_bytes: int, flush_interval: float,
+                 file_prefix: str | None = None):
+        """
+        初始化记录器（第一次写入时才创建文件）
+
+        Args:
+            directory: 输出目录
+            max_file_bytes: 单个文件的大小上限，超过后轮转
+            max_files: 最多保留的文件数，超过时删除最旧的文件，0表示不限制
+            flush_bytes: 写缓冲区达到该大小时写盘
+            flush_interval: 距离上次写盘超过该时间（秒）时写盘
+            file_prefix: 文件名前缀（可选，默认为 trace-{主机名}-{进程号}）
+        """
+        self.directory = Path(directory)
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.file_prefix = file_prefix or f"trace-{socket.gethostname()}-{os.getpid()}"
+
+        self._file = None
+        self._sequence = 0
+        self._written = 0
+        self._buffer = bytearray()
+        self._strings: dict[str, int] = {}
+        self._last_flush = time.monotonic()
+        self._files: list[Path] = []
+
+    def _intern(self, value: str) -> int:
+        """
+        获取字符串在当前文件中的id，首次出现时写入字符串定义记录
+
+        Args:
+            value: 字符串
+
+        Returns:
+            字符串id
+        """
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings[value] = string_id
+            encoded = value.encode("utf-8")[:0xFFFF]
+            self._buffer += STRING_STRUCT.pack(b"S", string_id, len(encoded))
+            self._buffer += encoded
+        return string_id
+
+    def record(
+        self,
+        timestamp: float,
+        request_type: str,
+        flow: str,
+        step: str,
+        name: str,
+        path: str,
+        http_status: int,
+        business_status: int,
+        latency_ms: float,
+        response_bytes: int,
+        user: str = ""
+    ):
+        """
+        写入一条请求记录
+
+        Args:
+            timestamp: 请求开始时间（Unix时间戳，秒）
+            request_type: 请求类型（GET/POST等）
+            flow: 流程名称
+            step: 步骤名称
+            name: 端点（Locust统计名称）
+            path: 请求路径
+            http_status: HTTP状态码（连接错误时为0）
+            business_status: 业务status字段，未知时为STATUS_UNKNOWN
+            latency_ms: 延迟（毫秒）
+            response_bytes: 响应字节数
+            user: 用户标识（见flow.context.current_user）
+        """
+        if self._file is None:
+            self._open_next_file()
+        # 字符串表写满时轮转，保证id不溢出
+        if len(self._strings) + 6 > MAX_STRINGS:
+            self._rotate()
+
+        self._buffer += RECORD_STRUCT.pack(
+            b"R",
+            timestamp,
+            latency_ms,
+            min(max(response_bytes, 0), 0xFFFFFFFF),
+            min(max(http_status, 0), 0xFFFF),
+            business_status,
+            self._intern(request_type),
+            self._intern(flow),
+            self._intern(step),
+            self._intern(name),
+            self._intern(path),
+            self._intern(user),
+        )
+
+        if len(self._buffer) >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+            if self._written >= self.max_file_bytes:
+                self._rotate()
+
+    def flush(self):
+        """把写缓冲区写入当前文件"""
+        self._last_flush = time.monotonic()
+        if self._file is None or not self._buffer:
+            return
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._written += len(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        """写出剩余数据并关闭当前文件"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def _rotate(self):
+        """关闭当前文件并打开新文件"""
+        self.close()
+        self._open_next_file()
+
+    def _open_next_file(self):
+        """打开下一个输出文件，并按max_files删除最旧的文件"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sequence += 1
+        path = self.directory / f"{self.file_prefix}-{self._sequence:05d}{FILE_SUFFIX}"
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._written = len(MAGIC)
+        self._strings = {}
+        self._buffer = bytearray()
+        self._files.append(path)
+        logger.info("追踪记录写入新文件: %s", path)
+
+        while self.max_files and len(self._files) > self.max_files:
+            oldest = self._files.pop(0)
+            try:
+                oldest.unlink()
+            except OSError as e:
+                logger.warning("删除旧追踪文件失败: %s, %s", oldest, e)
+
+
+def iter_records(path: str | Path) -> Iterator[dict[str, object]]:
+    """
+    流式读取一个追踪文件中的请求记录（不会把整个文件读入内存）
+
+    Args:
+        path: 追踪文件路径
+
+    Yields:
+        请求记录字典，字段：timestamp, user, request_type, flow, step, name, path,
+        http_status, business_status（未知时为None）, latency_ms, response_bytes
+    """
+    strings: dict[int, str] = {}
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是追踪记录文件: {path}")
+        while True:
+            record_type = f.read(1)
+            if not record_type:
+                return
+            if record_type == b"S":
+                header = record_type + f.read(STRING_STRUCT.size - 1)
+                if len(header) < STRING_STRUCT.size:
+                    return
+                _, string_id, length = STRING_STRUCT.unpack(header)
+                strings[string_id] = f.read(length).decode("utf-8", errors="replace")
+            elif record_type == b"R":
+                raw = record_type + f.read(RECORD_STRUCT.size - 1)
+                if len(raw) < RECORD_STRUCT.size:
+                    # 文件末尾不完整的记录（例如进程被强制结束）
+                    return
+                (_, timestamp, latency_ms, response_bytes, http_status, business_status,
+                 request_type_id, flow_id, step_id, name_id, path_id, user_id) = RECORD_STRUCT.unpack(raw)
+                yield {
+                    "timestamp": timestamp,
+                    "user": strings.get(user_id, ""),
+                    "request_type": strings.get(request_type_id, ""),
+                    "flow": strings.get(flow_id, ""),
+                    "step": strings.get(step_id, ""),
+                    "name": strings.get(name_id, ""),
+                    "path": strings.get(path_id, ""),
+                    "http_status": http_status,
+                    "business_status": None if business_status == STATUS_UNKNOWN else business_status,
+                    "latency_ms": latency_ms,
+                    "response_bytes": response_bytes,
+                }
+            else:
+                raise ValueError(f"追踪文件格式错误: {path}, 位置 {f.tell() - 1}")
+
+
+def list_trace_files(directory: str | Path) -> list[Path]:
+    """
+    列出目录中的所有追踪文件（按文件名排序）
+
+    Args:
+        directory: 追踪文件目录
+
+    Returns:
+        追踪文件路径列表
+    """
+    return sorted(Path(directory).glob(f"*{FILE_SUFFIX}"))
+
+
+def group_by_process(files: list[Path]) -> dict[str, list[Path]]:
+    """
+    按写入进程对追踪文件分组，同一进程的文件按序号排序（首尾相接即为该进程的完整追踪）
+
+    Args:
+        files: 追踪文件路径列表
+
+    Returns:
+        进程（文件名去掉序号后缀，即 trace-{主机名}-{进程号}）到文件列表的映射
+    """
+    by_process: dict[str, list[Path]] = {}
+    for file in sorted(files):
+        by_process.setdefault(_SEQUENCE_SUFFIX.sub("", file.stem), []).append(file)
+    return by_process
+
+
+def merge_traces(files: list[Path], output_directory: str | Path, file_prefix: str = "trace-merged") -> int:
+    """
+    把多个进程（例如各Locust worker）的追踪文件按时间戳归并为一组追踪文件
+
+    每个进程的记录按原顺序读取、不同进程之间按时间戳归并；用户标识加上进程前缀（进程/用户），
+    不同进程的同名用户在回放时仍然是不同的通道。流式读写，内存占用与进程数成正比
+
+    Args:
+        files: 要归并的追踪文件
+        output_directory: 输出目录（不应与输入文件在同一目录，否则再次列出目录时会重复读取）
+        file_prefix: 输出文件名前缀
+
+    Returns:
+        写入的记录数
+    """
+    def process_stream(process: str, process_files: list[Path]) -> Iterator[dict[str, object]]:
+        for record in chain.from_iterable(iter_records(file) for file in process_files):
+            record["user"] = f"{process}/{record['user']}"
+            yield record
+
+    streams = [process_stream(process, process_files) for process, process_files in group_by_process(files).items()]
+    writer = TraceRecorder(
+        str(output_directory),
+        max_file_bytes=config.RECORDER_MAX_FILE_MB * 1024 * 1024,
+        max_files=0,
+        flush_bytes=config.RECORDER_FLUSH_BYTES,
+        flush_interval=config.RECORDER_FLUSH_INTERVAL,
+        file_prefix=file_prefix,
+    )
+    count = 0
+    for record in heapq.merge(*streams, key=lambda record: record["timestamp"]):
+        business_status = record["business_status"]
+        writer.record(
+            timestamp=record["timestamp"],
+            request_type=record["request_type"],
+            flow=record["flow"],
+            step=record["step"],
+            name=record["name"],
+            path=record["path"],
+            http_status=record["http_status"],
+            business_status=STATUS_UNKNOWN if business_status is None else business_status,
+            latency_ms=record["latency_ms"],
+            response_bytes=record["response_bytes"],
+            user=record["user"],
+        )
+        count += 1
+    writer.close()
+    return count
+
+
+def init_locust(environment):
+    """
+    在Locust中注册请求追踪记录器（config.RECORDER_ENABLED为True时生效），应在init事件中调用
+
+    Args:
+        environment: Locust的Environment对象
+    """
+    if not config.RECORDER_ENABLED:
+        return
+
+    recorder = TraceRecorder(
+        config.RECORDER_DIR,
+        max_file_bytes=config.RECORDER_MAX_FILE_MB * 1024 * 1024,
+        max_files=config.RECORDER_MAX_FILES,
+        flush_bytes=config.RECORDER_FLUSH_BYTES,
+        flush_interval=config.RECORDER_FLUSH_INTERVAL,
+    )
+    events = environment.events
+
+    @events.request.add_listener
+    def on_request(request_type, name, response_time, response_length, response=None, exception=None, start_time=None, url=None, **kwargs):
+        path = url or name
+        if "://" in path:
+            path = "/" + path.split("://", 1)[1].partition("/")[2]
+        recorder.record(
+            timestamp=start_time or time.time(),
+            request_type=request_type,
+            flow=current_flow.get(),
+            step=current_step.get(),
+            name=name,
+            path=path,
+            http_status=getattr(response, "status_code", 0) or 0,
+            business_status=extract_business_status(response),
+            latency_ms=response_time or 0.0,
+            response_bytes=response_length or 0,
+            user=current_user.get(),
+        )
+
+    @events.test_stop.add_listener
+    def on_test_stop(**kwargs):
+        recorder.flush()
+
+    @events.quitting.add_listener
+    def on_quitting(**kwargs):
+        recorder.close()
@@ -0,0 +1,428 @@
+"""
+追踪回放引擎 - 把录制的请求追踪按原始时间间隔（可缩放）回放到BASE_URL
+
+支持的追踪来源（都以流式方式读取，不会把整个追踪读入内存）：
+- recorder.py输出的追踪文件或目录：同一进程的文件按序号首尾相接，多个进程的文件按时间戳归并
+- 访问日志（Nginx/Apache combined格式，.gz文件自动解压）
+
+回放规则：
+- 第一条请求立即发送，之后每条请求在 (原始时间戳 - 第一条时间戳) / 速度倍数 时刻发送
+- 按原始流程实例划分回放通道：同一流程实例的请求在一个通道中按原始顺序依次发送，不同流程实例的通道并行
+  （recorder.py的追踪中用户标识即流程实例，开环模式下同一用户同时执行的流程各自独立；
+  流程的FLOW记录结束对应通道，访问日志按用户划分通道）
+- 请求通过BaseAction的请求路径发送，统计名称与实时运行一致；
+  追踪中不包含请求体，POST/PUT请求体按端点模板合成（见BODY_TEMPLATES），
+  每个通道使用按凭据共享的SharedSession获取token（共用账号的通道只登录一次）
+- 账号范围的路径（ACCOUNT_PATH_TEMPLATES，例如 /contactservice/contacts/account/{accountId}）中的账号ID
+  替换为通道会话的用户ID
+- 限制：路径中的订单ID、联系人ID等（VERBATIM_ID_TEMPLATES）属于原始账号的数据，无法映射到测试账号，
+  按原样回放，通常会失败或访问到其他账号的数据；这类请求的次数记录在自定义指标 replay.verbatim_ids 中
+- FLOW/STEP等合成统计不回放（FLOW记录只用于结束通道）
+"""
+import gzip
+import heapq
+import logging
+import re
+import time
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+import gevent
+from gevent.pool import Pool
+from gevent.queue import Queue, Empty
+import config
+import metrics
+import recorder
+import utils
+from action import AuthAction, ContactAction
+from action.base_action import BaseAction
+from action.endpoints import stats_name
+from session import SharedSession, UserSession
+
+logger = logging.getLogger(__name__)
+
+MIN_SPEED = 0.5
+MAX_SPEED = 20.0
+
+HTTP_METHODS = frozenset({"GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"})
+
+# 流程结束标记的方法名：recorder.py追踪中的FLOW记录在流程结束时刻结束所属通道
+FLOW_END = "FLOW"
+
+# 请求实际发送时间比计划时间晚超过该值（秒）时计为回放滞后
+LATE_THRESHOLD = 1.0
+
+# 账号范围的路径模板，其中的账号ID参数（ACCOUNT_PATH_PARAMS）替换为通道会话的用户ID
+ACCOUNT_PATH_TEMPLATES = frozenset({
+    config.API_ENDPOINTS["contact"]["get_by_account"],
+    config.API_ENDPOINTS["user"]["get_by_id"],
+    config.API_ENDPOINTS["inside_payment"]["topup"],
+})
+ACCOUNT_PATH_PARAMS = frozenset({"{userId}", "{accountId}"})
+
+# 路径中带有原始账号数据ID（订单、联系人）的模板，无法映射到测试账号，按原样回放
+VERBATIM_ID_TEMPLATES = frozenset({
+    config.API_ENDPOINTS["order"]["get_by_id"],
+    config.API_ENDPOINTS["contact"]["get_by_id"],
+})
+
+# combined格式: 地址 - 用户 [时间] "方法 路径 协议" 状态码 ...
+_ACCESS_LOG_PATTERN = re.compile(r'^(\S+) \S+ (\S+) \[([^\]]+)\] "([A-Z]+) (\S+)[^"]*" (\d{3})')
+_ACCESS_LOG_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+
+class ReplayRequest(NamedTuple):
+    """待回放的一条请求"""
+
+    timestamp: float
+    lane: str
+    method: str
+    path: str
+    name: str
+
+
+def iter_recorder_trace(path: str | Path) -> Iterator[ReplayRequest]:
+    """
+    流式读取recorder.py输出的追踪文件（或目录），按时间戳归并
+
+    Args:
+        path: 追踪文件或目录
+
+    Yields:
+        待回放的请求
+    """
+    path = Path(path)
+    files = recorder.list_trace_files(path) if path.is_dir() else [path]
+
+    # 同一进程的文件按序号首尾相接；不同进程的文件并行读取，按时间戳归并
+    def process_stream(process: str, process_files: list[Path]) -> Iterator[ReplayRequest]:
+        for record in chain.from_iterable(recorder.iter_records(file) for file in process_files):
+            if record["request_type"] == FLOW_END:
+                # FLOW记录的时间戳是流程开始时刻，按结束时刻结束通道
+                yield ReplayRequest(
+                    timestamp=record["timestamp"] + record["latency_ms"] / 1000,
+                    lane=f"{process}/{record['user']}",
+                    method=FLOW_END,
+                    path="",
+                    name=record["name"],
+                )
+                continue
+            if record["request_type"] not in HTTP_METHODS:
+                continue
+            yield ReplayRequest(
+                timestamp=record["timestamp"],
+                lane=f"{process}/{record['user']}",
+                method=record["request_type"],
+                path=record["path"] or record["name"],
+                name=record["name"],
+            )
+
+    streams = [process_stream(process, process_files) for process, process_files in recorder.group_by_process(files).items()]
+    return heapq.merge(*streams, key=lambda request: request.timestamp)
+
+
+def iter_access_log(path: str | Path) -> Iterator[ReplayRequest]:
+    """
+    流式读取combined格式的访问日志
+
+    通道按认证用户划分，没有认证用户时按客户端地址划分；无法解析的行会被跳过
+
+    Args:
+        path: 访问日志路径（.gz文件自动解压）
+
+    Yields:
+        待回放的请求
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    skipped = 0
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _ACCESS_LOG_PATTERN.match(line)
+            if match is None:
+                skipped += 1
+                continue
+            address, user, timestamp, method, request_path, _ = match.groups()
+            try:
+                parsed_time = datetime.strptime(timestamp, _ACCESS_LOG_TIME_FORMAT).timestamp()
+            except ValueError:
+                skipped += 1
+                continue
+            yield ReplayRequest(
+                timestamp=parsed_time,
+                lane=user if user != "-" else address,
+                method=method,
+                path=request_path,
+                name=stats_name(request_path),
+            )
+    if skipped:
+        logger.warning("访问日志中有 %d 行无法解析，已跳过: %s", skipped, path)
+
+
+def open_trace(path: str | Path) -> Iterator[ReplayRequest]:
+    """
+    根据路径判断追踪格式并打开
+
+    Args:
+        path: 追踪文件、追踪目录或访问日志
+
+    Returns:
+        按时间顺序的待回放请求迭代器
+    """
+    path = Path(path)
+    if path.is_dir() or path.suffix == recorder.FILE_SUFFIX:
+        return iter_recorder_trace(path)
+    return iter_access_log(path)
+
+
+def check_replay_config(path: str | Path, speed: float):
+    """
+    检查回放配置，应在测试开始前调用，使配置错误在启动时暴露
+
+    Args:
+        path: 追踪文件、追踪目录或访问日志
+        speed: 速度倍数
+
+    Raises:
+        ValueError: 速度倍数超出范围或追踪目录中没有追踪文件
+        FileNotFoundError: 追踪不存在
+    """
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"回放速度倍数必须在 {MIN_SPEED} ~ {MAX_SPEED} 之间: {speed}")
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"回放追踪不存在: {path}")
+    if path.is_dir() and not recorder.list_trace_files(path):
+        raise ValueError(f"追踪目录中没有追踪文件: {path}")
+
+
+def _trip_query_body(state: dict[str, object], session: UserSession) -> dict[str, object]:
+    """查票请求体：随机选择一条有车次的路线，记录在通道状态中供后续订票使用"""
+    route = utils.get_random_route()
+    if route is None:
+        start = utils.get_random_start_station()
+        end = utils.get_random_end_station(start)
+    else:
+        start, end, _ = route
+    state.update(start=start, end=end, date=utils.get_random_travel_date(), trips=[])
+    return {"startPlace": start, "endPlace": end, "departureTime": state["date"]}
+
+
+def _preserve_body(state: dict[str, object], session: UserSession) -> dict[str, object]:
+    """订票请求体：使用通道中最近一次查票的路线和结果"""
+    if "start" not in state:
+        _trip_query_body(state, session)
+    contacts = session.contacts or [{}]
+    return {
+        "accountId": session.user_id,
+        "contactsId": contacts[0].get("id"),
+        "tripId": utils.select_random_trip(state.get("trips") or []),
+        "seatType": "2",
+        "date": state["date"],
+        "from": state["start"],
+        "to": state["end"],
+        "assurance": "0",
+    }
+
+
+def _login_body(state: dict[str, object], session: UserSession) -> dict[str, object]:
+    """登录请求体：使用通道的用户凭据"""
+    return {"username": session.username, "password": session.password, "verificationCode": ""}
+
+
+# 端点到请求体模板的映射，参数为通道状态和通道会话；未列出的端点发送空请求体
+BODY_TEMPLATES: dict[str, Callable[[dict[str, object], UserSession], dict[str, object]]] = {
+    config.API_ENDPOINTS["auth"]["login"]: _login_body,
+    config.API_ENDPOINTS["travel"]["trips_left"]: _trip_query_body,
+    config.API_ENDPOINTS["travel2"]["trips_left"]: _trip_query_body,
+    config.API_ENDPOINTS["preserve"]["preserve"]: _preserve_body,
+    config.API_ENDPOINTS["preserve_other"]["preserve"]: _preserve_body,
+}
+
+
+def _account_path(request: ReplayRequest, session: UserSession) -> str:
+    """
+    把账号范围的请求路径中的账号ID替换为通道会话的用户ID
+
+    Args:
+        request: 待回放的请求（name为匹配的路径模板）
+        session: 通道使用的用户会话
+
+    Returns:
+        替换后的请求路径；不是账号范围的路径时返回原路径
+    """
+    if request.name in VERBATIM_ID_TEMPLATES:
+        metrics.counters.incr("replay.verbatim_ids")
+    if request.name not in ACCOUNT_PATH_TEMPLATES or not session.user_id:
+        return request.path
+    path, separator, query = request.path.partition("?")
+    parts = path.split("/")
+    template = request.name.split("/")
+    if len(parts) != len(template):
+        return request.path
+    for i, segment in enumerate(template):
+        if segment in ACCOUNT_PATH_PARAMS:
+            parts[i] = session.user_id
+    return "/".join(parts) + separator + query
+
+
+class ReplayAction(BaseAction):
+    """按追踪中的方法和路径发送请求的Action"""
+
+    def replay(self, request: ReplayRequest, session: UserSession, state: dict[str, object]) -> dict[str, object] | list[dict[str, object]]:
+        """
+        回放一条请求
+
+        Args:
+            request: 待回放的请求
+            session: 通道使用的用户会话
+            state: 通道状态（在同一通道的请求之间传递查票结果等）
+
+        Returns:
+            响应JSON数据
+        """
+        path = _account_path(request, session)
+        endpoint = path.partition("?")[0]
+        json_data = None
+        if request.method in ("POST", "PUT", "PATCH"):
+            template = BODY_TEMPLATES.get(endpoint)
+            json_data = template(state, session) if template else {}
+        headers = {"Authorization": f"Bearer {session.token}"} if session.token else None
+
+        result = self._request(request.method, path, json_data=json_data, name=request.name, headers=headers)
+
+        # 记录查票结果，供同一通道后续的订票请求选择车次
+        if BODY_TEMPLATES.get(endpoint) is _trip_query_body and isinstance(result, dict):
+            data = result.get("data")
+            if isinstance(data, list):
+                state["trips"] = data
+        return result
+
+
+class TraceReplayer:
+    """按原始时间间隔回放追踪，每个原始流程实例（访问日志为原始用户）一个回放通道"""
+
+    def __init__(
+        self,
+        client,
+        requests: Iterator[ReplayRequest],
+        speed: float = 1.0,
+        max_lanes: int = 1000,
+        lane_queue_size: int = 100,
+        lane_idle_timeout: float = 30.0
+    ):
+        """
+        初始化回放器
+
+        Args:
+            client: Locust的HttpUser.client或FastHttpUser.client对象
+            requests: 按时间顺序的待回放请求（见open_trace）
+            speed: 速度倍数（0.5~20）
+            max_lanes: 同时存在的回放通道数上限
+            lane_queue_size: 每个通道排队请求数上限
+            lane_idle_timeout: 通道空闲超过该时间（秒）后结束
+
+        Raises:
+            ValueError: 速度倍数超出范围
+        """
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"回放速度倍数必须在 {MIN_SPEED} ~ {MAX_SPEED} 之间: {speed}")
+        self.client = client
+        self.requests = requests
+        self.speed = speed
+        self.lane_queue_size = lane_queue_size
+        self.lane_idle_timeout = lane_idle_timeout
+        self.action = ReplayAction(client)
+        self.pool = Pool(max_lanes)
+        self._lanes: dict[str, Queue] = {}
+        # 按凭据共享的会话：原始用户数可能远多于测试账号，避免每个通道各自登录
+        # （SharedSession在会话过期时只让一个通道重新登录，新通道同时启动时也不会重复登录）
+        self._sessions: dict[tuple[str, str], SharedSession] = {}
+
+    def run(self):
+        """按计划时刻把请求分发到各个通道，追踪读完且所有通道发送完毕后返回"""
+        first_timestamp = None
+        started = time.monotonic()
+        for request in self.requests:
+            if first_timestamp is None:
+                first_timestamp = request.timestamp
+            due = started + (request.timestamp - first_timestamp) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                gevent.sleep(delay)
+            self._dispatch(request, due)
+        # 追踪读完后通知各通道发送完排队的请求后结束
+        for queue in list(self._lanes.values()):
+            queue.put(None)
+        self.pool.join()
+        logger.info("追踪回放完成，耗时 %.1f 秒", time.monotonic() - started)
+
+    def stop(self):
+        """结束所有回放通道"""
+        self.pool.kill()
+
+    def _dispatch(self, request: ReplayRequest, due: float):
+        """
+        把请求放入所属通道的队列，通道不存在时创建；流程结束标记结束所属通道
+
+        Args:
+            request: 待回放的请求
+            due: 计划发送时刻（time.monotonic()时间）
+        """
+        if request.method == FLOW_END:
+            # 通道发送完排队的请求后结束；同一标识之后的请求（闭环用户的下一个流程）使用新通道
+            queue = self._lanes.pop(request.lane, None)
+            if queue is not None:
+                queue.put(None)
+            return
+        queue = self._lanes.get(request.lane)
+        if queue is None:
+            if self.pool.full():
+                metrics.counters.incr("replay.lane_wait")
+                self.pool.wait_available()
+            queue = self._lanes[request.lane] = Queue(self.lane_queue_size)
+            self.pool.spawn(self._run_lane, request.lane, queue)
+        if queue.full():
+            metrics.counters.incr("replay.backpressure")
+        queue.put((request, due))
+
+    def _session_for_lane(self) -> SharedSession:
+        """为新通道选择测试账号，返回按凭据共享的会话"""
+        credentials = utils.get_random_user_credentials()
+        session = self._sessions.get(credentials)
+        if session is None:
+            session = self._sessions[credentials] = SharedSession(*credentials)
+        return session
+
+    def _run_lane(self, lane: str, queue: Queue):
+        """
+        依次发送一个通道中的请求，空闲超时后结束
+
+        Args:
+            lane: 通道标识（原始流程实例或用户）
+            queue: 通道的请求队列
+        """
+        session = self._session_for_lane()
+        auth, contact = AuthAction(self.client), ContactAction(self.client)
+        state: dict[str, object] = {}
+        while True:
+            try:
+                item = queue.get(timeout=self.lane_idle_timeout)
+            except Empty:
+                item = None
+            if item is None:
+                # 取队列和删除通道之间没有协程切换，不会丢失刚放入的请求；
+                # 流程结束后同一标识可能已有新通道，只删除本通道
+                if self._lanes.get(lane) is queue:
+                    del self._lanes[lane]
+                return
+            request, due = item
+            metrics.counters.incr("replay.requests")
+            if time.monotonic() - due > LATE_THRESHOLD:
+                metrics.counters.incr("replay.late")
+            session.ensure(auth, contact)
+            try:
+                self.action.replay(request, session, state)
+            except Exception as e:
+                metrics.counters.incr("replay.errors")
+                logger.warning("回放请求失败: %s %s, %s", request.method, request.path, e)
@@ -0,0 +1,167 @@
+"""
+路线目录模块 - 由 scripts/verify_routes.py 生成、负载生成器启动时加载的机器可读路线目录
+
+目录是带版本号的JSON文件（默认 routes_catalogue.json），每个条目是一个站点对上的一种车型：
+
+    {
+      "format": "trainticket-route-catalogue",
+      "version": 1,
+      "generated_at": "2026-10-17T12:00:00",
+      "base_url": "http://10.10.1.98:32677",
+      "dates": ["2026-10-24", "2026-10-31"],
+      "routes": [
+        {"start": "shanghai", "end": "suzhou", "type": "high_speed",
+         "trips": {"2026-10-24": 3, "2026-10-31": 2},
+         "seats": {"2026-10-24": {"comfort": 150, "economy": 400}, ...}}
+      ]
+    }
+
+只依赖标准库（orjson可选），scripts/ 下的脚本也可以直接导入
+"""
+import json
+import mmap
+import os
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CATALOGUE_FORMAT = "trainticket-route-catalogue"
+CATALOGUE_VERSION = 1
+
+
+class RouteCatalogue:
+    """加载后的路线目录"""
+
+    def __init__(self, data: dict[str, object]):
+        """
+        Args:
+            data: 目录JSON数据
+
+        Raises:
+            ValueError: 格式或版本不受支持
+        """
+        if data.get("format") != CATALOGUE_FORMAT:
+            raise ValueError(f"不是路线目录文件: format={data.get('format')}")
+        if data.get("version") != CATALOGUE_VERSION:
+            raise ValueError(f"不支持的路线目录版本: {data.get('version')}，当前支持版本 {CATALOGUE_VERSION}")
+        self.version: int = data["version"]
+        self.generated_at: str = data.get("generated_at", "")
+        self.base_url: str = data.get("base_url", "")
+        self.dates: list[str] = data.get("dates", [])
+        self.entries: list[dict[str, object]] = data.get("routes", [])
+
+    def routes_by_type(self) -> dict[str, dict[str, dict[str, bool]]]:
+        """
+        转换为与config.ROUTES_HIGH_SPEED/ROUTES_NORMAL相同结构的路线表（只包含有车次的站点对）
+
+        Returns:
+            车型到路线表的映射
+        """
+        routes: dict[str, dict[str, dict[str, bool]]] = {"high_speed": {}, "normal": {}}
+        for entry in self.entries:
+            if any(count > 0 for count in entry["trips"].values()):
+                routes.setdefault(entry["type"], {}).setdefault(entry["start"], {})[entry["end"]] = True
+        return routes
+
+    def trip_counts(self) -> dict[tuple[str, str, str], float]:
+        """
+        每个 (起点站, 终点站, 车型) 在各查询日期的平均车次数，用作路线采样权重
+
+        Returns:
+            (起点站, 终点站, 车型) 到平均车次数的映射
+        """
+        counts = {}
+        for entry in self.entries:
+            trips = entry["trips"]
+            if trips:
+                counts[(entry["start"], entry["end"], entry["type"])] = sum(trips.values()) / len(trips)
+        return counts
+
+    def seats(self, start: str, end: str, train_type: str, date: str) -> dict[str, int] | None:
+        """
+        查询某天某个站点对某种车型的余票
+
+        Returns:
+            {"comfort": 舒适座余票, "economy": 经济座余票}，目录中没有该记录时返回None
+        """
+        for entry in self.entries:
+            if (entry["start"], entry["end"], entry["type"]) == (start, end, train_type):
+                return entry.get("seats", {}).get(date)
+        return None
+
+
+def build_catalogue(results: list[dict[str, object]], base_url: str, dates: list[str]) -> dict[str, object]:
+    """
+    根据验证脚本的查询结果构建目录数据
+
+    Args:
+        results: 查询结果，字段：start, end, date, service（车型）, trips（车次数）, seats（{"comfort", "economy"}）
+        base_url: 被验证系统的地址
+        dates: 查询日期
+
+    Returns:
+        目录JSON数据
+    """
+    entries: dict[tuple[str, str, str], dict[str, object]] = {}
+    for result in results:
+        key = (result["start"], result["end"], result["service"])
+        entry = entries.setdefault(key, {"start": key[0], "end": key[1], "type": key[2], "trips": {}, "seats": {}})
+        entry["trips"][result["date"]] = result["trips"]
+        entry["seats"][result["date"]] = result.get("seats", {"comfort": 0, "economy": 0})
+    for entry in entries.values():
+        entry["trips"] = dict(sorted(entry["trips"].items()))
+        entry["seats"] = dict(sorted(entry["seats"].items()))
+    return {
+        "format": CATALOGUE_FORMAT,
+        "version": CATALOGUE_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": base_url,
+        "dates": dates,
+        "routes": [entries[key] for key in sorted(entries)],
+    }
+
+
+def write_catalogue(path: str | Path, data: dict[str, object]):
+    """
+    写入目录文件（先写临时文件再替换，正在启动的worker不会读到写了一半的文件）
+
+    Args:
+        path: 目录文件路径
+        data: 目录JSON数据
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+
+
+def load_catalogue(path: str | Path) -> RouteCatalogue:
+    """
+    内存映射读取目录文件
+
+    Args:
+        path: 目录文件路径
+
+    Returns:
+        路线目录
+
+    Raises:
+        OSError: 文件无法读取
+        ValueError: 文件不是合法的路线目录
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if orjson is not None:
+                view = memoryview(mapped)
+                try:
+                    data = orjson.loads(view)
+                finally:
+                    view.release()
+            else:
+                data = json.loads(mapped[:])
+    return RouteCatalogue(data)
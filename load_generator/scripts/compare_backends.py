@@ -0,0 +1,126 @@
+"""
+HTTP客户端后端对比脚本
+分别使用 requests（HttpUser）和 fasthttp（FastHttpUser）后端以无头模式运行同一个负载，
+统计每种后端的总请求数和负载生成器进程消耗的CPU时间，计算"每核RPS"
+
+每核RPS = HTTP请求总数（不含FLOW、STEP等合成统计） / Locust进程消耗的CPU秒数
+（与墙钟时间无关，反映的是负载生成器本身的效率，而不是被测系统的吞吐量）
+"""
+import argparse
+import csv
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BACKENDS = ["requests", "fasthttp"]
+
+# 统计中属于真实HTTP请求的类型（FLOW、STEP、GOODPUT、DECODE等为合成统计）
+HTTP_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"}
+
+
+def run_backend(backend: str, host: str, users: int, spawn_rate: int, run_time: str, output_dir: Path) -> dict[str, float]:
+    """
+    使用指定后端运行一次Locust
+
+    Args:
+        backend: 后端名称（requests或fasthttp）
+        host: 被测系统地址
+        users: 并发用户数
+        spawn_rate: 每秒启动用户数
+        run_time: 运行时间（Locust格式，例如60s）
+        output_dir: CSV输出目录
+
+    Returns:
+        统计结果：请求数、CPU秒数、墙钟秒数、每核RPS
+    """
+    # Locust在PROJECT_ROOT中运行，CSV前缀使用绝对路径，读取结果时与调用方的当前目录无关
+    csv_prefix = Path(output_dir).resolve() / f"compare_{backend}"
+    command = [
+        sys.executable, "-m", "locust",
+        "-f", str(PROJECT_ROOT / "locustfile.py"),
+        "--host", host,
+        "--headless",
+        "-u", str(users),
+        "-r", str(spawn_rate),
+        "-t", run_time,
+        "--csv", str(csv_prefix),
+        "--only-summary",
+    ]
+    env = dict(os.environ, LOCUST_HTTP_BACKEND=backend)
+
+    print(f"正在运行后端: {backend} ...")
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.monotonic()
+    subprocess.run(command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    wall_seconds = time.monotonic() - wall_start
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    request_count = read_total_requests(Path(f"{csv_prefix}_stats.csv"))
+
+    return {
+        "requests": request_count,
+        "cpu_seconds": cpu_seconds,
+        "wall_seconds": wall_seconds,
+        "rps": request_count / wall_seconds if wall_seconds > 0 else 0.0,
+        "rps_per_core": request_count / cpu_seconds if cpu_seconds > 0 else 0.0,
+    }
+
+
+def read_total_requests(stats_file: Path) -> float:
+    """
+    从Locust的stats CSV中统计HTTP请求总数
+
+    Aggregated行还包括FLOW、STEP、GOODPUT等合成统计，因此只累加类型为HTTP方法的行
+
+    Args:
+        stats_file: *_stats.csv 文件路径
+
+    Returns:
+        HTTP请求总数，文件不存在时返回0
+    """
+    if not stats_file.exists():
+        print(f"❌ 未找到统计文件: {stats_file}")
+        return 0.0
+    total = 0.0
+    with open(stats_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("Type") in HTTP_METHODS:
+                total += float(row.get("Request Count", 0) or 0)
+    return total
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="对比requests和fasthttp两种后端的每核RPS")
+    parser.add_argument("--host", required=True, help="被测系统地址")
+    parser.add_argument("-u", "--users", type=int, default=200, help="并发用户数")
+    parser.add_argument("-r", "--spawn-rate", type=int, default=50, help="每秒启动用户数")
+    parser.add_argument("-t", "--run-time", default="60s", help="每种后端的运行时间")
+    parser.add_argument("--output-dir", default=".", help="CSV输出目录")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for backend in BACKENDS:
+        results[backend] = run_backend(backend, args.host, args.users, args.spawn_rate, args.run_time, output_dir)
+
+    print("\n" + "=" * 60)
+    print(f"{'后端':<10}{'请求数':>10}{'CPU秒':>10}{'RPS':>10}{'每核RPS':>12}")
+    print("=" * 60)
+    for backend, stats in results.items():
+        print(f"{backend:<10}{stats['requests']:>10.0f}{stats['cpu_seconds']:>10.1f}{stats['rps']:>10.1f}{stats['rps_per_core']:>12.1f}")
+
+    baseline = results["requests"]["rps_per_core"]
+    if baseline > 0:
+        print(f"\nfasthttp / requests 每核RPS比值: {results['fasthttp']['rps_per_core'] / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
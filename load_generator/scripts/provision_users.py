@@ -0,0 +1,273 @@
+"""
+测试账号批量注册脚本
+并发注册大量测试账号并为每个账号添加联系人，生成负载生成器使用的账号池文件（JSONL，默认 user_pool.jsonl），
+虚拟用户从账号池中选择账号，避免所有虚拟用户争用同一个账号的联系人和订单
+
+- 使用线程池并发注册（--concurrency 限制并发数），所有线程共享一个带连接池的requests.Session
+- 注册使用缓存的管理员token，只在token即将过期（本地解析JWT的exp）或被拒绝时重新登录
+- 每个账号注册后用该账号登录，补足 --contacts 个联系人（订票流程需要联系人）
+- 每个账号完成后立即追加到账号池文件；账号名按 前缀+序号 生成，重新运行会跳过账号池中已有的账号，
+  已注册但未写入账号池的账号（例如中断时）会直接登录并补足联系人
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import config
+import utils
+from action import AuthAction, ContactAction
+from session import decode_jwt_exp
+
+
+class PooledClient:
+    """
+    线程间共享的HTTP客户端，接口与Locust客户端一致（post/get/put/delete，接受name参数），
+    可以直接传给Action使用
+    """
+
+    def __init__(self, base_url: str, concurrency: int, timeout: float):
+        """
+        Args:
+            base_url: 被测系统地址
+            concurrency: 并发数（连接池大小）
+            timeout: 单个请求超时时间（秒）
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(config.DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _send(self, method: str, endpoint: str, name: str | None = None, **kwargs) -> requests.Response:
+        return self.session.request(method, self.base_url + endpoint, timeout=self.timeout, **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self._send("POST", endpoint, **kwargs)
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self._send("GET", endpoint, **kwargs)
+
+    def put(self, endpoint: str, **kwargs) -> requests.Response:
+        return self._send("PUT", endpoint, **kwargs)
+
+    def delete(self, endpoint: str, **kwargs) -> requests.Response:
+        return self._send("DELETE", endpoint, **kwargs)
+
+
+class AdminToken:
+    """所有线程共享的管理员token，过期前（SESSION_REFRESH_MARGIN秒）或被拒绝后才重新登录"""
+
+    def __init__(self, auth: AuthAction, username: str, password: str):
+        self.auth = auth
+        self.username = username
+        self.password = password
+        self.token = ""
+        self.expires_at = 0.0
+        self.logins = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        """
+        获取可用的管理员token
+
+        Returns:
+            token字符串，登录失败时返回空字符串
+        """
+        with self._lock:
+            if not self.token or time.time() >= self.expires_at - config.SESSION_REFRESH_MARGIN:
+                self.token = self.auth.login(self.username, self.password)
+                self.logins += 1
+                exp = decode_jwt_exp(self.token) if self.token else None
+                self.expires_at = exp if exp is not None else time.time() + config.SESSION_MAX_AGE
+            return self.token
+
+    def invalidate(self, token: str):
+        """
+        使token失效（其他线程已经刷新过时不做任何事）
+
+        Args:
+            token: 被拒绝的token
+        """
+        with self._lock:
+            if self.token == token:
+                self.token = ""
+
+
+class UserPoolWriter:
+    """账号池文件（JSONL），每个账号完成后立即追加写盘"""
+
+    def __init__(self, path: Path, fresh: bool):
+        self.path = path
+        self.users: dict[str, dict[str, object]] = {}
+        if path.exists() and not fresh:
+            for user in utils.load_user_pool(str(path)):
+                self.users[user["username"]] = user
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w" if fresh else "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def append(self, user: dict[str, object]):
+        with self._lock:
+            self.users[user["username"]] = user
+            self._file.write(json.dumps(user, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def create_contacts(contact: ContactAction, user_id: str, token: str, count: int) -> list[str]:
+    """
+    为账户补足联系人
+
+    Returns:
+        账户的联系人ID列表（包括已有的联系人）
+    """
+    existing = contact.get_contacts_by_account(user_id, token)
+    contact_ids = [str(c["id"]) for c in existing if c.get("id")]
+    for i in range(len(contact_ids), count):
+        created = contact.create_contact(
+            account_id=user_id,
+            name=f"Contacts_{i + 1}",
+            document_type=1,
+            document_number=utils.generate_random_id_number(),
+            phone_number=f"1{random.randint(3000000000, 9999999999)}",
+            token=token,
+        )
+        if not created.get("id"):
+            raise RuntimeError(f"添加第{i + 1}个联系人失败")
+        contact_ids.append(str(created["id"]))
+    return contact_ids
+
+
+def provision_one(client: PooledClient, admin: AdminToken, username: str, password: str, contacts: int) -> dict[str, object]:
+    """
+    注册一个账号、登录并补足联系人
+
+    Returns:
+        账号池条目：username, password, userId, contacts（联系人ID列表）
+
+    Raises:
+        RuntimeError: 注册、登录或添加联系人失败
+        requests.RequestException: 请求失败
+    """
+    auth, contact = AuthAction(client), ContactAction(client)
+    register_data = utils.generate_register_data(username, password)
+
+    for attempt in range(2):
+        token = admin.get()
+        if not token:
+            raise RuntimeError("管理员登录失败")
+        result = auth.register(
+            user_name=username,
+            password=password,
+            gender=int(register_data["gender"]),
+            document_type=int(register_data["document_type"]),
+            document_num=str(register_data["document_num"]),
+            email=str(register_data["email"]),
+            token=token,
+        )
+        # token被拒绝（过期或被服务端吊销）时重新登录管理员后重试一次
+        if result.get("status_code") in (401, 403) and attempt == 0:
+            admin.invalidate(token)
+            continue
+        break
+    # 账号已存在（例如上次运行注册后中断）时继续用该账号登录
+    if result.get("status") != 1 and "exist" not in str(result.get("msg", "")).lower():
+        raise RuntimeError(f"注册失败: {result.get('msg') or result.get('message') or result}")
+
+    user_info = auth.login_detail(username, password)
+    if not user_info.get("token") or not user_info.get("userId"):
+        raise RuntimeError("注册后登录失败")
+    user_id, user_token = str(user_info["userId"]), str(user_info["token"])
+
+    return {
+        "username": username,
+        "password": password,
+        "userId": user_id,
+        "contacts": create_contacts(contact, user_id, user_token, contacts),
+    }
+
+
+def provision_users(base_url: str, count: int, prefix: str, password: str, contacts: int, concurrency: int, timeout: float, output: Path, fresh: bool):
+    """批量注册测试账号"""
+    print("=" * 60)
+    print("测试账号批量注册工具")
+    print("=" * 60)
+
+    client = PooledClient(base_url, concurrency, timeout)
+    admin = AdminToken(AuthAction(client), config.ADMIN_USERNAME, config.ADMIN_PASSWORD)
+    if not admin.get():
+        print(f"\n❌ 管理员登录失败: {config.ADMIN_USERNAME}")
+        return
+
+    pool = UserPoolWriter(output, fresh)
+    usernames = [f"{prefix}{i:06d}" for i in range(1, count + 1)]
+    pending = [name for name in usernames if name not in pool.users]
+    done = count - len(pending)
+    print(f"\n目标账号数 {count}，每个账号 {contacts} 个联系人，并发数 {concurrency}")
+    if done:
+        print(f"账号池中已有 {done} 个账号，跳过")
+    print()
+
+    failed = 0
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = {executor.submit(provision_one, client, admin, name, password, contacts): name for name in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            done += 1
+            try:
+                user = future.result()
+            except (RuntimeError, requests.RequestException) as e:
+                failed += 1
+                print(f"[{done}/{count}] {name} ... ⚠ {e}")
+                continue
+            pool.append(user)
+            print(f"[{done}/{count}] {name} ... ✓ {len(user['contacts'])} 个联系人")
+    except KeyboardInterrupt:
+        print("\n已中断，已完成的账号已写入账号池，重新运行即可继续")
+        executor.shutdown(wait=False, cancel_futures=True)
+        pool.close()
+        return
+    executor.shutdown()
+    pool.close()
+
+    elapsed = time.monotonic() - started
+    print(f"\n完成 {len(pending) - failed} 个账号，耗时 {elapsed:.1f} 秒，管理员登录 {admin.logins} 次")
+    if failed:
+        print(f"⚠ {failed} 个账号失败，重新运行可以只重试这些账号")
+    print(f"账号池已保存到: {output}（共 {len(pool.users)} 个账号，负载生成器启动时自动加载）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发注册测试账号并添加联系人，生成账号池文件")
+    parser.add_argument("--base-url", default=config.BASE_URL, help=f"被测系统地址（默认 {config.BASE_URL}）")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="账号池的目标账号数（默认1000）")
+    parser.add_argument("--prefix", default="loadtest_", help="账号名前缀（默认loadtest_，账号名为 前缀+6位序号）")
+    parser.add_argument("--password", default="111111", help="账号密码（默认111111）")
+    parser.add_argument("--contacts", type=int, default=2, help="每个账号的联系人数（默认2）")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="并发注册数（默认16）")
+    parser.add_argument("--timeout", type=float, default=10.0, help="单个请求超时时间（秒，默认10）")
+    parser.add_argument("-o", "--output", default=config.USER_POOL_FILE, help=f"账号池文件（默认 {config.USER_POOL_FILE}）")
+    parser.add_argument("--fresh", action="store_true", help="清空已有账号池后重新生成")
+    args = parser.parse_args()
+
+    provision_users(args.base_url.rstrip("/"), args.count, args.prefix, args.password, args.contacts,
+                    args.concurrency, args.timeout, Path(args.output), args.fresh)
+
+if __name__ == "__main__":
+    main()
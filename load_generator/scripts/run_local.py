@@ -0,0 +1,318 @@
+"""
+单机多进程运行脚本
+在本机启动一个Locust master和N个worker（默认每个CPU核一个），用满所有CPU核：
+
+- 每个进程绑定到一个CPU核（Linux，os.sched_setaffinity），master与最后一个worker共用一个核
+- 被测系统地址、负载曲线（LOAD_SHAPE_PROFILE）、HTTP后端和请求追踪配置通过命令行参数和环境变量转发给所有进程
+- 监控worker进程，异常退出的worker自动重启（每个worker最多 --max-restarts 次），master开启
+  --enable-rebalancing，重启后的worker会重新分到虚拟用户
+- Ctrl+C（SIGINT）或SIGTERM时有序停止：先停止master（master通知worker退出并写出汇总的CSV），
+  超时后再停止剩余的worker；再按一次Ctrl+C立即强制结束
+- 结束时CSV由master汇总输出（--csv，包括自定义指标和HDR直方图），开启 --trace 时把各worker的追踪文件
+  按时间戳归并为一组追踪文件
+
+worker的输出写入 --log-dir 下的 worker-{序号}.log，master的输出直接显示在终端
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import config
+import recorder
+
+# 监控进程状态的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 重启worker前的等待时间（秒）
+RESTART_DELAY = 1.0
+
+# master退出后等待worker自行退出的时间（秒），超时后发送SIGTERM
+WORKER_EXIT_TIMEOUT = 10.0
+
+# 发送SIGTERM后等待进程退出的时间（秒），超时后强制结束
+KILL_TIMEOUT = 5.0
+
+
+def available_cores() -> list[int]:
+    """
+    本进程可以使用的CPU核
+
+    Returns:
+        CPU核编号列表
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_to_core(pid: int, core: int) -> bool:
+    """
+    把进程绑定到一个CPU核
+
+    Args:
+        pid: 进程号
+        core: CPU核编号
+
+    Returns:
+        是否绑定成功（不支持的平台返回False）
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(pid, {core})
+        return True
+    except OSError as e:
+        print(f"⚠ 无法把进程 {pid} 绑定到CPU核 {core}: {e}")
+        return False
+
+
+class LocalCluster:
+    """本机的一个Locust master和多个worker"""
+
+    def __init__(self, args: argparse.Namespace, cores: list[int]):
+        """
+        Args:
+            args: 命令行参数
+            cores: 可用的CPU核（为空时不绑定）
+        """
+        self.args = args
+        self.cores = cores
+        self.log_dir = Path(args.log_dir)
+        self.master: subprocess.Popen | None = None
+        self.workers: list[subprocess.Popen | None] = [None] * args.workers
+        self.restarts = [0] * args.workers
+        # 本次运行启动过的所有worker进程号（用于找到本次运行的追踪文件）
+        self.worker_pids: list[int] = []
+        self.stopping = False
+        self.env = self._build_env()
+
+    def _build_env(self) -> dict[str, str]:
+        """所有进程共用的环境变量"""
+        env = dict(os.environ)
+        if self.args.profile:
+            env["LOAD_SHAPE_PROFILE"] = str(Path(self.args.profile).resolve())
+        if self.args.backend:
+            env["LOCUST_HTTP_BACKEND"] = self.args.backend
+        if self.args.trace:
+            env["RECORDER"] = "1"
+            env["RECORDER_DIR"] = str(Path(self.args.trace_dir).resolve())
+        return env
+
+    def _core_for(self, index: int) -> int | None:
+        """第index个进程（0为master，1~N为worker）绑定的CPU核"""
+        if not self.cores:
+            return None
+        return self.cores[index % len(self.cores)]
+
+    def _locust_command(self) -> list[str]:
+        return [sys.executable, "-m", "locust", "-f", str(PROJECT_ROOT / "locustfile.py"), "--host", self.args.host]
+
+    def start_master(self):
+        """启动master"""
+        args = self.args
+        command = self._locust_command() + [
+            "--master",
+            "--master-bind-port", str(args.master_port),
+            "--expect-workers", str(args.workers),
+            "--enable-rebalancing",
+        ]
+        if not args.web:
+            command.append("--headless")
+        # 配置了负载曲线时用户数和启动速率由负载曲线控制
+        if not args.profile:
+            command += ["-u", str(args.users), "-r", str(args.spawn_rate)]
+        if args.run_time:
+            command += ["-t", args.run_time]
+        if args.csv:
+            command += ["--csv", args.csv]
+        command += args.locust_args
+
+        self.master = subprocess.Popen(command, cwd=PROJECT_ROOT, env=self.env, start_new_session=True)
+        core = self._core_for(0)
+        if core is not None:
+            pin_to_core(self.master.pid, core)
+        print(f"master 已启动（进程 {self.master.pid}，CPU核 {core}）")
+
+    def start_worker(self, index: int):
+        """
+        启动（或重启）第index个worker
+
+        Args:
+            index: worker序号（0 ~ N-1）
+        """
+        command = self._locust_command() + [
+            "--worker",
+            "--master-host", "127.0.0.1",
+            "--master-port", str(self.args.master_port),
+        ]
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_dir / f"worker-{index}.log", "ab") as log_file:
+            worker = subprocess.Popen(command, cwd=PROJECT_ROOT, env=self.env, stdout=log_file,
+                                      stderr=subprocess.STDOUT, start_new_session=True)
+        self.workers[index] = worker
+        self.worker_pids.append(worker.pid)
+        core = self._core_for(index + 1)
+        if core is not None:
+            pin_to_core(worker.pid, core)
+
+    def request_stop(self, signum, frame):
+        """SIGINT/SIGTERM处理：第一次有序停止，第二次立即强制结束"""
+        if self.stopping:
+            print("\n再次收到中断信号，强制结束所有进程")
+            self._kill_all(signal.SIGKILL)
+            sys.exit(1)
+        self.stopping = True
+        print("\n收到中断信号，正在停止（再按一次Ctrl+C强制结束）...")
+
+    def supervise(self) -> int:
+        """
+        监控master和worker，重启异常退出的worker，直到master退出或收到中断信号
+
+        Returns:
+            master的退出码
+        """
+        self.start_master()
+        for index in range(self.args.workers):
+            self.start_worker(index)
+        print(f"{self.args.workers} 个worker已启动，日志目录: {self.log_dir}")
+
+        while not self.stopping and self.master.poll() is None:
+            for index, worker in enumerate(self.workers):
+                code = None if worker is None else worker.poll()
+                if code is None or code == 0:
+                    continue
+                if self.restarts[index] >= self.args.max_restarts:
+                    print(f"❌ worker {index} 异常退出（退出码 {code}），已达到重启次数上限，不再重启")
+                    self.workers[index] = None
+                    continue
+                self.restarts[index] += 1
+                print(f"⚠ worker {index} 异常退出（退出码 {code}），第 {self.restarts[index]} 次重启，"
+                      f"见 {self.log_dir / f'worker-{index}.log'}")
+                time.sleep(RESTART_DELAY)
+                self.start_worker(index)
+            time.sleep(POLL_INTERVAL)
+
+        return self.shutdown()
+
+    def shutdown(self) -> int:
+        """
+        有序停止：先停止master（master通知worker退出并写出CSV），再等待或停止剩余的worker
+
+        Returns:
+            master的退出码
+        """
+        if self.master.poll() is None:
+            self.master.send_signal(signal.SIGTERM)
+        try:
+            code = self.master.wait(timeout=self.args.shutdown_timeout)
+        except subprocess.TimeoutExpired:
+            print(f"⚠ master 在 {self.args.shutdown_timeout} 秒内没有退出，强制结束")
+            self.master.kill()
+            code = self.master.wait()
+
+        # master退出时会通知worker退出，worker退出前写出追踪文件
+        running = self._wait_workers(WORKER_EXIT_TIMEOUT)
+        if running:
+            for worker in running:
+                worker.send_signal(signal.SIGTERM)
+            running = self._wait_workers(KILL_TIMEOUT)
+        if running:
+            print(f"⚠ {len(running)} 个worker没有退出，强制结束")
+            for worker in running:
+                worker.kill()
+            self._wait_workers(KILL_TIMEOUT)
+        return code
+
+    def _wait_workers(self, timeout: float) -> list[subprocess.Popen]:
+        """等待所有worker退出，返回超时后仍在运行的worker"""
+        deadline = time.monotonic() + timeout
+        running = [worker for worker in self.workers if worker is not None and worker.poll() is None]
+        while running and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            running = [worker for worker in running if worker.poll() is None]
+        return running
+
+    def _kill_all(self, sig: int):
+        for process in [self.master, *self.workers]:
+            if process is not None and process.poll() is None:
+                process.send_signal(sig)
+
+    def merge_traces(self) -> Path | None:
+        """
+        把本次运行各worker的追踪文件归并为一组追踪文件
+
+        Returns:
+            归并结果所在目录，没有追踪文件时返回None
+        """
+        trace_dir = Path(self.args.trace_dir)
+        pids = {str(pid) for pid in self.worker_pids}
+        # 进程名为 trace-{主机名}-{进程号}，只归并本次运行的worker写的文件
+        files = [file
+                 for process, process_files in recorder.group_by_process(recorder.list_trace_files(trace_dir)).items()
+                 if process.rsplit("-", 1)[-1] in pids
+                 for file in process_files]
+        if not files:
+            print(f"⚠ 追踪目录 {trace_dir} 中没有本次运行的追踪文件")
+            return None
+        output = trace_dir / f"merged-{time.strftime('%Y%m%d-%H%M%S')}"
+        count = recorder.merge_traces(files, output)
+        print(f"已归并 {len(files)} 个追踪文件（{count} 条记录）到: {output}")
+        return output
+
+
+def main():
+    cores = available_cores()
+    parser = argparse.ArgumentParser(description="在本机启动Locust master和多个worker，用满所有CPU核",
+                                     epilog="-- 之后的参数原样传给master，例如: -- --html report.html")
+    parser.add_argument("--host", default=config.BASE_URL, help=f"被测系统地址（默认 {config.BASE_URL}）")
+    parser.add_argument("-w", "--workers", type=int, default=len(cores), help=f"worker数（默认CPU核数 {len(cores)}）")
+    parser.add_argument("-u", "--users", type=int, default=100, help="虚拟用户总数（默认100，配置了负载曲线时不使用）")
+    parser.add_argument("-r", "--spawn-rate", type=float, default=10, help="每秒启动用户数（默认10，配置了负载曲线时不使用）")
+    parser.add_argument("-t", "--run-time", default=None, help="运行时间（Locust格式，例如 10m；默认运行到Ctrl+C）")
+    parser.add_argument("--profile", default=config.LOAD_SHAPE_PROFILE or None, help="负载曲线配置文件（LOAD_SHAPE_PROFILE）")
+    parser.add_argument("--backend", choices=["requests", "fasthttp"], default=None, help="HTTP客户端后端（LOCUST_HTTP_BACKEND）")
+    parser.add_argument("--csv", default=None, help="CSV文件前缀（master汇总所有worker后输出）")
+    parser.add_argument("--trace", action="store_true", help="开启请求追踪记录，结束时归并各worker的追踪文件")
+    parser.add_argument("--trace-dir", default=config.RECORDER_DIR, help=f"追踪文件目录（默认 {config.RECORDER_DIR}）")
+    parser.add_argument("--web", action="store_true", help="启动Web UI（不使用无头模式）")
+    parser.add_argument("--master-port", type=int, default=5557, help="master端口（默认5557）")
+    parser.add_argument("--max-restarts", type=int, default=3, help="每个worker异常退出后的最多重启次数（默认3）")
+    parser.add_argument("--no-pin", action="store_true", help="不绑定CPU核")
+    parser.add_argument("--log-dir", default="logs", help="worker日志目录（默认logs）")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0, help="停止时等待master退出的时间（秒，默认30）")
+    parser.add_argument("locust_args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.locust_args[:1] == ["--"]:
+        args.locust_args = args.locust_args[1:]
+    if args.workers < 1:
+        parser.error("worker数必须大于0")
+    # master和worker在PROJECT_ROOT中运行，路径参数按调用方的当前目录解析为绝对路径
+    if args.csv:
+        args.csv = str(Path(args.csv).resolve())
+    args.log_dir = str(Path(args.log_dir).resolve())
+    args.trace_dir = str(Path(args.trace_dir).resolve())
+
+    cluster = LocalCluster(args, [] if args.no_pin else cores)
+    signal.signal(signal.SIGINT, cluster.request_stop)
+    signal.signal(signal.SIGTERM, cluster.request_stop)
+
+    start = time.monotonic()
+    code = cluster.supervise()
+    print(f"\n运行结束，耗时 {time.monotonic() - start:.1f} 秒，master退出码 {code}，worker重启 {sum(cluster.restarts)} 次")
+    if args.csv:
+        print(f"汇总CSV: {args.csv}_stats.csv、{args.csv}_stats_history.csv、{args.csv}_failures.csv、"
+              f"{args.csv}_exceptions.csv、{args.csv}_custom.csv")
+    if args.trace:
+        cluster.merge_traces()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
 """
 验证路线脚本
 通过实际查询来验证哪些路线有高铁/动车，哪些有普通火车
-然后生成config中的ROUTES_HIGH_SPEED和ROUTES_NORMAL配置
+然后生成带版本号的路线目录（routes_catalogue.json，格式见route_catalogue.py），
+负载生成器启动时自动加载，不需要再修改config中的ROUTES_HIGH_SPEED和ROUTES_NORMAL
+
+- 使用线程池并发查询（--concurrency 限制并发数），所有线程共享一个带连接池的requests.Session
+- 每个站点对查询多个日期（--days），任一日期有车次即认为该站点对有对应车型
+- 每个查询完成后立即输出结果并追加到检查点文件（JSONL），中断后重新运行会跳过已完成的查询
+- 目录中记录每个站点对、每种车型在各日期的车次数和余票（舒适座/经济座）
 """
-import requests
+import argparse
 import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from route_catalogue import build_catalogue, write_catalogue
 
 BASE_URL = "http://10.10.1.98:32677"
 
@@ -16,18 +33,44 @@ STATIONS = [
     "xuzhou", "zhenjiang", "suzhou"
 ]
 
-def get_all_routes():
+SERVICE_ENDPOINTS = {
+    "high_speed": "/api/v1/travelservice/trips/left",
+    "normal": "/api/v1/travel2service/trips/left",
+}
+
+DEFAULT_CHECKPOINT = "verify_routes.checkpoint.jsonl"
+DEFAULT_OUTPUT = PROJECT_ROOT / "routes_catalogue.json"
+
+
+def create_session(concurrency: int) -> requests.Session:
+    """
+    创建带连接池的会话，连接池大小与并发数一致，所有线程复用连接
+
+    Args:
+        concurrency: 并发数
+
+    Returns:
+        requests会话
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_all_routes(session: requests.Session, base_url: str):
     """获取所有路线信息"""
     endpoint = "/api/v1/routeservice/routes"
-    url = f"{BASE_URL}{endpoint}"
-    
+    url = f"{base_url}{endpoint}"
+
     print(f"正在获取所有路线信息...")
-    response = requests.get(url)
-    
+    response = session.get(url)
+
     if response.status_code != 200:
         print(f"❌ 获取路线失败，状态码: {response.status_code}")
         return None
-    
+
     try:
         data = response.json()
         if isinstance(data, list):
@@ -39,39 +82,39 @@ def get_all_routes():
     except Exception as e:
         print(f"❌ 解析路线数据失败: {e}")
         return None
-    
+
     return None
 
-def query_trips(start, end, date, service_type="high_speed"):
+def query_trips(session: requests.Session, base_url: str, start: str, end: str, date: str, service_type: str, timeout: float) -> list[dict[str, object]]:
     """
     查询车次
     service_type: "high_speed" 或 "normal"
+
+    Returns:
+        车次列表（没有车次时为空列表）
+
+    Raises:
+        requests.RequestException: 请求失败或响应状态码为4xx/5xx
+        ValueError: 响应不是合法JSON
     """
-    if service_type == "high_speed":
-        endpoint = "/api/v1/travelservice/trips/left"
-    else:
-        endpoint = "/api/v1/travel2service/trips/left"
-    
-    url = f"{BASE_URL}{endpoint}"
+    url = f"{base_url}{SERVICE_ENDPOINTS[service_type]}"
     data = {
         "startPlace": start,
         "endPlace": end,
         "departureTime": date
     }
-    
-    try:
-        response = requests.post(url, json=data, timeout=5)
-        if response.status_code == 200:
-            result = response.json()
-            if isinstance(result, list):
-                return len(result) > 0
-            elif isinstance(result, dict):
-                trips = result.get("data", [])
-                if isinstance(trips, list):
-                    return len(trips) > 0
-        return False
-    except:
-        return False
+
+    response = session.post(url, json=data, timeout=timeout)
+    # 4xx/5xx响应（例如并发查询时的503）抛出异常，查询记为失败，重新运行时会再次查询
+    response.raise_for_status()
+    result = response.json()
+    if isinstance(result, list):
+        return result
+    elif isinstance(result, dict):
+        trips = result.get("data", [])
+        if isinstance(trips, list):
+            return trips
+    return []
 
 def extract_stations_from_route(route):
     """
@@ -80,28 +123,28 @@ def extract_stations_from_route(route):
     返回站点名称列表（按顺序）
     """
     stations = []
-    
+
     # 尝试不同的字段名
     stations_data = route.get("stations") or route.get("stationList") or route.get("stationIds")
-    
+
     if isinstance(stations_data, list):
         for station in stations_data:
             if isinstance(station, dict):
                 # 尝试获取站点名称
-                name = (station.get("name") or station.get("stationName") or 
+                name = (station.get("name") or station.get("stationName") or
                        station.get("station") or station.get("id"))
                 if name:
                     stations.append(str(name))
             elif isinstance(station, str):
                 stations.append(station)
-    
+
     # 如果没有stations字段，尝试从startStation和endStation构建
     if not stations:
         start = route.get("startStationName") or route.get("startStation") or route.get("startStationId")
         end = route.get("endStationName") or route.get("endStation") or route.get("endStationId")
         if start and end:
             stations = [start, end]
-    
+
     return stations
 
 def generate_station_pairs(stations):
@@ -116,23 +159,116 @@ def generate_station_pairs(stations):
             pairs.add((stations[i], stations[j]))
     return pairs
 
-def verify_routes():
+
+class Checkpoint:
+    """
+    检查点文件（JSONL）
+
+    第一行是元数据（base_url、创建日期、查询日期），之后每行是一个已完成查询的结果；
+    请求失败的查询不记为完成，重新运行时会再次查询
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta: dict[str, object] = {}
+        self.results: dict[tuple[str, str, str, str], dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @staticmethod
+    def key(result: dict[str, object]) -> tuple[str, str, str, str]:
+        return result["start"], result["end"], result["date"], result["service"]
+
+    def load(self):
+        """读取已有的检查点（文件末尾不完整的行会被忽略）"""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "meta" in entry:
+                    self.meta = entry["meta"]
+                elif entry.get("error") is None:
+                    self.results[self.key(entry)] = entry
+
+    def start(self, meta: dict[str, object], fresh: bool):
+        """
+        打开检查点文件准备追加
+
+        Args:
+            meta: 本次运行的元数据
+            fresh: 为True时丢弃已有的检查点
+        """
+        if fresh or meta != self.meta:
+            self.results = {}
+            self.meta = meta
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write({"meta": meta})
+        else:
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def append(self, result: dict[str, object]):
+        """追加一个查询结果并立即写盘"""
+        with self._lock:
+            if result.get("error") is None:
+                self.results[self.key(result)] = result
+            self._write(result)
+
+    def _write(self, entry: dict[str, object]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def check_one(session: requests.Session, base_url: str, start: str, end: str, date: str, service: str, timeout: float) -> dict[str, object]:
+    """
+    执行一个查询并返回可写入检查点的结果
+
+    Returns:
+        结果字典：start, end, date, service, trips（车次数）, seats（各车次余票之和）, error（失败原因，成功时为None）
+    """
+    result: dict[str, object] = {
+        "start": start, "end": end, "date": date, "service": service,
+        "trips": 0, "seats": {"comfort": 0, "economy": 0}, "error": None,
+    }
+    try:
+        trips = query_trips(session, base_url, start, end, date, service, timeout)
+        result["trips"] = len(trips)
+        result["seats"] = {
+            "comfort": sum(int(trip.get("comfortClass") or 0) for trip in trips if isinstance(trip, dict)),
+            "economy": sum(int(trip.get("economyClass") or 0) for trip in trips if isinstance(trip, dict)),
+        }
+    except (requests.RequestException, ValueError) as e:
+        result["error"] = str(e) or type(e).__name__
+    return result
+
+
+def verify_routes(base_url: str, concurrency: int, days: list[int], timeout: float, checkpoint_path: Path, fresh: bool, output: Path):
     """验证路线"""
     print("=" * 60)
     print("路线验证工具")
     print("=" * 60)
-    
+
+    session = create_session(concurrency)
+
     # 获取所有路线
-    routes = get_all_routes()
+    routes = get_all_routes(session, base_url)
     if not routes:
         print("\n❌ 无法获取路线数据")
         return
-    
+
     print(f"\n获取到 {len(routes)} 条路线")
-    
+
     # 从所有路线中提取站点对
     all_station_pairs = set()
-    
+
     print("\n正在分析路线中的途径站点...")
     for i, route in enumerate(routes):
         if isinstance(route, dict):
@@ -143,93 +279,93 @@ def verify_routes():
                 print(f"  路线 {i+1}: {len(stations)} 个站点 -> {len(pairs)} 个站点对")
                 if len(stations) <= 5:  # 只显示短路线
                     print(f"    站点: {' -> '.join(stations)}")
-    
+
     print(f"\n总共提取到 {len(all_station_pairs)} 个可能的站点对")
-    
-    # 使用未来日期进行查询
-    future_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-    print(f"\n使用日期: {future_date} 进行验证")
-    print("注意：验证过程可能需要较长时间...\n")
-    
-    routes_high_speed = {}
-    routes_normal = {}
-    
-    # 验证每个站点对
-    total = len(all_station_pairs)
-    current = 0
-    
-    for start, end in sorted(all_station_pairs):
-        current += 1
-        print(f"[{current}/{total}] 验证: {start} -> {end}", end=" ... ")
-        
-        # 查询高铁/动车
-        has_high_speed = query_trips(start, end, future_date, "high_speed")
-        # 查询普通火车
-        has_normal = query_trips(start, end, future_date, "normal")
-        
-        if has_high_speed:
-            if start not in routes_high_speed:
-                routes_high_speed[start] = {}
-            routes_high_speed[start][end] = True
-            print("✓ 高铁", end="")
-        
-        if has_normal:
-            if start not in routes_normal:
-                routes_normal[start] = {}
-            routes_normal[start][end] = True
-            print(" ✓ 普通", end="")
-        
-        if not has_high_speed and not has_normal:
-            print("✗ 无车次", end="")
-        
-        print()
-    
-    # 生成配置代码
-    print("\n" + "=" * 60)
-    print("生成的配置代码：")
-    print("=" * 60)
-    
-    config_code = "\n# 路线信息（自动生成）\n"
-    config_code += "# 格式: {起点站: {终点站: True}}\n"
-    config_code += "# 高铁/动车路线（travelservice - G/D列车）\n"
-    config_code += "ROUTES_HIGH_SPEED: dict[str, dict[str, bool]] = {\n"
-    
-    if routes_high_speed:
-        for start, ends in sorted(routes_high_speed.items()):
-            config_code += f'    "{start}": {{\n'
-            for end in sorted(ends.keys()):
-                config_code += f'        "{end}": True,\n'
-            config_code += "    },\n"
-    else:
-        config_code += "    # 未找到高铁/动车路线\n"
-    
-    config_code += "}\n\n"
-    config_code += "# 普通火车路线（travel2service - K/T/Z等列车）\n"
-    config_code += "ROUTES_NORMAL: dict[str, dict[str, bool]] = {\n"
-    
-    if routes_normal:
-        for start, ends in sorted(routes_normal.items()):
-            config_code += f'    "{start}": {{\n'
-            for end in sorted(ends.keys()):
-                config_code += f'        "{end}": True,\n'
-            config_code += "    },\n"
-    else:
-        config_code += "    # 未找到普通火车路线\n"
-    
-    config_code += "}\n"
-    
-    print(config_code)
-    
+
+    # 只恢复当天创建的检查点：之前某天创建的检查点中的日期可能已经过去，
+    # 查询过去的日期会得到空结果，有车次的路线会被误记为没有车次，此时重新开始
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.load()
+    today = datetime.now().strftime("%Y-%m-%d")
+    dates = [(datetime.now() + timedelta(days=d)).strftime("%Y-%m-%d") for d in days]
+    meta = {"base_url": base_url, "days": days, "created": today, "dates": dates}
+    if (not fresh and checkpoint.meta.get("created") == today
+            and checkpoint.meta.get("base_url") == base_url and checkpoint.meta.get("days") == days):
+        meta = checkpoint.meta
+        dates = meta["dates"]
+    elif checkpoint.meta and not fresh:
+        print(f"检查点创建于 {checkpoint.meta.get('created', '未知日期')}（或参数不同），重新开始验证")
+    checkpoint.start(meta, fresh)
+
+    tasks = [
+        (start, end, date, service)
+        for start, end in sorted(all_station_pairs)
+        for date in dates
+        for service in SERVICE_ENDPOINTS
+        if (start, end, date, service) not in checkpoint.results
+    ]
+    total = len(all_station_pairs) * len(dates) * len(SERVICE_ENDPOINTS)
+    done = total - len(tasks)
+    print(f"\n使用日期: {', '.join(dates)} 进行验证，并发数 {concurrency}")
+    if done:
+        print(f"从检查点恢复: 已完成 {done}/{total} 个查询")
+    print()
+
+    labels = {"high_speed": "高铁", "normal": "普通"}
+    failed = 0
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [executor.submit(check_one, session, base_url, *task, timeout) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            checkpoint.append(result)
+            done += 1
+            prefix = f"[{done}/{total}] {result['start']} -> {result['end']} {result['date']} {labels[result['service']]}"
+            if result["error"] is not None:
+                failed += 1
+                print(f"{prefix} ... ⚠ 请求失败: {result['error']}")
+            elif result["trips"]:
+                print(f"{prefix} ... ✓ {result['trips']} 个车次")
+            else:
+                print(f"{prefix} ... ✗ 无车次")
+    except KeyboardInterrupt:
+        print("\n已中断，进度已保存到检查点，重新运行即可继续")
+        executor.shutdown(wait=False, cancel_futures=True)
+        checkpoint.close()
+        return
+    executor.shutdown()
+    checkpoint.close()
+
+    if failed:
+        print(f"\n⚠ {failed} 个查询请求失败，重新运行可以只重试这些查询")
+
+    # 生成路线目录
+    catalogue = build_catalogue(list(checkpoint.results.values()), base_url, dates)
+    write_catalogue(output, catalogue)
+
+    pairs = {"high_speed": set(), "normal": set()}
+    for result in checkpoint.results.values():
+        if result["trips"] > 0:
+            pairs[result["service"]].add((result["start"], result["end"]))
     print("\n统计信息：")
-    print(f"  高铁/动车路线: {sum(len(ends) for ends in routes_high_speed.values())} 条")
-    print(f"  普通火车路线: {sum(len(ends) for ends in routes_normal.values())} 条")
-    
-    # 保存到文件
-    output_file = "routes_config_output.py"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(config_code)
-    print(f"\n配置已保存到: {output_file}")
+    print(f"  高铁/动车路线: {len(pairs['high_speed'])} 条")
+    print(f"  普通火车路线: {len(pairs['normal'])} 条")
+    print(f"\n路线目录已保存到: {output}（版本 {catalogue['version']}，负载生成器启动时自动加载）")
 
-if __name__ == "__main__":
-    verify_routes()
 
+def main():
+    parser = argparse.ArgumentParser(description="并发验证站点对之间的高铁/动车和普通火车车次")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"被测系统地址（默认 {BASE_URL}）")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="并发查询数（默认16）")
+    parser.add_argument("--days", default="7,14,21", help="查询日期距今的天数，逗号分隔（默认7,14,21）")
+    parser.add_argument("--timeout", type=float, default=5.0, help="单个请求超时时间（秒，默认5）")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help=f"检查点文件（默认 {DEFAULT_CHECKPOINT}）")
+    parser.add_argument("--fresh", action="store_true", help="忽略已有检查点，重新验证")
+    parser.add_argument("-o", "--output", default=str(DEFAULT_OUTPUT), help=f"路线目录输出路径（默认 {DEFAULT_OUTPUT}）")
+    args = parser.parse_args()
+
+    days = [int(d) for d in args.days.split(",") if d.strip()]
+    verify_routes(args.base_url.rstrip("/"), args.concurrency, days, args.timeout, Path(args.checkpoint), args.fresh, Path(args.output))
+
+if __name__ == "__main__":
+    main()
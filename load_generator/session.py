@@ -0,0 +1,180 @@
+"""
+会话缓存模块 - 为每个虚拟用户缓存登录态（token、userId、联系人）
+
+每个Locust用户在on_start中登录一次，之后的Flow复用缓存的会话，
+只有在JWT即将过期（本地解析exp字段）时才重新登录。
+管理员会话（注册用户时使用）在进程内所有虚拟用户之间共享，见get_admin_session。
+"""
+import base64
+import json
+import logging
+import threading
+import time
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def decode_jwt_exp(token: str) -> float | None:
+    """
+    在本地解析JWT的exp字段（不校验签名）
+
+    Args:
+        token: JWT字符串
+
+    Returns:
+        过期时间的Unix时间戳（秒），解析失败则返回None
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1]
+    # base64url编码省略了填充字符，需要补齐
+    payload += "=" * (-len(payload) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    if isinstance(exp, (int, float)):
+        return float(exp)
+    return None
+
+
+class UserSession:
+    """单个虚拟用户的登录会话缓存"""
+
+    def __init__(self, username: str, password: str):
+        """
+        初始化会话（不会立即登录）
+
+        Args:
+            username: 用户名
+            password: 密码
+        """
+        self.username = username
+        self.password = password
+        self.token: str | None = None
+        self.user_id: str | None = None
+        self.contacts: list[dict[str, object]] = []
+        self.expires_at = 0.0
+
+    def is_valid(self) -> bool:
+        """
+        判断会话是否仍然可用（距离过期还有至少SESSION_REFRESH_MARGIN秒）
+
+        Returns:
+            会话可用返回True
+        """
+        if not self.token or not self.user_id:
+            return False
+        return time.time() < self.expires_at - config.SESSION_REFRESH_MARGIN
+
+    def invalidate(self):
+        """使会话失效，下一次ensure时会重新登录"""
+        self.token = None
+        self.expires_at = 0.0
+
+    def refresh(self, auth, contact=None) -> bool:
+        """
+        重新登录并刷新联系人缓存
+
+        Args:
+            auth: AuthAction实例
+            contact: ContactAction实例（为None时不获取联系人）
+
+        Returns:
+            登录成功返回True
+        """
+        if not self.apply_login(auth.login_detail(self.username, self.password)):
+            return False
+        if contact is not None:
+            self.contacts = contact.get_contacts_by_account(self.user_id, self.token)
+        logger.info("会话已刷新: %s, 联系人数量: %s", self.username, len(self.contacts))
+        return True
+
+    def apply_login(self, user_info: dict[str, object]) -> bool:
+        """
+        用登录结果更新会话的token、userId和过期时间
+
+        Args:
+            user_info: AuthAction.login_detail的返回值
+
+        Returns:
+            登录成功返回True，失败时会话失效
+        """
+        token = user_info.get("token")
+        user_id = user_info.get("userId")
+        if not token or not user_id:
+            logger.warning("会话登录失败: %s", self.username)
+            self.invalidate()
+            return False
+
+        self.token = str(token)
+        self.user_id = str(user_id)
+        exp = decode_jwt_exp(self.token)
+        self.expires_at = exp if exp is not None else time.time() + config.SESSION_MAX_AGE
+        return True
+
+    def ensure(self, auth, contact=None) -> bool:
+        """
+        确保会话可用，必要时重新登录
+
+        Args:
+            auth: AuthAction实例
+            contact: ContactAction实例（为None时不获取联系人）
+
+        Returns:
+            会话可用返回True
+        """
+        if self.is_valid():
+            return True
+        return self.refresh(auth, contact)
+
+
+class SharedSession(UserSession):
+    """
+    在多个虚拟用户（协程）之间共享的会话
+
+    会话过期时只有一个协程重新登录，其他协程等待其完成后直接使用新token，避免同时登录
+    """
+
+    def __init__(self, username: str, password: str):
+        super().__init__(username, password)
+        # Locust运行时threading已被gevent打补丁，锁只阻塞当前协程
+        self._lock = threading.Lock()
+
+    def ensure(self, auth, contact=None) -> bool:
+        if self.is_valid():
+            return True
+        with self._lock:
+            if self.is_valid():
+                return True
+            return self.refresh(auth, contact)
+
+    def invalidate_token(self, token: str):
+        """
+        服务端拒绝了某个token时使会话失效（其他协程已经刷新过时不做任何事）
+
+        Args:
+            token: 被拒绝的token
+        """
+        with self._lock:
+            if self.token == token:
+                self.invalidate()
+
+
+_admin_session: SharedSession | None = None
+
+
+def get_admin_session() -> SharedSession:
+    """
+    获取进程内共享的管理员会话（config.ADMIN_USERNAME），首次调用时创建（不会立即登录）
+
+    Returns:
+        管理员会话
+    """
+    global _admin_session
+    if _admin_session is None:
+        _admin_session = SharedSession(config.ADMIN_USERNAME, config.ADMIN_PASSWORD)
+    return _admin_session
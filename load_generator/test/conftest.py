@@ -0,0 +1,13 @@
+"""
+pytest配置 - 把项目根目录加入导入路径（与test_flow.py相同），测试中可以直接导入recorder、histogram等模块
+
+导入locust时会对标准库打gevent补丁，补丁必须在ssl等模块被导入之前进行，
+因此在这里最先导入locust（load_shape等模块依赖locust），与实际在Locust中运行时的环境一致
+"""
+import sys
+from pathlib import Path
+
+import locust  # noqa: F401
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
@@ -0,0 +1,60 @@
+"""
+asyncio引擎的冒烟测试：对本地的aiohttp模拟服务运行几个虚拟用户，检查流程、请求统计和CSV输出（没有安装aiohttp时跳过）
+"""
+import asyncio
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+
+import config
+from aio.engine import AsyncEngine
+
+# 模拟服务的响应：按路径返回登录、联系人、查票的数据，其余接口返回成功的空结果
+RESPONSES = {
+    "/api/v1/users/login": {"status": 1, "msg": "login success", "data": {"token": "token-1", "userId": "user-1"}},
+    "/api/v1/travelservice/trips/left": {"status": 1, "data": [{"tripId": {"type": "G", "number": "1234"}}]},
+    "/api/v1/travel2service/trips/left": {"status": 1, "data": [{"tripId": {"type": "Z", "number": "1234"}}]},
+}
+CONTACTS = {"status": 1, "data": [{"id": "contact-1", "name": "联系人"}]}
+DEFAULT = {"status": 1, "msg": "success", "data": []}
+
+
+async def handle(request):
+    if request.path.startswith("/api/v1/contactservice/contacts/account/"):
+        return web.json_response(CONTACTS)
+    return web.json_response(RESPONSES.get(request.path, DEFAULT))
+
+
+async def run_engine(tmp_path):
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        engine = AsyncEngine(f"http://127.0.0.1:{port}", users=4, spawn_rate=100, run_time=1.5,
+                             csv_prefix=str(tmp_path / "aio"))
+        await engine.run()
+        return engine
+    finally:
+        await runner.cleanup()
+
+
+def test_engine_runs_flows_against_local_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AIO_WAIT_TIME", (0.01, 0.02))
+    monkeypatch.setattr(config, "AIO_FLOW_WEIGHTS", {"simple_query": 1, "simple_login": 1, "booking": 1})
+    engine = asyncio.run(run_engine(tmp_path))
+
+    entries = {(entry.method, entry.name): entry for entry in engine.stats.sorted_entries()}
+    for flow_name in ("SimpleQueryFlow", "SimpleLoginFlow", "BookingFlow"):
+        flow = entries[("FLOW", flow_name)]
+        assert flow.num_requests > flow.num_failures
+    # 唯一的失败是运行结束时被取消的流程
+    assert {(error.method, error.error) for error in engine.stats.errors.values()} <= {("FLOW", "FlowFailure('流程异常退出')")}
+    assert entries[("POST", "/api/v1/users/login")].num_requests > 0
+    assert engine.report["users"] == 4
+    assert engine.report["http_requests"] > 0
+    for suffix in ("stats", "stats_history", "failures", "exceptions", "custom"):
+        assert (tmp_path / f"aio_{suffix}.csv").exists()
@@ -0,0 +1,64 @@
+"""
+aio/stats.py的单元测试：统计口径和CSV列与Locust一致（与locust.stats的结果逐项比较）
+"""
+import csv
+import random
+from locust.env import Environment
+from locust.stats import RequestStats as LocustRequestStats, StatsCSVFileWriter, StatsError
+from aio.stats import PERCENTILES_TO_REPORT, RequestStats, StatsCSVWriter
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_columns_match_locust(tmp_path):
+    locust_writer = StatsCSVFileWriter(Environment(), PERCENTILES_TO_REPORT, str(tmp_path / "locust"))
+    writer = StatsCSVWriter(RequestStats(), str(tmp_path / "aio"))
+    writer.write_final()
+    try:
+        assert StatsCSVWriter.REQUESTS_COLUMNS == locust_writer.requests_csv_columns
+        assert StatsCSVWriter.HISTORY_COLUMNS == locust_writer.stats_history_csv_columns
+        assert StatsCSVWriter.FAILURES_COLUMNS == locust_writer.failures_columns
+        assert StatsCSVWriter.EXCEPTIONS_COLUMNS == locust_writer.exceptions_columns
+    finally:
+        locust_writer.close_files()
+
+    for suffix, columns in [("stats", StatsCSVWriter.REQUESTS_COLUMNS), ("stats_history", StatsCSVWriter.HISTORY_COLUMNS),
+                            ("failures", StatsCSVWriter.FAILURES_COLUMNS), ("exceptions", StatsCSVWriter.EXCEPTIONS_COLUMNS)]:
+        assert read_csv(tmp_path / f"aio_{suffix}.csv")[0] == columns
+
+
+def test_stats_rows_match_locust(tmp_path):
+    rng = random.Random(7)
+    stats = RequestStats()
+    locust_stats = LocustRequestStats()
+    for _ in range(2000):
+        method, name = rng.choice([("GET", "/api/v1/a"), ("POST", "/api/v1/b"), ("FLOW", "BookingFlow")])
+        response_time = rng.choice([rng.uniform(1, 99), rng.uniform(100, 999), rng.uniform(1000, 20000)])
+        length = rng.randint(0, 5000)
+        stats.log_request(method, name, response_time, length)
+        locust_stats.log_request(method, name, response_time, length)
+        if rng.random() < 0.1:
+            stats.log_error(method, name, ValueError("失败"))
+            locust_stats.log_error(method, name, ValueError("失败"))
+
+    writer = StatsCSVWriter(stats, str(tmp_path / "aio"))
+    writer.write_final()
+    rows = read_csv(tmp_path / "aio_stats.csv")[1:]
+
+    expected = [*(locust_stats.entries[key] for key in sorted(locust_stats.entries)), locust_stats.total]
+    assert [(row[0], row[1]) for row in rows] == [(entry.method or "", entry.name) for entry in expected]
+    for row, entry in zip(rows, expected):
+        # Requests/s、Failures/s与运行时间有关，不比较
+        assert row[2:9] == [str(value) for value in (
+            entry.num_requests, entry.num_failures, entry.median_response_time, entry.avg_response_time,
+            entry.min_response_time or 0, entry.max_response_time, entry.avg_content_length,
+        )]
+        assert row[11:] == [str(entry.get_response_time_percentile(p)) for p in PERCENTILES_TO_REPORT]
+
+    failures = read_csv(tmp_path / "aio_failures.csv")[1:]
+    assert sorted((row[0], row[1], row[2], int(row[3])) for row in failures) == sorted(
+        (error.method, error.name, StatsError.parse_error(error.error), error.occurrences) for error in locust_stats.errors.values()
+    )
@@ -0,0 +1,37 @@
+"""
+utils.AliasSampler和RouteIndex的单元测试：采样分布与权重一致，零权重的元素不会被抽中
+"""
+from collections import Counter
+import pytest
+from utils import AliasSampler, RouteIndex
+
+
+def test_distribution_matches_weights():
+    weights = [1.0, 2.0, 7.0, 0.0]
+    sampler = AliasSampler(weights)
+    samples = 200_000
+    counts = Counter(sampler.sample() for _ in range(samples))
+
+    assert counts[3] == 0
+    for index, weight in enumerate(weights[:3]):
+        assert counts[index] / samples == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_single_element():
+    sampler = AliasSampler([5.0])
+    assert {sampler.sample() for _ in range(100)} == {0}
+
+
+@pytest.mark.parametrize("weights", [[], [0.0, 0.0]])
+def test_rejects_empty_or_zero_weights(weights):
+    with pytest.raises(ValueError):
+        AliasSampler(weights)
+
+
+def test_route_index_excludes_zero_weight_pairs():
+    routes = {"high_speed": {"a": {"b": True, "c": True}}, "normal": {"a": {"c": True}, "d": {"b": True}}}
+    index = RouteIndex(routes, {("a", "c"): 0.0}, {("a", "b", "high_speed"): 3, ("d", "b", "normal"): 0})
+
+    assert index.pairs == [("a", "b", "high_speed")]
+    assert index.ends_by_start == {"a": ("b",)}
+    assert index.types_by_pair == {("a", "b"): ("high_speed",)}
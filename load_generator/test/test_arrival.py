@@ -0,0 +1,76 @@
+"""
+arrival.py的单元测试：到达间隔、计划到达时刻与流程耗时无关、池满时丢弃或延迟
+"""
+import random
+import gevent
+import pytest
+import metrics
+from arrival import ArrivalScheduler
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    metrics.counters.reset()
+    yield
+    metrics.counters.reset()
+
+
+def test_ignores_flows_without_rate():
+    scheduler = ArrivalScheduler({"booking": 2.0, "simple_query": 0.0, "simple_login": -1.0}, lambda *args: None, 10)
+    assert scheduler.rates == {"booking": 2.0}
+
+
+def test_poisson_intervals_average_to_rate():
+    random.seed(1)
+    scheduler = ArrivalScheduler({"booking": 20.0}, lambda *args: None, 10)
+    intervals = [scheduler._next_interval(20.0) for _ in range(20000)]
+    assert sum(intervals) / len(intervals) == pytest.approx(0.05, rel=0.03)
+    assert len(set(intervals)) > 1
+
+
+def test_fixed_arrivals_follow_schedule_not_flow_duration():
+    launched = []
+
+    def launch(flow_name, intended_time):
+        launched.append(intended_time)
+        # 流程耗时远大于到达间隔，计划到达时刻不受影响
+        gevent.sleep(0.2)
+
+    scheduler = ArrivalScheduler({"booking": 100.0}, launch, 100, process="fixed")
+    runner = gevent.spawn(scheduler.run)
+    gevent.sleep(0.25)
+    runner.kill()
+
+    assert 15 <= len(launched) <= 30
+    intervals = [b - a for a, b in zip(launched, launched[1:])]
+    assert all(interval == pytest.approx(0.01) for interval in intervals)
+    assert metrics.counters.get("open_loop.arrivals.booking") == len(launched)
+    # 停止调度器时结束执行中的流程
+    assert scheduler.pool.free_count() == 100
+
+
+def test_drops_arrivals_when_pool_is_full():
+    launched = []
+    scheduler = ArrivalScheduler({"booking": 1.0}, lambda name, intended: (launched.append(intended), gevent.sleep(1)), 1)
+    for intended in (1.0, 2.0, 3.0):
+        scheduler._arrive("booking", intended)
+    gevent.sleep(0)
+
+    assert launched == [1.0]
+    assert metrics.counters.get("open_loop.arrivals.booking") == 3
+    assert metrics.counters.get("open_loop.dropped.booking") == 2
+    scheduler.stop()
+
+
+def test_delays_arrivals_until_a_slot_is_free():
+    launched = []
+    scheduler = ArrivalScheduler({"booking": 1.0}, lambda name, intended: (launched.append(intended), gevent.sleep(0.01)), 1,
+                                 overflow="delay")
+    for intended in (1.0, 2.0, 3.0):
+        scheduler._arrive("booking", intended)
+    scheduler.pool.join()
+
+    # 延迟的到达保留原来的计划到达时刻
+    assert launched == [1.0, 2.0, 3.0]
+    assert metrics.counters.get("open_loop.delayed.booking") == 2
+    assert metrics.counters.get("open_loop.dropped.booking") == 0
@@ -0,0 +1,58 @@
+"""
+flow/base_flow.py的单元测试：步骤（STEP）在抛出异常、调用fail或返回值检查失败时上报为失败
+"""
+import pytest
+from locust.event import EventHook
+from flow.base_flow import BaseFlow, FlowFailure, check_trips
+
+
+class FakeClient:
+    """只提供request_event的客户端，记录发出的合成请求事件"""
+
+    def __init__(self):
+        self.events = []
+        self.request_event = EventHook()
+        self.request_event.add_listener(lambda **kwargs: self.events.append(kwargs))
+
+
+def step_events(client):
+    return {event["name"]: event["exception"] for event in client.events if event["request_type"] == "STEP"}
+
+
+@pytest.mark.parametrize("execution_mode", ["sequential", "concurrent"])
+def test_run_steps_checks_results(execution_mode):
+    client = FakeClient()
+    flow = BaseFlow(client, execution_mode=execution_mode)
+
+    results = flow._run_steps(
+        {"query_high_speed": lambda: [{"tripId": "G1"}], "query_normal": lambda: []},
+        {"query_high_speed": check_trips, "query_normal": check_trips},
+    )
+
+    assert results == {"query_high_speed": [{"tripId": "G1"}], "query_normal": []}
+    events = step_events(client)
+    assert events["BaseFlow.query_high_speed"] is None
+    assert isinstance(events["BaseFlow.query_normal"], FlowFailure)
+
+
+def test_step_fail_reports_business_failure():
+    client = FakeClient()
+    flow = BaseFlow(client)
+
+    with flow._step("preserve") as step:
+        step.fail("Seat not enough")
+
+    failure = step_events(client)["BaseFlow.preserve"]
+    assert isinstance(failure, FlowFailure) and str(failure) == "Seat not enough"
+    assert "preserve" in flow.timings
+
+
+def test_step_exception_is_reported_and_raised():
+    client = FakeClient()
+    flow = BaseFlow(client)
+
+    with pytest.raises(ValueError):
+        with flow._step("session"):
+            raise ValueError("boom")
+
+    assert isinstance(step_events(client)["BaseFlow.session"], ValueError)
@@ -0,0 +1,104 @@
+"""
+cache.TTLCache的单元测试：过期、LRU淘汰和命中/未命中/淘汰计数
+"""
+import pytest
+import cache
+import metrics
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    metrics.counters.reset()
+    yield fake
+    metrics.counters.reset()
+
+
+def test_hit_until_expired(clock):
+    ttl_cache = TTLCache("test", ttl=10.0, max_entries=10)
+    ttl_cache.store(("a",), 1)
+
+    clock.now += 9.9
+    assert ttl_cache.lookup(("a",)) == (True, 1)
+    clock.now += 0.1
+    assert ttl_cache.lookup(("a",)) == (False, None)
+    # 过期的条目在查找时删除
+    assert len(ttl_cache) == 0
+    assert metrics.counters.get("cache.test.hits") == 1
+    assert metrics.counters.get("cache.test.misses") == 1
+
+
+def test_store_refreshes_expiry(clock):
+    ttl_cache = TTLCache("test", ttl=10.0, max_entries=10)
+    ttl_cache.store(("a",), 1)
+    clock.now += 8.0
+    ttl_cache.store(("a",), 2)
+    clock.now += 8.0
+    assert ttl_cache.lookup(("a",)) == (True, 2)
+
+
+def test_evicts_least_recently_used(clock):
+    ttl_cache = TTLCache("test", ttl=10.0, max_entries=2)
+    ttl_cache.store(("a",), 1)
+    ttl_cache.store(("b",), 2)
+    # 命中的条目变为最近使用，之后写入时淘汰b
+    assert ttl_cache.lookup(("a",)) == (True, 1)
+    ttl_cache.store(("c",), 3)
+
+    assert len(ttl_cache) == 2
+    assert ttl_cache.lookup(("b",)) == (False, None)
+    assert ttl_cache.lookup(("a",)) == (True, 1)
+    assert ttl_cache.lookup(("c",)) == (True, 3)
+    assert metrics.counters.get("cache.test.evictions") == 1
+
+
+def test_clear(clock):
+    ttl_cache = TTLCache("test", ttl=10.0, max_entries=10)
+    ttl_cache.store(("a",), 1)
+    ttl_cache.clear()
+    assert ttl_cache.lookup(("a",)) == (False, None)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.events = []
+
+    def fire_request_event(self, request_type, name, response_time, response_length=0, exception=None, start_time=None):
+        self.events.append((request_type, name, exception))
+
+
+class FakeAction:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.calls = 0
+
+    @cache.cached("test_stats", key=lambda trip_id: (trip_id,))
+    def get(self, trip_id):
+        self.calls += 1
+        return [trip_id]
+
+
+def test_lookups_reported_as_cache_requests(clock, monkeypatch):
+    monkeypatch.setitem(cache.config.REFERENCE_CACHE, "test_stats", {"enabled": True, "ttl": 10.0, "max_entries": 10})
+    monkeypatch.setattr(cache.config, "CACHE_STATS_ENABLED", True)
+    monkeypatch.setattr(cache, "_caches", {})
+    action = FakeAction()
+
+    assert action.get("G1") == ["G1"]
+    assert action.get("G1") == ["G1"]
+    assert action.calls == 1
+    (miss_type, miss_name, miss), (hit_type, hit_name, hit) = action.transport.events
+    assert (miss_type, miss_name, hit_type, hit_name) == ("CACHE", "test_stats", "CACHE", "test_stats")
+    # 未命中上报为失败，命中上报为成功
+    assert isinstance(miss, cache.CacheMiss)
+    assert hit is None
@@ -0,0 +1,43 @@
+"""
+action/decoding.py的单元测试：只提取status/msg的快速路径和按字段裁剪列表元素
+"""
+import pytest
+from action import decoding
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b'{"status": 1, "msg": "Success", "data": [1, 2, 3]}', {"status": 1, "msg": "Success"}),
+    (b' {"status":0,"msg":"\\u4f59\\u7968\\u4e0d\\u8db3 \\"x\\"","data":null}', {"status": 0, "msg": '余票不足 "x"'}),
+    (b'{"status": -1, "data": {}}', {"status": -1}),
+])
+def test_decode_status(content, expected):
+    assert decoding.decode_status(content) == expected
+
+
+@pytest.mark.parametrize("content", [b'{"data": [], "status": 1}', b'[{"status": 1}]', b"not json"])
+def test_decode_status_returns_none_for_other_formats(content):
+    assert decoding.decode_status(content) is None
+
+
+def test_project():
+    assert decoding.project({"a": 1, "b": 2, "c": 3}, ("a", "c", "missing")) == {"a": 1, "c": 3}
+    assert decoding.project(5, ("a",)) == 5
+
+
+def test_decode_status_only_falls_back_to_full():
+    content = b'{"data": [], "status": 1}'
+    assert decoding.decode(content, status_only=True) == ({"data": [], "status": 1}, "full")
+    assert decoding.decode(b'{"status": 1, "msg": "ok", "data": []}', status_only=True) == (
+        {"status": 1, "msg": "ok"}, "status")
+
+
+def test_decode_projects_list_items():
+    wrapped = b'{"status": 1, "msg": "ok", "data": [{"id": 1, "name": "a", "big": "x"}, {"id": 2}]}'
+    assert decoding.decode(wrapped, ("id", "name")) == (
+        {"status": 1, "msg": "ok", "data": [{"id": 1, "name": "a"}, {"id": 2}]}, "full")
+    assert decoding.decode(b'[{"id": 1, "big": "x"}]', ("id",)) == ([{"id": 1}], "full")
+
+
+def test_decode_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        decoding.decode(b"{not json")
@@ -0,0 +1,169 @@
+"""
+histogram.py的单元测试：HDR直方图的百分位精度、协调遗漏修正、序列化合并，以及流程和开环请求的修正规则
+"""
+import math
+import random
+import pytest
+import config
+import histogram
+from histogram import HdrHistogram, LatencyHistograms
+
+
+def test_small_values_are_exact():
+    hdr = HdrHistogram()
+    for value in range(1, 101):
+        hdr.record_value(value)
+
+    assert hdr.total_count == 100
+    assert hdr.value_at_percentile(50.0) == 50
+    assert hdr.value_at_percentile(99.0) == 99
+    assert hdr.value_at_percentile(100.0) == 100
+
+
+def test_large_values_within_three_significant_digits():
+    hdr = HdrHistogram()
+    values = [random.randint(1, 3_600_000_000) for _ in range(2000)]
+    for value in values:
+        hdr.record_value(value)
+
+    values.sort()
+    for percentile in (50.0, 90.0, 99.0, 99.9):
+        expected = values[math.ceil(percentile / 100.0 * len(values)) - 1]
+        assert hdr.value_at_percentile(percentile) == pytest.approx(expected, rel=1e-3)
+    assert hdr.value_at_percentile(100.0) == max(values)
+
+
+def test_empty_histogram_and_negative_values():
+    hdr = HdrHistogram()
+    assert hdr.value_at_percentile(99.0) == 0
+    hdr.record_value(-5)
+    assert hdr.value_at_percentile(50.0) == 0
+
+
+def test_corrected_value_back_fills_missing_samples():
+    hdr = HdrHistogram()
+    hdr.record_corrected_value(10_000, 1_000)
+
+    # 10000, 9000, ..., 1000
+    assert hdr.total_count == 10
+    assert hdr.value_at_percentile(10.0) == 1_000
+    assert hdr.value_at_percentile(100.0) == 10_000
+
+
+def test_corrected_value_without_interval_records_raw():
+    hdr = HdrHistogram()
+    hdr.record_corrected_value(10_000, 0)
+    hdr.record_corrected_value(500, 1_000)
+    assert hdr.total_count == 2
+
+
+def test_serialisation_and_merge():
+    first, second = HdrHistogram(), HdrHistogram()
+    for value in range(1, 1001):
+        first.record_value(value)
+    for value in range(1001, 2001):
+        second.record_value(value * 1000)
+
+    merged = HdrHistogram.from_list(first.to_list())
+    merged.merge(HdrHistogram.from_list(second.to_list()))
+
+    assert merged.total_count == 2000
+    assert merged.max_value == 2_000_000
+    assert merged.value_at_percentile(50.0) == 1000
+    assert merged.value_at_percentile(100.0) == 2_000_000
+
+
+def test_latency_histograms_drain_and_merge():
+    workers = [LatencyHistograms(), LatencyHistograms()]
+    for worker in workers:
+        worker.record("GET /a", 10.0, None, 0.0)
+        worker.record("FLOW F", 5000.0, None, 1000.0)
+
+    master = LatencyHistograms()
+    for worker in workers:
+        master.merge(worker.drain())
+        assert worker.raw == {}
+
+    report = master.report()
+    assert report["GET /a"]["count"] == 2
+    assert report["GET /a"]["corrected_count"] is None
+    assert report["FLOW F"]["count"] == 2
+    assert report["FLOW F"]["corrected_count"] == 10
+    assert report["FLOW F"]["p50"] == pytest.approx(3000.0, rel=1e-3)
+    assert report["FLOW F"]["raw_p99"] == pytest.approx(5000.0, rel=1e-3)
+
+
+def test_unscheduled_requests_keep_raw_histograms_only():
+    histograms = LatencyHistograms()
+    histograms.record("GET /a", 10.0, None, 1000.0)
+    histograms.record("STEP F.s", 10.0, None, 0.0)
+    histograms.record("FLOW F", 10.0, None, 1000.0)
+
+    assert set(histograms.corrected) == {"FLOW F"}
+    data = histograms.drain()
+    assert len(data["GET /a"]) == len(data["STEP F.s"]) == 1
+    assert len(data["FLOW F"]) == 2
+
+
+def test_requests_without_schedule_have_empty_corrected_columns():
+    histograms = LatencyHistograms()
+    histograms.record("GET /a", 10.0, None, 1000.0)
+
+    report = histograms.report()["GET /a"]
+    assert report["corrected_count"] is None and report["p99"] is None and report["max"] is None
+    assert report["raw_p99"] == pytest.approx(10.0, rel=1e-3)
+
+
+def test_open_loop_requests_are_corrected_by_flow_start_delay():
+    histograms = LatencyHistograms()
+    # 流程开始前（on_start中）没有计划时刻的请求按原始值计入修正直方图
+    histograms.record("GET /a", 10.0, None, 0.0)
+    histograms.record("GET /a", 10.0, 510.0, 0.0)
+    histograms.record("GET /a", 10.0, None, 0.0)
+
+    report = histograms.report()["GET /a"]
+    assert report["count"] == report["corrected_count"] == 3
+    assert report["max"] == pytest.approx(510.0, rel=1e-3)
+    assert report["raw_p99"] == pytest.approx(10.0, rel=1e-3)
+
+
+def test_intended_start_replaces_measured_latency():
+    histograms = LatencyHistograms()
+    histograms.record("FLOW F", 100.0, 2500.0, 1000.0)
+
+    report = histograms.report()["FLOW F"]
+    assert report["corrected_count"] == 1
+    assert report["p50"] == pytest.approx(2500.0, rel=1e-3)
+    assert report["raw_p99"] == pytest.approx(100.0, rel=1e-3)
+
+
+class FixedWaitUser:
+    def wait_time(self):
+        return 2.0
+
+
+class RandomWaitUser:
+    def wait_time(self):
+        return random.uniform(1, 3)
+
+
+class PacingUser:
+    """wait_time依赖用户实例（例如constant_pacing）"""
+
+    def wait_time(self):
+        return self.interval - 1
+
+
+def test_expected_flow_interval_from_wait_time(monkeypatch):
+    monkeypatch.setattr(config, "HDR_EXPECTED_INTERVAL_MS", None)
+
+    assert histogram.expected_flow_interval_ms([FixedWaitUser]) == pytest.approx(2000.0)
+    assert histogram.expected_flow_interval_ms([RandomWaitUser]) == pytest.approx(2000.0, rel=0.05)
+    # 无法估计的用户类不参与计算
+    assert histogram.expected_flow_interval_ms([PacingUser, FixedWaitUser]) == pytest.approx(2000.0)
+    assert histogram.expected_flow_interval_ms([PacingUser]) == 0.0
+
+
+def test_expected_flow_interval_from_config(monkeypatch):
+    monkeypatch.setattr(config, "HDR_EXPECTED_INTERVAL_MS", 500.0)
+    assert histogram.expected_flow_interval_ms([FixedWaitUser]) == 500.0
@@ -0,0 +1,81 @@
+"""
+load_shape.py的单元测试：各阶段类型的目标用户数，以及负载曲线配置（包括流程权重）的检查
+"""
+import json
+import pytest
+import load_shape
+from load_shape import load_profile, phase_users
+
+
+@pytest.mark.parametrize("phase, elapsed, previous, expected", [
+    ({"type": "warmup", "duration": 60, "users": 10}, 30, 0, 10),
+    ({"type": "steady", "duration": 60, "users": 200}, 0, 50, 200),
+    # 未设置start_users时从上一阶段结束时的用户数开始
+    ({"type": "ramp", "duration": 100, "users": 200}, 25, 100, 125),
+    ({"type": "ramp", "duration": 100, "users": 200, "start_users": 0}, 50, 100, 100),
+    ({"type": "ramp", "duration": 100, "users": 200}, 150, 100, 200),
+    ({"type": "spike", "duration": "30m", "users": 200, "spike_users": 800, "spike_at": "10m", "spike_duration": "5m"},
+     599, 0, 200),
+    ({"type": "spike", "duration": "30m", "users": 200, "spike_users": 800, "spike_at": "10m", "spike_duration": "5m"},
+     600, 0, 800),
+    ({"type": "spike", "duration": "30m", "users": 200, "spike_users": 800, "spike_at": "10m", "spike_duration": "5m"},
+     900, 0, 200),
+    ({"type": "sine", "duration": 100, "min_users": 50, "max_users": 150}, 0, 0, 50),
+    ({"type": "sine", "duration": 100, "min_users": 50, "max_users": 150}, 50, 0, 150),
+    ({"type": "sine", "duration": 100, "min_users": 50, "max_users": 150}, 25, 0, 100),
+    ({"type": "step", "duration": "1h", "start_users": 100, "step_users": 50, "step_duration": "10m"}, 1199, 0, 150),
+    ({"type": "step", "duration": "1h", "start_users": 100, "step_users": 50, "step_duration": "10m",
+      "max_users": 200}, 3000, 0, 200),
+    ({"type": "sawtooth", "duration": 100, "min_users": 0, "max_users": 100, "period": 40}, 50, 0, 25),
+])
+def test_phase_users(phase, elapsed, previous, expected):
+    assert phase_users(phase, elapsed, previous) == expected
+
+
+def write_profile(tmp_path, phases):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({"phases": phases}), encoding="utf-8")
+    return path
+
+
+def test_load_profile(tmp_path):
+    path = write_profile(tmp_path, [
+        {"type": "warmup", "duration": "1m", "users": 1, "weights": {"booking": 0}},
+        {"type": "steady", "duration": 60, "users": 2},
+    ])
+    assert len(load_profile(path)["phases"]) == 2
+
+
+@pytest.mark.parametrize("phases", [
+    [],
+    [{"type": "flat", "duration": 60, "users": 1}],
+    [{"type": "steady", "users": 1}],
+    [{"type": "steady", "duration": 60, "users": 1, "weights": {"simple_qeury": 1}}],
+    [{"type": "steady", "duration": 60, "users": 1, "weights": {"booking": -1}}],
+    # 缺少阶段类型需要的参数
+    [{"type": "steady", "duration": "1m"}],
+    [{"type": "ramp", "duration": "1m", "start_users": 0}],
+    [{"type": "spike", "duration": "5m", "users": 10, "spike_users": 100, "spike_duration": "1m"}],
+    [{"type": "sine", "duration": "1h", "min_users": 10}],
+    [{"type": "step", "duration": "1h", "start_users": 10, "step_users": 10}],
+    [{"type": "sawtooth", "duration": "1h", "min_users": 10, "max_users": 20}],
+    # 用作除数的时长必须大于0
+    [{"type": "step", "duration": "1h", "start_users": 10, "step_users": 10, "step_duration": 0}],
+    [{"type": "sine", "duration": "1h", "min_users": 10, "max_users": 20, "period": 0}],
+    [{"type": "sawtooth", "duration": "1h", "min_users": 10, "max_users": 20, "period": "0s"}],
+    # 参数的类型或取值无效
+    [{"type": "steady", "duration": "1m", "users": "ten"}],
+    [{"type": "steady", "duration": "1m", "users": -1}],
+    [{"type": "steady", "duration": "soon", "users": 1}],
+    # 合并后所有流程的权重都为0
+    [{"type": "steady", "duration": 60, "users": 1, "weights": {"simple_query": 0, "simple_login": 0}},
+     {"type": "steady", "duration": 60, "users": 1, "weights": {"booking": 0}}],
+])
+def test_load_profile_rejects_invalid_phases(tmp_path, phases):
+    with pytest.raises(ValueError, match="阶段|phases"):
+        load_profile(write_profile(tmp_path, phases))
+
+
+def test_flow_weights_sample_only_positive_weights():
+    weights = load_shape.FlowWeights({"simple_query": 1, "booking": 0})
+    assert {weights.sample() for _ in range(200)} == {"simple_query"}
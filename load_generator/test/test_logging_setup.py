@@ -0,0 +1,34 @@
+"""
+logging_setup.py的单元测试：按流程名称采样日志
+"""
+import logging
+from flow.context import current_flow
+from logging_setup import LogSampler
+
+
+def run_in_flow(flow_name, func):
+    token = current_flow.set(flow_name)
+    try:
+        return func()
+    finally:
+        current_flow.reset(token)
+
+
+def test_flow_rate_applies_to_every_logger_in_the_flow():
+    sampler = LogSampler({"BookingFlow": 0.0}, 1.0)
+    assert not run_in_flow("BookingFlow", lambda: sampler.sample("flow.travel_flow", logging.INFO))
+    assert not run_in_flow("BookingFlow", lambda: sampler.sample("action.base_action", logging.INFO))
+    assert run_in_flow("SimpleQueryFlow", lambda: sampler.sample("action.base_action", logging.INFO))
+
+
+def test_falls_back_to_logger_name_outside_configured_flows():
+    sampler = LogSampler({"replay": 0.0}, 1.0)
+    assert not sampler.sample("replay", logging.INFO)
+    assert not run_in_flow("SimpleQueryFlow", lambda: sampler.sample("replay", logging.INFO))
+    assert sampler.sample("locustfile", logging.INFO)
+
+
+def test_warnings_are_never_sampled():
+    sampler = LogSampler({"BookingFlow": 0.0}, 0.0)
+    assert run_in_flow("BookingFlow", lambda: sampler.sample("flow.travel_flow", logging.WARNING))
+    assert sampler.sample("locustfile", logging.ERROR)
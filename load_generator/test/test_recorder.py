@@ -0,0 +1,144 @@
+"""
+recorder.py的单元测试：追踪文件格式的读写、文件轮转和多进程追踪归并
+"""
+import pytest
+import recorder
+from recorder import STATUS_UNKNOWN, TraceRecorder
+
+
+def make_recorder(directory, file_prefix="trace-host-100", max_file_bytes=1024 * 1024):
+    return TraceRecorder(str(directory), max_file_bytes=max_file_bytes, max_files=0, flush_bytes=64 * 1024,
+                         flush_interval=60.0, file_prefix=file_prefix)
+
+
+def write(trace_recorder, timestamp, name="/api/v1/a", user="u1", business_status=1, http_status=200):
+    trace_recorder.record(
+        timestamp=timestamp,
+        request_type="GET",
+        flow="SimpleQueryFlow",
+        step="query",
+        name=name,
+        path=name + "?x=1",
+        http_status=http_status,
+        business_status=business_status,
+        latency_ms=12.5,
+        response_bytes=345,
+        user=user,
+    )
+
+
+def read_all(directory):
+    records = []
+    for file in recorder.list_trace_files(directory):
+        records += list(recorder.iter_records(file))
+    return records
+
+
+def test_round_trip(tmp_path):
+    trace_recorder = make_recorder(tmp_path)
+    write(trace_recorder, 1000.25)
+    write(trace_recorder, 1001.5, name="/api/v1/b", user="u2", business_status=STATUS_UNKNOWN, http_status=0)
+    trace_recorder.close()
+
+    files = recorder.list_trace_files(tmp_path)
+    assert [file.name for file in files] == ["trace-host-100-00001.ttrec"]
+    assert files[0].read_bytes().startswith(recorder.MAGIC)
+    assert list(recorder.iter_records(files[0])) == [
+        {"timestamp": 1000.25, "user": "u1", "request_type": "GET", "flow": "SimpleQueryFlow", "step": "query",
+         "name": "/api/v1/a", "path": "/api/v1/a?x=1", "http_status": 200, "business_status": 1,
+         "latency_ms": 12.5, "response_bytes": 345},
+        {"timestamp": 1001.5, "user": "u2", "request_type": "GET", "flow": "SimpleQueryFlow", "step": "query",
+         "name": "/api/v1/b", "path": "/api/v1/b?x=1", "http_status": 0, "business_status": None,
+         "latency_ms": 12.5, "response_bytes": 345},
+    ]
+
+
+def test_strings_defined_once_per_file(tmp_path):
+    trace_recorder = make_recorder(tmp_path)
+    write(trace_recorder, 1.0)
+    trace_recorder.flush()
+    size_after_first = trace_recorder._written
+    write(trace_recorder, 2.0)
+    trace_recorder.close()
+
+    # 第二条记录的字符串都已定义过，只写入一条定长记录
+    file = recorder.list_trace_files(tmp_path)[0]
+    assert file.stat().st_size - size_after_first == recorder.RECORD_STRUCT.size
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    trace_recorder = make_recorder(tmp_path)
+    write(trace_recorder, 1.0)
+    write(trace_recorder, 2.0)
+    trace_recorder.close()
+    file = recorder.list_trace_files(tmp_path)[0]
+    file.write_bytes(file.read_bytes()[:-3])
+
+    assert [record["timestamp"] for record in recorder.iter_records(file)] == [1.0]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.ttrec"
+    path.write_bytes(b"NOTATRACE")
+    with pytest.raises(ValueError):
+        list(recorder.iter_records(path))
+
+
+def test_rotation_redefines_strings(tmp_path):
+    trace_recorder = TraceRecorder(str(tmp_path), max_file_bytes=200, max_files=0, flush_bytes=1,
+                                   flush_interval=60.0, file_prefix="trace-host-100")
+    for i in range(10):
+        write(trace_recorder, float(i))
+    trace_recorder.close()
+
+    files = recorder.list_trace_files(tmp_path)
+    assert len(files) > 1
+    # 每个文件都能单独读取（字符串表在新文件中重新定义）
+    assert all(list(recorder.iter_records(file)) for file in files)
+    assert [record["timestamp"] for record in read_all(tmp_path)] == [float(i) for i in range(10)]
+
+
+def test_max_files_deletes_oldest(tmp_path):
+    trace_recorder = TraceRecorder(str(tmp_path), max_file_bytes=200, max_files=2, flush_bytes=1,
+                                   flush_interval=60.0, file_prefix="trace-host-100")
+    for i in range(20):
+        write(trace_recorder, float(i))
+    trace_recorder.close()
+
+    files = recorder.list_trace_files(tmp_path)
+    assert len(files) == 2
+    assert read_all(tmp_path)[-1]["timestamp"] == 19.0
+
+
+def test_group_by_process(tmp_path):
+    names = ["trace-a-1-00002.ttrec", "trace-a-1-00001.ttrec", "trace-b-2-00001.ttrec"]
+    files = [tmp_path / name for name in names]
+
+    assert recorder.group_by_process(files) == {
+        "trace-a-1": [tmp_path / "trace-a-1-00001.ttrec", tmp_path / "trace-a-1-00002.ttrec"],
+        "trace-b-2": [tmp_path / "trace-b-2-00001.ttrec"],
+    }
+
+
+def test_merge_traces(tmp_path):
+    source = tmp_path / "traces"
+    first = make_recorder(source, "trace-host-1")
+    for timestamp in (1.0, 3.0, 5.0):
+        write(first, timestamp, user="u1")
+    first.close()
+    second = make_recorder(source, "trace-host-2")
+    for timestamp in (2.0, 4.0):
+        write(second, timestamp, user="u1", business_status=STATUS_UNKNOWN)
+    second.close()
+
+    output = tmp_path / "merged"
+    count = recorder.merge_traces(recorder.list_trace_files(source), output)
+
+    records = read_all(output)
+    assert count == len(records) == 5
+    assert [record["timestamp"] for record in records] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    # 不同进程的同名用户归并后是不同的用户
+    assert [record["user"] for record in records] == [
+        "trace-host-1/u1", "trace-host-2/u1", "trace-host-1/u1", "trace-host-2/u1", "trace-host-1/u1"]
+    assert [record["business_status"] for record in records] == [1, None, 1, None, 1]
+    assert all(file.name.startswith("trace-merged-") for file in recorder.list_trace_files(output))
@@ -0,0 +1,59 @@
+"""
+replay.py的单元测试：按流程实例划分回放通道、FLOW记录结束通道
+"""
+from recorder import TraceRecorder
+from replay import FLOW_END, ReplayRequest, TraceReplayer, iter_recorder_trace
+
+
+def record(trace_recorder, timestamp, user, request_type="GET", name="/api/v1/a", latency_ms=10.0):
+    trace_recorder.record(
+        timestamp=timestamp,
+        request_type=request_type,
+        flow="SimpleQueryFlow",
+        step="",
+        name=name,
+        path=name,
+        http_status=200,
+        business_status=1,
+        latency_ms=latency_ms,
+        response_bytes=0,
+        user=user,
+    )
+
+
+def test_open_loop_flows_replay_in_separate_lanes(tmp_path):
+    trace_recorder = TraceRecorder(str(tmp_path), max_file_bytes=1024 * 1024, max_files=0, flush_bytes=64 * 1024,
+                                   flush_interval=60.0, file_prefix="trace-host-100")
+    record(trace_recorder, 1.0, "u#1/1")
+    record(trace_recorder, 1.1, "u#1/2")
+    record(trace_recorder, 1.2, "u#1/1")
+    record(trace_recorder, 1.0, "u#1/1", request_type="FLOW", name="SimpleQueryFlow", latency_ms=500.0)
+    trace_recorder.close()
+
+    requests = list(iter_recorder_trace(tmp_path))
+    assert [(request.lane, request.method) for request in requests] == [
+        ("trace-host-100/u#1/1", "GET"),
+        ("trace-host-100/u#1/2", "GET"),
+        ("trace-host-100/u#1/1", "GET"),
+        ("trace-host-100/u#1/1", FLOW_END),
+    ]
+    # FLOW记录按流程结束时刻排序
+    assert requests[-1].timestamp == 1.5
+
+
+def test_flow_end_closes_lane_and_next_flow_gets_new_lane():
+    replayer = TraceReplayer(None, iter([]))
+    started = []
+    replayer._run_lane = lambda lane, queue: started.append((lane, queue))
+
+    replayer._dispatch(ReplayRequest(1.0, "p/u#1", "GET", "/api/v1/a", "/api/v1/a"), 0.0)
+    first_queue = replayer._lanes["p/u#1"]
+    replayer._dispatch(ReplayRequest(2.0, "p/u#1", FLOW_END, "", "SimpleQueryFlow"), 0.0)
+    assert "p/u#1" not in replayer._lanes
+    assert first_queue.get()[0].path == "/api/v1/a"
+    assert first_queue.get() is None
+
+    replayer._dispatch(ReplayRequest(3.0, "p/u#1", "GET", "/api/v1/b", "/api/v1/b"), 0.0)
+    replayer.pool.join()
+    assert [queue for _, queue in started][1] is replayer._lanes["p/u#1"]
+    assert replayer._lanes["p/u#1"] is not first_queue
@@ -0,0 +1,85 @@
+"""
+session.py的单元测试：SharedSession过期时只有一个协程重新登录，被拒绝的旧token不会让新token失效
+"""
+import gevent
+from session import SharedSession, UserSession
+
+
+class FakeAuth:
+    """登录耗时0.05秒，每次登录返回新的token"""
+
+    def __init__(self, succeed=True):
+        self.succeed = succeed
+        self.calls = 0
+
+    def login_detail(self, username, password):
+        self.calls += 1
+        gevent.sleep(0.05)
+        if not self.succeed:
+            return {}
+        return {"token": f"token-{self.calls}", "userId": "user-1"}
+
+
+class FakeContact:
+    def __init__(self):
+        self.calls = 0
+
+    def get_contacts_by_account(self, account_id, token):
+        self.calls += 1
+        return [{"id": "contact-1"}]
+
+
+def test_concurrent_ensure_logs_in_once():
+    session = SharedSession("user", "pw")
+    auth, contact = FakeAuth(), FakeContact()
+    greenlets = [gevent.spawn(session.ensure, auth, contact) for _ in range(20)]
+    gevent.joinall(greenlets, raise_error=True)
+
+    assert all(greenlet.value for greenlet in greenlets)
+    assert auth.calls == 1
+    assert contact.calls == 1
+    assert session.token == "token-1"
+    assert session.contacts == [{"id": "contact-1"}]
+
+
+def test_refreshes_once_after_invalidation():
+    session = SharedSession("user", "pw")
+    auth = FakeAuth()
+    assert session.ensure(auth)
+    session.invalidate_token("token-1")
+
+    greenlets = [gevent.spawn(session.ensure, auth) for _ in range(10)]
+    gevent.joinall(greenlets, raise_error=True)
+    assert auth.calls == 2
+    assert session.token == "token-2"
+
+
+def test_stale_token_rejection_keeps_refreshed_token():
+    session = SharedSession("user", "pw")
+    auth = FakeAuth()
+    assert session.ensure(auth)
+    session.invalidate_token("token-1")
+    assert session.ensure(auth)
+
+    # 使用旧token的流程收到401/403时，其他流程刚刷新的token不失效
+    session.invalidate_token("token-1")
+    assert session.is_valid()
+    assert session.token == "token-2"
+
+
+def test_failed_login_is_reported_to_every_waiter():
+    session = SharedSession("user", "pw")
+    auth = FakeAuth(succeed=False)
+    greenlets = [gevent.spawn(session.ensure, auth) for _ in range(3)]
+    gevent.joinall(greenlets, raise_error=True)
+
+    assert not any(greenlet.value for greenlet in greenlets)
+    assert not session.is_valid()
+
+
+def test_user_session_refreshes_without_lock():
+    session = UserSession("user", "pw")
+    auth = FakeAuth()
+    assert session.ensure(auth)
+    assert session.ensure(auth)
+    assert auth.calls == 1
@@ -0,0 +1,124 @@
+"""
+user_pool.py的单元测试：独占租借、账号不足时共享、租借期间重新划分分片，以及master向worker发送分片
+"""
+from types import SimpleNamespace
+import pytest
+from locust.event import Events
+import metrics
+import user_pool
+from user_pool import UserPool
+
+
+def make_users(count):
+    return [{"username": f"user{i}", "password": "pw"} for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    metrics.counters.reset()
+    yield
+    metrics.counters.reset()
+
+
+def test_leases_are_exclusive():
+    pool = UserPool(make_users(3))
+    leased = [pool.lease() for _ in range(3)]
+    assert len({user["username"] for user in leased}) == 3
+    assert pool.leased == 3
+    assert metrics.counters.get("user_pool.shared") == 0
+
+    pool.release(leased[1])
+    assert pool.leased == 2
+    assert pool.lease() is leased[1]
+
+
+def test_shares_leased_accounts_when_exhausted():
+    pool = UserPool(make_users(2))
+    first, second = pool.lease(), pool.lease()
+    shared = pool.lease()
+    assert shared in (first, second)
+    assert metrics.counters.get("user_pool.shared") == 1
+
+    # 共享的账号在所有租借者归还后才重新空闲
+    pool.release(shared)
+    assert pool.leased == 2
+    pool.release(shared)
+    assert pool.leased == 1
+    assert pool.lease() is shared
+    assert metrics.counters.get("user_pool.shared") == 1
+
+
+def test_assign_keeps_leased_accounts_out_of_the_new_slice():
+    users = make_users(6)
+    pool = UserPool(users)
+    held = pool.lease()
+    assert held is users[0]
+
+    # 第1个分片（共2个）为 user0、user2、user4，user0 仍被租借
+    pool.assign(0, 2)
+    assert pool.slice == users[0::2]
+    leased = [pool.lease(), pool.lease()]
+    assert leased == [users[2], users[4]]
+    # 分片中的账号已全部租出，继续租借时共享
+    assert pool.lease() in pool.slice
+    assert metrics.counters.get("user_pool.shared") == 1
+
+    # 不属于当前分片的账号归还后不会被租出
+    pool.assign(1, 2)
+    pool.release(held)
+    assert held not in [pool.lease() for _ in range(3)]
+
+
+def test_assign_rejects_out_of_range_index():
+    pool = UserPool(make_users(2))
+    with pytest.raises(ValueError):
+        pool.assign(2, 2)
+
+
+class MasterRunner:
+    def __init__(self, worker_ids):
+        # 序号与连接顺序相反，检查按worker序号重新编号
+        self.clients = SimpleNamespace(
+            ready=[SimpleNamespace(id=worker_id) for worker_id in worker_ids], running=[], spawning=[]
+        )
+        self.indexes = {worker_id: 10 - i for i, worker_id in enumerate(worker_ids)}
+        self.sent = []
+
+    def get_worker_index(self, client_id):
+        return self.indexes[client_id]
+
+    def send_message(self, msg_type, data, client_id=None):
+        self.sent.append((msg_type, data, client_id))
+
+
+class WorkerRunner:
+    def __init__(self):
+        self.handlers = {}
+
+    def register_message(self, msg_type, listener):
+        self.handlers[msg_type] = listener
+
+
+def test_master_sends_partitions_to_workers():
+    runner = MasterRunner(["a", "b", "c"])
+    environment = SimpleNamespace(runner=runner, events=Events())
+    user_pool.init_locust(environment)
+    environment.events.test_start.fire(environment=environment)
+
+    assert runner.sent == [
+        ("user_pool_partition", {"index": 0, "count": 3}, "c"),
+        ("user_pool_partition", {"index": 1, "count": 3}, "b"),
+        ("user_pool_partition", {"index": 2, "count": 3}, "a"),
+    ]
+
+
+def test_worker_applies_partition(monkeypatch):
+    users = make_users(6)
+    monkeypatch.setattr(user_pool, "_pool", UserPool(users))
+    runner = WorkerRunner()
+    environment = SimpleNamespace(runner=runner, events=Events())
+    user_pool.init_locust(environment)
+
+    runner.handlers["user_pool_partition"](environment, SimpleNamespace(data={"index": 1, "count": 3}))
+    assert user_pool.get_pool().slice == users[1::3]
+    assert user_pool.get_pool().lease() is users[1]
@@ -0,0 +1,26 @@
+"""
+gevent修补前的标准库对象
+
+Locust对threading、queue等标准库打了gevent补丁，普通的Thread会变成与虚拟用户共用事件循环的greenlet；
+需要真正的操作系统线程的模块（logging_setup的日志写线程、payload_pool的数据生成线程）
+通过original获取修补前的_thread、SimpleQueue、RLock等对象
+"""
+import importlib
+import sys
+
+
+def original(module: str, name: str):
+    """
+    获取未被gevent修补的标准库对象
+
+    Args:
+        module: 模块名
+        name: 对象名
+
+    Returns:
+        修补前的对象（没有加载gevent时即为当前对象）
+    """
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None:
+        return monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
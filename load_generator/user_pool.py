@@ -0,0 +1,149 @@
+"""
+账号池管理模块 - 把测试账号划分给各个worker，并在worker内独占租借给虚拟用户
+
+- 划分：分布式运行时master在测试开始时按worker序号把账号池（utils.get_user_pool）划分为互不相交的分片
+  （第 index 个worker使用 users[index::count]），通过自定义消息 user_pool_partition 发送给各worker；
+  单机模式下使用整个账号池
+- 租借：worker内每个虚拟用户在on_start中租借一个账号，on_stop中归还；同一时刻一个账号只租借给一个虚拟用户，
+  避免多个虚拟用户在同一个账号的订单和联系人上争用
+- 账号不足（虚拟用户数多于分片中的账号数）时不会阻塞，按轮询共享已租出的账号，并记录在自定义指标
+  user_pool.shared 中；此时应扩充账号池（scripts/provision_users.py）
+
+划分在测试开始时确定；测试开始后才加入的worker收不到划分消息，使用整个账号池（会与其他worker重叠）
+"""
+import logging
+from collections import deque
+from itertools import cycle
+import metrics
+import utils
+
+logger = logging.getLogger(__name__)
+
+
+class UserPool:
+    """一个进程内的账号分片，按账号独占租借"""
+
+    def __init__(self, users: list[dict[str, str]]):
+        """
+        初始化账号池（初始分片为整个账号池）
+
+        Args:
+            users: 全部测试账号（每个至少包含username和password）
+        """
+        self.users = users
+        self.index = 0
+        self.count = 1
+        # 账号名 -> 当前租借数（共享时大于1）
+        self._leases: dict[str, int] = {}
+        self.assign(0, 1)
+
+    def assign(self, index: int, count: int):
+        """
+        设置本进程使用的分片，已租出的账号在归还前不会再次租出
+
+        Args:
+            index: 本进程在所有worker中的序号（0 ~ count-1）
+            count: worker总数
+
+        Raises:
+            ValueError: 序号超出范围
+        """
+        if not 0 <= index < count:
+            raise ValueError(f"账号池分片序号超出范围: {index}/{count}")
+        self.index, self.count = index, count
+        self.slice = self.users[index::count]
+        self._slice_names = {user["username"] for user in self.slice}
+        self._free = deque(user for user in self.slice if user["username"] not in self._leases)
+        self._shared = cycle(self.slice) if self.slice else None
+        self._shared_warned = False
+        if count > 1:
+            logger.info("账号池分片 %d/%d: %d 个账号", index + 1, count, len(self.slice))
+
+    def lease(self) -> dict[str, str]:
+        """
+        租借一个账号，没有空闲账号时共享一个已租出的账号
+
+        Returns:
+            账号（包含username和password）
+        """
+        if self._free:
+            user = self._free.popleft()
+        elif self._shared is not None:
+            user = next(self._shared)
+            metrics.counters.incr("user_pool.shared")
+            if not self._shared_warned:
+                self._shared_warned = True
+                logger.warning("账号池分片中的 %d 个账号已全部租出，后续虚拟用户将共享账号，请扩充账号池", len(self.slice))
+        else:
+            # 分片为空（worker数多于账号数），退回随机选择
+            user = utils.get_random_user()
+            metrics.counters.incr("user_pool.shared")
+        self._leases[user["username"]] = self._leases.get(user["username"], 0) + 1
+        return user
+
+    def release(self, user: dict[str, str]):
+        """
+        归还账号，最后一个租借者归还后账号重新变为空闲
+
+        Args:
+            user: lease返回的账号
+        """
+        username = user["username"]
+        remaining = self._leases.get(username, 0) - 1
+        if remaining > 0:
+            self._leases[username] = remaining
+            return
+        self._leases.pop(username, None)
+        if remaining == 0 and username in self._slice_names:
+            self._free.append(user)
+
+    @property
+    def leased(self) -> int:
+        """当前租出的账号数"""
+        return len(self._leases)
+
+
+_pool: UserPool | None = None
+
+
+def get_pool() -> UserPool:
+    """
+    获取本进程的账号池，首次调用时创建
+
+    Returns:
+        账号池
+    """
+    global _pool
+    if _pool is None:
+        _pool = UserPool(utils.get_user_pool())
+    return _pool
+
+
+def init_locust(environment):
+    """
+    注册账号池的划分：master在测试开始时向各worker发送分片，worker收到后切换分片，应在init事件中调用
+
+    Args:
+        environment: Locust的Environment对象
+    """
+    runner = environment.runner
+    if runner is None:
+        return
+    runner_type = type(runner).__name__
+
+    if runner_type == "MasterRunner":
+        @environment.events.test_start.add_listener
+        def on_test_start(environment, **kwargs):
+            # worker序号在重连后会增长，按序号排序后重新编号为 0 ~ n-1
+            workers = sorted(
+                runner.clients.ready + runner.clients.running + runner.clients.spawning,
+                key=lambda client: runner.get_worker_index(client.id)
+            )
+            for index, client in enumerate(workers):
+                runner.send_message("user_pool_partition", {"index": index, "count": len(workers)}, client_id=client.id)
+
+    elif runner_type == "WorkerRunner":
+        def on_partition(environment, msg, **kwargs):
+            get_pool().assign(msg.data["index"], msg.data["count"])
+
+        runner.register_message("user_pool_partition", on_partition)
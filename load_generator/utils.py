@@ -1,10 +1,13 @@
 """
 工具函数模块 - 提供数据生成、随机选择等工具函数
 """
+import json
 import random
 from datetime import datetime, timedelta
 import config
 import logging
+import payload_pool
+from route_catalogue import RouteCatalogue, load_catalogue
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,12 @@ def get_random_station(exclude: list[str] = []) -> str:
     Returns:
         随机选择的车站名称
     """
+    if config.PAYLOAD_POOL_ENABLED:
+        # 从预先生成的车站下标中取，抽中被排除的车站时重抽（排除的车站很少，通常一次即可）
+        for _ in range(8):
+            station = config.DEFAULT_STATIONS[payload_pool.take("station")]
+            if station not in exclude:
+                return station
     available_stations = [s for s in config.DEFAULT_STATIONS if s not in exclude]
     if not available_stations:
         # 如果没有可用车站，返回第一个车站
@@ -50,11 +59,211 @@ def get_random_end_station(start_station: str | None = None) -> str:
     return get_random_station(exclude)
 
 
+class AliasSampler:
+    """
+    Walker/Vose别名采样器
+    
+    按给定权重进行离散采样，构建时间O(n)，每次采样O(1)
+    """
+    
+    def __init__(self, weights: list[float]):
+        """
+        构建别名表
+        
+        Args:
+            weights: 每个元素的权重（必须非负，且总和大于0）
+        """
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("权重列表为空或权重总和不大于0")
+        
+        self._count = count
+        self._prob = [1.0] * count
+        self._alias = list(range(count))
+        
+        scaled = [w * count / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # 剩余元素（包括浮点误差导致的）概率为1
+        for i in small + large:
+            self._prob[i] = 1.0
+    
+    def sample(self) -> int:
+        """
+        按权重随机抽取一个下标
+        
+        Returns:
+            被抽中元素的下标
+        """
+        i = random.randrange(self._count)
+        return i if random.random() < self._prob[i] else self._alias[i]
+
+
+class RouteIndex:
+    """
+    预计算的路线索引
+    
+    首次使用时根据路线目录（或config中的路线表）构建一次：
+    - pairs: 所有有效的 (起点站, 终点站, 车型) 元组，车型为"high_speed"或"normal"（权重为0的不计入）
+    - ends_by_start: 每个起点站可达的终点站（去重）
+    - types_by_pair: 每个站点对有哪些车型提供服务
+    - 按config.ROUTE_WEIGHTS（和路线目录中的车次数）构建的别名采样器，一次抽样即可得到有效的站点对
+    """
+    
+    def __init__(
+        self,
+        routes_by_type: dict[str, dict[str, dict[str, bool]]],
+        weights: dict[tuple[str, str], float],
+        trip_counts: dict[tuple[str, str, str], float] | None = None
+    ):
+        """
+        构建路线索引
+        
+        Args:
+            routes_by_type: 车型到路线表的映射，例如 {"high_speed": config.ROUTES_HIGH_SPEED, "normal": config.ROUTES_NORMAL}
+            weights: 站点对权重，格式: {(起点站, 终点站): 权重}
+            trip_counts: 每个 (起点站, 终点站, 车型) 的车次数（可选），提供时采样权重再乘以车次数
+        """
+        self.pairs: list[tuple[str, str, str]] = []
+        pair_weights: list[float] = []
+        ends_by_start: dict[str, list[str]] = {}
+        self.types_by_pair: dict[tuple[str, str], tuple[str, ...]] = {}
+        
+        for train_type, routes in routes_by_type.items():
+            for start, ends in routes.items():
+                for end, exists in ends.items():
+                    if not exists:
+                        continue
+                    weight = weights.get((start, end), 1.0)
+                    if trip_counts is not None:
+                        weight *= trip_counts.get((start, end, train_type), 0.0)
+                    # 权重为0（配置排除或没有车次）的站点对不参与采样，也不作为可选的终点站和车型
+                    if weight <= 0:
+                        continue
+                    self.pairs.append((start, end, train_type))
+                    pair_weights.append(weight)
+                    if end not in ends_by_start.setdefault(start, []):
+                        ends_by_start[start].append(end)
+                    self.types_by_pair[(start, end)] = self.types_by_pair.get((start, end), ()) + (train_type,)
+        
+        self.ends_by_start: dict[str, tuple[str, ...]] = {start: tuple(ends) for start, ends in ends_by_start.items()}
+        self._sampler = AliasSampler(pair_weights) if self.pairs else None
+    
+    def sample(self) -> tuple[str, str, str] | None:
+        """
+        按权重随机抽取一个有效的站点对
+        
+        Returns:
+            (起点站, 终点站, 车型) 元组，如果没有任何路线则返回None
+        """
+        if self._sampler is None:
+            return None
+        return self.pairs[self._sampler.sample()]
+
+
+# 车型：高铁/动车（travelservice）和普通火车（travel2service）
+TRAIN_TYPES = ("high_speed", "normal")
+
+# 路线目录和路线索引，首次使用时加载并缓存（Locust的init事件中会预先加载）
+_route_catalogue: RouteCatalogue | None = None
+_route_catalogue_loaded = False
+_route_index: RouteIndex | None = None
+
+
+def get_route_catalogue() -> RouteCatalogue | None:
+    """
+    获取路线目录（config.ROUTE_CATALOGUE），首次调用时内存映射读取并缓存
+    
+    Returns:
+        路线目录，文件不存在或格式不受支持时返回None（此时使用config中的路线表）
+    """
+    global _route_catalogue, _route_catalogue_loaded
+    if not _route_catalogue_loaded:
+        _route_catalogue_loaded = True
+        try:
+            _route_catalogue = load_catalogue(config.ROUTE_CATALOGUE)
+            logger.info("已加载路线目录: %s（生成于 %s，%d 条记录）",
+                        config.ROUTE_CATALOGUE, _route_catalogue.generated_at, len(_route_catalogue.entries))
+        except FileNotFoundError:
+            logger.info("路线目录不存在，使用config中的路线表: %s", config.ROUTE_CATALOGUE)
+        except (OSError, ValueError) as e:
+            logger.warning("路线目录无法加载，使用config中的路线表: %s, %s", config.ROUTE_CATALOGUE, e)
+    return _route_catalogue
+
+
+def get_route_index() -> RouteIndex:
+    """
+    获取路线索引，首次调用时构建并缓存
+    
+    有路线目录时使用目录中有车次的站点对，并在config.ROUTE_WEIGHT_BY_TRIPS为True时按平均车次数加权；
+    否则使用config.ROUTES_HIGH_SPEED和config.ROUTES_NORMAL
+    
+    Returns:
+        路线索引
+    """
+    global _route_index
+    if _route_index is None:
+        catalogue = get_route_catalogue()
+        if catalogue is not None:
+            _route_index = RouteIndex(
+                catalogue.routes_by_type(),
+                config.ROUTE_WEIGHTS,
+                catalogue.trip_counts() if config.ROUTE_WEIGHT_BY_TRIPS else None,
+            )
+        else:
+            _route_index = RouteIndex(
+                {"high_speed": config.ROUTES_HIGH_SPEED, "normal": config.ROUTES_NORMAL},
+                config.ROUTE_WEIGHTS,
+            )
+    return _route_index
+
+
+def get_random_route() -> tuple[str, str, str] | None:
+    """
+    按config.ROUTE_WEIGHTS中的权重（使用路线目录时再乘以车次数），一次抽取一个存在路线的站点对
+    
+    Returns:
+        (起点站, 终点站, 车型) 元组，车型为"high_speed"（高铁/动车）或"normal"（普通火车），
+        如果没有任何路线则返回None
+    """
+    return get_route_index().sample()
+
+
+def plan_trip_queries(start_station: str, end_station: str) -> tuple[str, ...]:
+    """
+    根据路线表决定查票时需要调用哪些车次服务
+    
+    - 站点对只出现在一种路线表中时，只查询对应的服务
+    - 站点对不在任何路线表中（例如调用方指定了任意站点）或配置了config.QUERY_PROBE_BOTH时，两种服务都查询
+    
+    Args:
+        start_station: 起点站名称
+        end_station: 终点站名称
+    
+    Returns:
+        需要查询的车型元组，元素为"high_speed"（travelservice）或"normal"（travel2service）
+    """
+    if config.QUERY_PROBE_BOTH:
+        return TRAIN_TYPES
+    return get_route_index().types_by_pair.get((start_station, end_station), TRAIN_TYPES)
+
+
 def get_random_end_station_by_route(start_station: str) -> str | None:
     """
     根据config中的路线信息，随机选择一个存在的终点站
     
-    优先从高铁/动车路线中选择，如果没有则从普通火车路线中选择
+    高铁/动车路线和普通火车路线的终点站合并去重后等概率选择（使用预计算的路线索引）
     如果两种路线都没有，则返回None
     
     Args:
@@ -63,24 +272,9 @@ def get_random_end_station_by_route(start_station: str) -> str | None:
     Returns:
         随机选择的终点站名称，如果不存在路线则返回None
     """
-    available_ends = []
-    
-    # 先从高铁/动车路线中查找
-    if start_station in config.ROUTES_HIGH_SPEED:
-        high_speed_ends = [end for end, exists in config.ROUTES_HIGH_SPEED[start_station].items() if exists]
-        available_ends.extend(high_speed_ends)
-    
-    # 再从普通火车路线中查找
-    if start_station in config.ROUTES_NORMAL:
-        normal_ends = [end for end, exists in config.ROUTES_NORMAL[start_station].items() if exists]
-        available_ends.extend(normal_ends)
-    
-    # 去重
-    available_ends = list(set(available_ends))
-    
+    available_ends = get_route_index().ends_by_start.get(start_station)
     if not available_ends:
         return None
-    
     return random.choice(available_ends)
 
 
@@ -96,7 +290,14 @@ def get_future_date(days_ahead: int | None = None, max_days: int = 30) -> str:
         日期字符串，格式：YYYY-MM-DD
     """
     if days_ahead is None:
-        days_ahead = random.randint(1, max_days)
+        if config.PAYLOAD_POOL_ENABLED:
+            days_ahead = payload_pool.take_days(1, max_days)
+        else:
+            days_ahead = random.randint(1, max_days)
+    
+    if config.PAYLOAD_POOL_ENABLED and 0 <= days_ahead <= payload_pool.MAX_DAYS_AHEAD:
+        # 日期表每天只生成一次
+        return payload_pool.dates.get(days_ahead)
     
     future_date = datetime.now() + timedelta(days=days_ahead)
     return future_date.strftime("%Y-%m-%d")
@@ -115,17 +316,73 @@ def get_random_travel_date() -> str:
     return get_future_date(max_days=30)
 
 
+# 测试账号池（config.USER_POOL_FILE），首次使用时加载并缓存
+_user_pool: list[dict[str, str]] | None = None
+
+
+def load_user_pool(path: str) -> list[dict[str, str]]:
+    """
+    读取测试账号池文件（JSONL，每行一个账号，至少包含username和password）
+    
+    Args:
+        path: 账号池文件路径
+    
+    Returns:
+        账号列表，无法解析的行会被跳过
+    
+    Raises:
+        OSError: 文件无法读取
+    """
+    users = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                user = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(user, dict) and user.get("username") and user.get("password"):
+                users.append(user)
+    return users
+
+
+def get_user_pool() -> list[dict[str, str]]:
+    """
+    获取测试账号列表，首次调用时读取config.USER_POOL_FILE并缓存
+    
+    Returns:
+        账号池中的账号；账号池文件不存在或为空时返回config.DEFAULT_USERS
+    """
+    global _user_pool
+    if _user_pool is None:
+        try:
+            _user_pool = load_user_pool(config.USER_POOL_FILE)
+        except FileNotFoundError:
+            _user_pool = []
+        except OSError as e:
+            logger.warning("账号池无法读取，使用DEFAULT_USERS: %s, %s", config.USER_POOL_FILE, e)
+            _user_pool = []
+        if _user_pool:
+            logger.info("已加载账号池: %s（%d 个账号）", config.USER_POOL_FILE, len(_user_pool))
+        else:
+            _user_pool = list(config.DEFAULT_USERS)
+    return _user_pool
+
+
 def get_random_user() -> dict[str, str]:
     """
-    随机选择一个用户凭据
+    随机选择一个用户凭据（优先从账号池中选择，见get_user_pool）
     
     Returns:
         包含username和password的字典
     """
-    if not config.DEFAULT_USERS:
+    users = get_user_pool()
+    if not users:
         # 如果没有配置用户，返回默认值
         return {"username": "fdse_microservice", "password": "111111"}
-    return random.choice(config.DEFAULT_USERS)
+    return random.choice(users)
 
 
 def get_random_user_credentials() -> tuple[str, str]:
@@ -146,6 +403,9 @@ def generate_random_id_number() -> str:
     Returns:
         18位身份证号码字符串
     """
+    if config.PAYLOAD_POOL_ENABLED:
+        return payload_pool.take("id_number")
+    
     # 生成前17位（地区码+出生日期+顺序码）
     area_code = random.choice(["110", "120", "130", "140", "150", "210", "220", "230", "310", "320", "330", "340", "350"])
     birth_date = f"{random.randint(1970, 2000)}{random.randint(1, 12):02d}{random.randint(1, 28):02d}"
@@ -168,6 +428,11 @@ def generate_random_email(username: str | None = None) -> str:
     Returns:
         邮箱地址字符串
     """
+    if config.PAYLOAD_POOL_ENABLED:
+        if username is None:
+            return payload_pool.take("email")
+        return f"{username}@{payload_pool.take('email_domain')}"
+    
     if username is None:
         username = f"user{random.randint(100000, 999999)}"
     
@@ -187,6 +452,9 @@ def generate_random_username(prefix: str = "test") -> str:
     Returns:
         用户名字符串
     """
+    if config.PAYLOAD_POOL_ENABLED and prefix == "test":
+        return payload_pool.take("username")
+    
     suffix = random.randint(100000, 999999)
     return f"{prefix}{suffix}"
 
@@ -202,6 +470,17 @@ def generate_register_data(user_name: str | None = None, password: str | None =
     Returns:
         包含注册所需所有字段的字典
     """
+    if config.PAYLOAD_POOL_ENABLED and user_name is None:
+        user_name, gender, document_num, email = payload_pool.take("register")
+        return {
+            "user_name": user_name,
+            "password": password or "111111",
+            "gender": gender,
+            "document_type": 1,
+            "document_num": document_num,
+            "email": email
+        }
+    
     user_name = user_name or generate_random_username()
     password = password or "111111"
     gender = random.choice([0, 1])  # 0表示女性，1表示男性
@@ -247,7 +526,7 @@ def select_random_trip(trips: list[dict[str, object]]) -> str | None:
     
     # 判断是否是高铁/动车：G或D开头
     is_high_speed = trip_id_str.startswith("G") or trip_id_str.startswith("D")
-    logger.info(f"随机选择车次: {trip_id_str}, 类型: {'高铁/动车' if is_high_speed else '普通火车'}")
+    logger.info("随机选择车次: %s, 类型: %s", trip_id_str, '高铁/动车' if is_high_speed else '普通火车')
     
     return trip_id_str
 